@@ -0,0 +1,151 @@
+import contextlib
+import contextvars
+import functools
+import inspect
+import threading
+import time
+import streamlit as st
+import pandas as pd
+
+# Cada escrita registra (tabela, obra_id, mes) -> número de sequência. None significa "qualquer obra/mês".
+_versoes = {}
+_sequencia = 0
+_ultima_escrita = None
+_versoes_lock = threading.Lock()
+# Tabelas declaradas por algum loader e callbacks avisados a cada invalidação local.
+_tabelas_registradas = set()
+_ao_invalidar = []
+# Estado da chamada medida por medir_cache(); _carregar marca quando o loader roda de fato.
+_medicao = contextvars.ContextVar('_medicao_cache', default=None)
+
+def normalizar_mes(mes):
+    """'YYYY-MM' de uma data, Timestamp ou texto; é a granularidade de mês das invalidações."""
+    if mes is None:
+        return None
+    if isinstance(mes, str):
+        return mes[:7]
+    return pd.Timestamp(mes).strftime('%Y-%m')
+
+def _normalizar_obras(obras):
+    if obras is None:
+        return None
+    if isinstance(obras, (list, tuple, set, frozenset)):
+        return frozenset(int(o) for o in obras)
+    return frozenset([int(obras)])
+
+def ao_invalidar(callback):
+    """Registra callback(tabela, obra_id, mes) chamado a cada invalidação feita por este processo."""
+    _ao_invalidar.append(callback)
+
+def invalidar(tabela, obra_id=None, mes=None, propagar=True):
+    """Invalida as entradas de cache que dependem de `tabela` no escopo (obra_id, mes) informado.
+
+    Sem obra_id/mes a invalidação vale para a tabela inteira. Com propagar=False os callbacks de
+    ao_invalidar() não são chamados (invalidações recebidas de outros processos).
+    """
+    global _sequencia, _ultima_escrita
+    chave = (tabela, None if obra_id is None else int(obra_id), normalizar_mes(mes))
+    with _versoes_lock:
+        _sequencia += 1
+        _versoes[chave] = _sequencia
+        _ultima_escrita = time.monotonic()
+    if propagar:
+        for callback in list(_ao_invalidar):
+            callback(*chave)
+
+def invalidar_tudo(propagar=True):
+    """Invalida todas as tabelas de que algum loader depende."""
+    for tabela in sorted(_tabelas_registradas):
+        invalidar(tabela, propagar=propagar)
+
+def segundos_desde_ultima_escrita():
+    """Tempo desde a última invalidação neste processo (infinito se ainda não houve escrita)."""
+    with _versoes_lock:
+        ultima = _ultima_escrita
+    return float('inf') if ultima is None else time.monotonic() - ultima
+
+def versao(tabelas, obras=None, periodo=None):
+    """Maior sequência de invalidação que atinge as tabelas no escopo de obras/período ('YYYY-MM', 'YYYY-MM')."""
+    with _versoes_lock:
+        itens = list(_versoes.items())
+    atual = 0
+    for (tabela, obra_id, mes), sequencia in itens:
+        if tabela not in tabelas:
+            continue
+        if obras is not None and obra_id is not None and obra_id not in obras:
+            continue
+        if periodo is not None and mes is not None and not (periodo[0] <= mes <= periodo[1]):
+            continue
+        atual = max(atual, sequencia)
+    return atual
+
+@contextlib.contextmanager
+def medir_cache():
+    """Mede a próxima chamada a um loader de cache_por_tags feita dentro do bloco.
+
+    Produz um dict cujo 'acerto' fica True quando o valor veio do cache, False quando o loader
+    rodou e None se nenhum loader com cache foi chamado.
+    """
+    medicao = {'acerto': None}
+    token = _medicao.set(medicao)
+    try:
+        yield medicao
+    finally:
+        _medicao.reset(token)
+
+def cache_por_tags(*tabelas, obra=None, mes=None, periodo=None, **opcoes_cache):
+    """Substitui @st.cache_data para loaders que declaram de quais tabelas dependem.
+
+    `obra` e `mes` são nomes de parâmetros do loader que delimitam o escopo (obra_id e 'YYYY-MM');
+    `periodo` é um par de nomes (inicio, fim). Só as escritas que atingem esse escopo, via
+    invalidar(), fazem o loader ir de novo ao banco.
+    """
+    opcoes_cache.setdefault('max_entries', 256)
+    tabelas_dependentes = frozenset(tabelas)
+    _tabelas_registradas.update(tabelas_dependentes)
+
+    def decorador(func):
+        assinatura = inspect.signature(func)
+
+        def _carregar(versao_cache, *args, **kwargs):
+            carga = _medicao.get()
+            if carga is not None:
+                carga['executou'] = True
+            return func(*args, **kwargs)
+
+        # O st.cache_data identifica a função por módulo + qualname; sem isto todos os loaders
+        # decorados compartilhariam o mesmo cache.
+        _carregar.__module__ = func.__module__
+        _carregar.__name__ = func.__name__
+        _carregar.__qualname__ = func.__qualname__
+        _carregar.__doc__ = func.__doc__
+        carregar = st.cache_data(**opcoes_cache)(_carregar)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            argumentos = assinatura.bind(*args, **kwargs)
+            argumentos.apply_defaults()
+            obras = _normalizar_obras(argumentos.arguments[obra]) if obra else None
+            escopo_periodo = None
+            if periodo:
+                inicio, fim = (normalizar_mes(argumentos.arguments[nome]) for nome in periodo)
+                escopo_periodo = (inicio or '0000-00', fim or '9999-99')
+            elif mes:
+                mes_ref = normalizar_mes(argumentos.arguments[mes])
+                escopo_periodo = (mes_ref, mes_ref) if mes_ref else None
+            medicao = _medicao.get()
+            carga = {}
+            token = _medicao.set(carga)
+            try:
+                resultado = carregar(versao(tabelas_dependentes, obras, escopo_periodo), *args, **kwargs)
+            finally:
+                _medicao.reset(token)
+            if medicao is not None and medicao['acerto'] is None:
+                medicao['acerto'] = not carga.get('executou', False)
+            return resultado
+
+        wrapper.clear = carregar.clear
+        wrapper.sem_cache = func
+        return wrapper
+
+    return decorador
@@ -1,241 +1,1201 @@
 import streamlit as st
 import pandas as pd
-from sqlalchemy import create_engine, text
+import cache_utils
+import meses_fechados
+import utils
+from cache_utils import cache_por_tags
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import TimeoutError as SQLAlchemyTimeoutError
+from sqlalchemy.pool import QueuePool
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 from datetime import datetime, timezone, timedelta
 import base64
 import os
 import io
+import csv
+import threading
+import time
+import atexit
+import sys
+import unicodedata
+import contextlib
+import contextvars
+import functools
+import inspect
+import json
+import select
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import pyarrow  # noqa: F401
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+try:
+    from openpyxl import load_workbook
+    OPENPYXL_AVAILABLE = True
+except ImportError:
+    OPENPYXL_AVAILABLE = False
+    load_workbook = None
 
 class FolhaFechadaException(Exception):
     pass
 
-@st.cache_resource(ttl=60) 
-def get_db_connection():
-    try:
-        db_url = os.getenv("SUPABASE_URL")
+def _intervalo_mes(mes_referencia):
+    """Retorna (inicio, fim) do mês 'YYYY-MM' como intervalo semiaberto [inicio, fim)."""
+    inicio = pd.to_datetime(mes_referencia, format='%Y-%m').date()
+    fim = (inicio + timedelta(days=32)).replace(day=1)
+    return inicio, fim
 
-        if not db_url:
-            try:
-                db_url = st.secrets["database"]["url"]
-            except (FileNotFoundError, KeyError):
-                return None
+def _intervalo_periodo(mes_inicio, mes_fim):
+    """Retorna (inicio, fim) semiaberto cobrindo os meses 'YYYY-MM' de mes_inicio a mes_fim, inclusive."""
+    return _intervalo_mes(mes_inicio)[0], _intervalo_mes(mes_fim)[1]
 
-        if db_url.startswith("postgres://"):
-            db_url = db_url.replace("postgres://", "postgresql://", 1)
-            
-        if "?" not in db_url:
-            db_url += "?gssencmode=disable" 
+def _lista_obras(obra_ids):
+    if obra_ids is None:
+        return None
+    if isinstance(obra_ids, (list, tuple, set, frozenset)):
+        return sorted(int(o) for o in obra_ids)
+    return [int(obra_ids)]
+
+# Datas e horas voltam do banco já no fuso local; valores monetários como float8.
+_FUSO_HORARIO = 'America/Sao_Paulo'
+
+def _ler_sql(query, engine, params=None):
+    """pd.read_sql com colunas Arrow quando `tipos_arrow` está ligado (e o pyarrow instalado)."""
+    opcoes = {}
+    if PYARROW_AVAILABLE and _config_banco('tipos_arrow', False):
+        opcoes['dtype_backend'] = 'pyarrow'
+    return pd.read_sql(text(query) if isinstance(query, str) else query, engine, params=params, **opcoes)
+
+# Colunas de rótulo que se repetem em todas as linhas dos lançamentos; como `category` ficam
+# guardadas uma vez (tabela de categorias) e as linhas carregam só códigos inteiros, o que
+# reduz a memória de cada mês em cache e o tempo de unpickle a cada acesso.
+_COLUNAS_CATEGORICAS_LANCAMENTOS = ['Obra', 'Funcionário', 'Disciplina', 'Serviço', 'Unidade']
+
+def _compactar(df, colunas):
+    if df.empty:
+        return df
+    colunas = [c for c in colunas if c in df.columns and df[c].dtype == object]
+    if colunas:
+        df[colunas] = df[colunas].astype('category')
+    return df
+
+_POOL_PADRAO = {
+    'pool_size': 5,
+    'max_overflow': 10,
+    'pool_timeout': 30,
+    'pool_recycle': 1800,
+    'pool_pre_ping': True,
+}
 
-        engine = create_engine(db_url)
-        return engine
+class _PoolComMetricas(QueuePool):
+    """QueuePool que mede quanto tempo cada checkout espera na fila por uma conexão.
+
+    As métricas são da instância (primário e réplica têm pools separados). O tempo de abrir uma
+    conexão nova não conta como espera.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._metricas = {'esperas': 0, 'tempo_espera_total': 0.0, 'tempo_espera_max': 0.0, 'timeouts': 0}
+        self._metricas_lock = threading.Lock()
+        self._checkout_local = threading.local()
+
+    def metricas(self):
+        with self._metricas_lock:
+            return dict(self._metricas)
+
+    def _create_connection(self):
+        inicio = time.perf_counter()
+        try:
+            return super()._create_connection()
+        finally:
+            local = self._checkout_local
+            local.criacao = getattr(local, 'criacao', 0.0) + time.perf_counter() - inicio
+
+    def _do_get(self):
+        # QueuePool._do_get pode chamar a si mesmo; só a chamada externa é medida.
+        local = self._checkout_local
+        if getattr(local, 'medindo', False):
+            return super()._do_get()
+        local.medindo, local.criacao = True, 0.0
+        inicio = time.perf_counter()
+        try:
+            return super()._do_get()
+        except SQLAlchemyTimeoutError:
+            with self._metricas_lock:
+                self._metricas['timeouts'] += 1
+            raise
+        finally:
+            espera = max(time.perf_counter() - inicio - local.criacao, 0.0)
+            local.medindo = False
+            with self._metricas_lock:
+                self._metricas['esperas'] += 1
+                self._metricas['tempo_espera_total'] += espera
+                self._metricas['tempo_espera_max'] = max(self._metricas['tempo_espera_max'], espera)
+
+def _config_banco(chave, padrao):
+    """Lê uma configuração do banco da variável DB_<CHAVE> ou de st.secrets["database"][chave]."""
+    valor = os.getenv(f"DB_{chave.upper()}")
+    if valor is None:
+        try:
+            valor = st.secrets["database"][chave]
+        except (FileNotFoundError, KeyError):
+            return padrao
+    if isinstance(padrao, bool):
+        return str(valor).strip().lower() in ('1', 'true', 'sim', 'yes')
+    return type(padrao)(valor)
+
+def _get_db_url(variavel="SUPABASE_URL", chave="url"):
+    db_url = os.getenv(variavel)
+
+    if not db_url:
+        try:
+            db_url = st.secrets["database"][chave]
+        except (FileNotFoundError, KeyError):
+            return None
+
+    if db_url.startswith("postgres://"):
+        db_url = db_url.replace("postgres://", "postgresql://", 1)
+        
+    if "?" not in db_url:
+        db_url += "?gssencmode=disable" 
+    return db_url
+
+@st.cache_resource
+def _criar_engine(db_url, somente_leitura=False):
+    config = {chave: _config_banco(chave, padrao) for chave, padrao in _POOL_PADRAO.items()}
+    if somente_leitura:
+        config['connect_args'] = {'options': '-c default_transaction_read_only=on'}
+    engine = create_engine(db_url, poolclass=_PoolComMetricas, **config)
+    _carregar_config_metricas()
+    event.listen(engine, 'before_cursor_execute', _antes_execucao)
+    event.listen(engine, 'after_cursor_execute', _apos_execucao)
+    if not somente_leitura:
+        _iniciar_ouvinte_invalidacoes(engine)
+    return engine
+
+# Réplica de leitura opcional (SUPABASE_READ_URL ou st.secrets["database"]["read_url"]).
+# Depois de qualquer escrita neste processo, as leituras voltam ao primário por
+# `tolerancia_replica_segundos`, para não ler (nem guardar em cache) dados anteriores à escrita.
+_TOLERANCIA_REPLICA_PADRAO = 5.0
+_forcar_primario = contextvars.ContextVar('_forcar_primario', default=False)
+
+@contextlib.contextmanager
+def ler_do_primario():
+    """Faz os loaders chamados dentro do bloco lerem do primário, ignorando a réplica."""
+    token = _forcar_primario.set(True)
+    try:
+        yield
+    finally:
+        _forcar_primario.reset(token)
+
+def _usar_replica():
+    if _forcar_primario.get():
+        return None
+    read_url = _get_db_url("SUPABASE_READ_URL", "read_url")
+    if not read_url:
+        return None
+    if cache_utils.segundos_desde_ultima_escrita() < _config_banco('tolerancia_replica_segundos', _TOLERANCIA_REPLICA_PADRAO):
+        return None
+    return read_url
+
+def get_db_connection(leitura=False):
+    """Engine do primário; com leitura=True, a da réplica quando configurada e fora da janela de escrita recente."""
+    db_url = None
+    try:
+        if leitura:
+            db_url = _usar_replica()
+            if db_url:
+                return _criar_engine(db_url, somente_leitura=True)
+        db_url = _get_db_url()
+        if not db_url:
+            return None
+        return _criar_engine(db_url)
 
     except Exception as e:
         print(f"DEBUG URL: {db_url.split('@')[-1] if db_url else 'Sem URL'}") # Mostra o host no log sem mostrar a senha
         st.error(f"Erro de Conexão: {e}")
         return None
 
-        
-@st.cache_data
-def get_funcionarios():
+def _estatisticas_do_pool(pool):
+    metricas = pool.metricas()
+    esperas = metricas['esperas']
+    return {
+        'tamanho_pool': pool.size(),
+        'max_overflow': pool._max_overflow,
+        'em_uso': pool.checkedout(),
+        'ociosas': pool.checkedin(),
+        'overflow': max(pool.overflow(), 0),
+        'checkouts': esperas,
+        'espera_media_ms': (metricas['tempo_espera_total'] / esperas * 1000) if esperas else 0.0,
+        'espera_max_ms': metricas['tempo_espera_max'] * 1000,
+        'timeouts': metricas['timeouts'],
+    }
+
+def get_estatisticas_pool():
+    """Retorna o estado atual do pool do primário e o tempo de espera na fila dos checkouts.
+
+    Com réplica configurada, as mesmas estatísticas do pool dela ficam em 'replica' (senão None).
+    """
     engine = get_db_connection()
+    if engine is None: return {}
+    estatisticas = _estatisticas_do_pool(engine.pool)
+    estatisticas['replica'] = None
+    read_url = _get_db_url("SUPABASE_READ_URL", "read_url")
+    if read_url:
+        estatisticas['replica'] = _estatisticas_do_pool(_criar_engine(read_url, somente_leitura=True).pool)
+    return estatisticas
+
+# --- Invalidação de cache entre processos ---
+# O cache do Streamlit é por processo. As invalidações de cada escrita são publicadas juntas, com
+# pg_notify no canal `cache_invalidacao` dentro da transação da escrita (ver _transacao), e uma
+# thread por processo escuta o canal e aplica as invalidações dos outros com o mesmo escopo
+# (tabela, obra_id, mes). A invalidação recebida também abre a janela de leitura
+# no primário (ver _usar_replica), para que a réplica não devolva o dado anterior à escrita.
+# Requer conexão direta ou pooler em modo sessão: em modo transação o LISTEN não recebe nada.
+# Desligue com `invalidacao_entre_processos = false`.
+_CANAL_INVALIDACAO = 'cache_invalidacao'
+_ORIGEM_PROCESSO = uuid.uuid4().hex
+_OUVINTE_VERIFICACAO_SEGUNDOS = 30
+_ouvinte_iniciado = False
+_ouvinte_lock = threading.Lock()
+
+# O payload do NOTIFY aceita até 8000 bytes; acima deste limite a escrita é avisada por tabela inteira.
+_PAYLOAD_INVALIDACAO_MAXIMO = 7000
+
+class _Invalidacoes:
+    """Invalidações de cache de uma escrita, deduplicadas por (tabela, obra_id, 'YYYY-MM')."""
+
+    def __init__(self):
+        self.eventos = set()
+
+    def adicionar(self, tabela, obra_id=None, mes=None):
+        self.eventos.add((tabela, None if obra_id is None else int(obra_id), cache_utils.normalizar_mes(mes)))
+
+    def payload(self):
+        eventos = sorted(self.eventos, key=repr)
+        payload = json.dumps({'origem': _ORIGEM_PROCESSO, 'eventos': eventos})
+        if len(payload.encode('utf-8')) > _PAYLOAD_INVALIDACAO_MAXIMO:
+            tabelas = sorted({tabela for tabela, _, _ in eventos})
+            payload = json.dumps({'origem': _ORIGEM_PROCESSO, 'eventos': [[tabela, None, None] for tabela in tabelas]})
+        return payload
+
+    def aplicar(self):
+        for tabela, obra_id, mes in sorted(self.eventos, key=repr):
+            cache_utils.invalidar(tabela, obra_id=obra_id, mes=mes)
+
+@contextlib.contextmanager
+def _transacao(connection):
+    """connection.begin() de uma escrita; produz o _Invalidacoes em que ela registra o que alterou.
+
+    As invalidações vão numa única notificação enviada dentro da própria transação, que os
+    outros processos só recebem se ela for confirmada; o cache deste processo é invalidado
+    logo depois do commit.
+    """
+    invalidacoes = _Invalidacoes()
+    with connection.begin():
+        yield invalidacoes
+        if invalidacoes.eventos and _config_banco('invalidacao_entre_processos', True):
+            connection.execute(text("SELECT pg_notify(:canal, :payload)"),
+                               {'canal': _CANAL_INVALIDACAO, 'payload': invalidacoes.payload()})
+    invalidacoes.aplicar()
+
+def _aplicar_invalidacao(payload):
+    try:
+        notificacao = json.loads(payload)
+    except ValueError:
+        return
+    if notificacao.get('origem') == _ORIGEM_PROCESSO:
+        return
+    eventos = notificacao.get('eventos')
+    if eventos is None and notificacao.get('tabela'):
+        # Formato anterior, de um evento por notificação (processos ainda na versão antiga).
+        eventos = [[notificacao['tabela'], notificacao.get('obra_id'), notificacao.get('mes')]]
+    for tabela, obra_id, mes in eventos or []:
+        cache_utils.invalidar(tabela, obra_id=obra_id, mes=mes, propagar=False)
+        _descartar_mes_fechado(tabela, obra_id, mes)
+
+def _ouvir_invalidacoes(engine):
+    # Conexão própria, fora do pool: fica presa ao LISTEN durante toda a vida do processo.
+    argumentos, opcoes = engine.dialect.create_connect_args(engine.url)
+    espera = 1
+    reconexao = False
+    while True:
+        conexao = None
+        try:
+            conexao = engine.dialect.dbapi.connect(*argumentos, **opcoes)
+            conexao.autocommit = True
+            with conexao.cursor() as cursor:
+                cursor.execute(f"LISTEN {_CANAL_INVALIDACAO}")
+                if reconexao:
+                    # Notificações enviadas enquanto estávamos desconectados se perderam.
+                    cache_utils.invalidar_tudo(propagar=False)
+                    _descartar_meses_fechados()
+                espera = 1
+                while True:
+                    if select.select([conexao], [], [], _OUVINTE_VERIFICACAO_SEGUNDOS) == ([], [], []):
+                        cursor.execute("SELECT 1")  # detecta conexão caída
+                    else:
+                        conexao.poll()
+                    while conexao.notifies:
+                        _aplicar_invalidacao(conexao.notifies.pop(0).payload)
+        except Exception as e:
+            print(f"Ouvinte de invalidação de cache desconectado: {e}. Nova tentativa em {espera} s.", file=sys.stderr)
+        finally:
+            if conexao is not None:
+                try:
+                    conexao.close()
+                except Exception:
+                    pass
+        reconexao = True
+        time.sleep(espera)
+        espera = min(espera * 2, 60)
+
+def _iniciar_ouvinte_invalidacoes(engine):
+    global _ouvinte_iniciado
+    if not _config_banco('invalidacao_entre_processos', True):
+        return
+    with _ouvinte_lock:
+        if _ouvinte_iniciado:
+            return
+        _ouvinte_iniciado = True
+    threading.Thread(target=_ouvir_invalidacoes, args=(engine,), name="ouvinte-invalidacao-cache", daemon=True).start()
+
+# --- Instrumentação ---
+# Toda função pública do módulo é envolvida por _instrumentar (ver o fim do arquivo), que guarda
+# tempo, linhas, bytes, acerto de cache e página de origem num buffer circular e, com
+# `gravar_metricas` ligado, na tabela query_metrics. Os eventos do engine medem cada comando SQL;
+# os que passam de `consulta_lenta_ms` são registrados com parâmetros e plano (EXPLAIN).
+_METRICAS_MAXIMO = 5000
+_CONSULTAS_LENTAS_MAXIMO = 200
+_CONSULTA_LENTA_MS_PADRAO = 1000.0
+
+_metricas_chamadas = deque(maxlen=_METRICAS_MAXIMO)
+_consultas_lentas = deque(maxlen=_CONSULTAS_LENTAS_MAXIMO)
+_chamada_atual = contextvars.ContextVar('_chamada_atual', default=None)
+# Lidas uma vez, ao criar o engine: os eventos rodam a cada comando SQL.
+_config_metricas = {'consulta_lenta_ms': _CONSULTA_LENTA_MS_PADRAO, 'gravar_metricas': False}
+
+def _carregar_config_metricas():
+    _config_metricas['consulta_lenta_ms'] = _config_banco('consulta_lenta_ms', _CONSULTA_LENTA_MS_PADRAO)
+    _config_metricas['gravar_metricas'] = _config_banco('gravar_metricas', False)
+
+def _pagina_atual():
+    try:
+        return st.session_state.get('page')
+    except Exception:
+        return None
+
+def _antes_execucao(conn, cursor, statement, parameters, context, executemany):
+    # O início fica no contexto de execução do comando: se ele falhar, after_cursor_execute não
+    # roda e não sobra nada preso na conexão do pool.
+    context._inicio_comando = time.perf_counter()
+
+def _apos_execucao(conn, cursor, statement, parameters, context, executemany):
+    inicio = getattr(context, '_inicio_comando', None)
+    if inicio is None:
+        return
+    duracao_ms = (time.perf_counter() - inicio) * 1000
+    chamada = _chamada_atual.get()
+    if chamada is not None:
+        chamada['consultas'] += 1
+    if duracao_ms >= _config_metricas['consulta_lenta_ms']:
+        _registrar_consulta_lenta(cursor.connection, statement, None if executemany else parameters, duracao_ms, chamada)
+
+def _explicar(conexao_dbapi, statement, parameters):
+    """EXPLAIN (sem ANALYZE) do comando, num savepoint para não afetar a transação de quem chamou."""
+    if statement.lstrip().split(None, 1)[0].upper() not in ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE'):
+        return None
+    cursor = conexao_dbapi.cursor()
+    try:
+        cursor.execute("SAVEPOINT _explicar_consulta")
+        try:
+            cursor.execute("EXPLAIN " + statement, parameters)
+            return "\n".join(linha[0] for linha in cursor.fetchall())
+        except Exception as e:
+            cursor.execute("ROLLBACK TO SAVEPOINT _explicar_consulta")
+            return f"(EXPLAIN indisponível: {e})"
+        finally:
+            cursor.execute("RELEASE SAVEPOINT _explicar_consulta")
+    except Exception:
+        return None
+    finally:
+        cursor.close()
+
+def _registrar_consulta_lenta(conexao_dbapi, statement, parameters, duracao_ms, chamada):
+    registro = {
+        'data_hora': datetime.now(timezone.utc),
+        'funcao': chamada['funcao'] if chamada else None,
+        'pagina': _pagina_atual(),
+        'duracao_ms': duracao_ms,
+        'sql': statement,
+        'parametros': repr(parameters) if parameters is not None else None,
+        'plano': _explicar(conexao_dbapi, statement, parameters),
+    }
+    _consultas_lentas.append(registro)
+    print(f"Consulta lenta ({duracao_ms:.0f} ms) em {registro['funcao']}: {' '.join(statement.split())[:500]} | {registro['parametros']}", file=sys.stderr)
+    if _config_metricas['gravar_metricas']:
+        _escritor_metricas.adicionar({
+            'funcao': registro['funcao'], 'pagina': registro['pagina'], 'duracao_ms': duracao_ms,
+            'linhas': None, 'bytes': None, 'cache': None, 'consultas': 1, 'erro': None,
+            'sql': statement, 'parametros': registro['parametros'], 'plano': registro['plano'],
+        }, get_db_connection())
+
+def _instrumentar(func):
+    em_cache = hasattr(func, 'sem_cache')
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        chamada = {'funcao': func.__name__, 'consultas': 0}
+        token = _chamada_atual.set(chamada)
+        inicio = time.perf_counter()
+        erro = None
+        resultado = None
+        medicao = {'acerto': None}
+        try:
+            with cache_utils.medir_cache() as medicao:
+                resultado = func(*args, **kwargs)
+            return resultado
+        except Exception as e:
+            erro = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            duracao_ms = (time.perf_counter() - inicio) * 1000
+            _chamada_atual.reset(token)
+            linhas = bytes_ = None
+            if isinstance(resultado, pd.DataFrame):
+                linhas = len(resultado)
+                bytes_ = int(resultado.memory_usage(index=False, deep=True).sum())
+            entrada = {
+                'data_hora': datetime.now(timezone.utc),
+                'funcao': func.__name__,
+                'pagina': _pagina_atual(),
+                'duracao_ms': duracao_ms,
+                'consultas': chamada['consultas'],
+                'linhas': linhas,
+                'bytes': bytes_,
+                'cache': None if not em_cache or medicao['acerto'] is None else ('hit' if medicao['acerto'] else 'miss'),
+                'erro': erro,
+            }
+            _metricas_chamadas.append(entrada)
+            if _config_metricas['gravar_metricas']:
+                _escritor_metricas.adicionar({
+                    'funcao': entrada['funcao'], 'pagina': entrada['pagina'], 'duracao_ms': duracao_ms,
+                    'linhas': linhas, 'bytes': bytes_, 'cache': entrada['cache'], 'consultas': entrada['consultas'],
+                    'erro': erro, 'sql': None, 'parametros': None, 'plano': None,
+                }, get_db_connection())
+
+    return wrapper
+
+def get_metricas_consultas():
+    """Chamadas registradas no buffer circular deste processo (mais recentes por último)."""
+    return pd.DataFrame(list(_metricas_chamadas), columns=['data_hora', 'funcao', 'pagina', 'duracao_ms', 'consultas', 'linhas', 'bytes', 'cache', 'erro'])
+
+def get_consultas_lentas():
+    """Comandos SQL acima de `consulta_lenta_ms`, com parâmetros e plano."""
+    return pd.DataFrame(list(_consultas_lentas), columns=['data_hora', 'funcao', 'pagina', 'duracao_ms', 'sql', 'parametros', 'plano'])
+
+def resumir_metricas_consultas():
+    """p50/p95 e demais agregados por função a partir do buffer circular."""
+    df = get_metricas_consultas()
+    if df.empty:
+        return pd.DataFrame()
+    df['acerto'] = (df['cache'] == 'hit').astype(float).where(df['cache'].notna())
+    resumo = df.groupby('funcao').agg(
+        chamadas=('duracao_ms', 'size'),
+        p50_ms=('duracao_ms', lambda x: x.quantile(0.50)),
+        p95_ms=('duracao_ms', lambda x: x.quantile(0.95)),
+        max_ms=('duracao_ms', 'max'),
+        total_ms=('duracao_ms', 'sum'),
+        acerto_cache=('acerto', 'mean'),
+        linhas_media=('linhas', 'mean'),
+        bytes_media=('bytes', 'mean'),
+        erros=('erro', 'count'),
+    )
+    return resumo.sort_values('total_ms', ascending=False).reset_index()
+
+def limpar_metricas_consultas():
+    _metricas_chamadas.clear()
+    _consultas_lentas.clear()
+
+_CONSULTAS_PARALELAS_PADRAO = 4
+
+def carregar_em_paralelo(*chamadas):
+    """Executa loaders independentes em paralelo e devolve os resultados na ordem das chamadas.
+
+    Cada chamada é uma tupla (funcao, *args). As threads herdam o contexto do script do
+    Streamlit (st.cache_data, st.error) e o da chamada (ex.: ler_do_primario()). O número de
+    consultas simultâneas por página é limitado por `consultas_paralelas` para não esgotar o pool.
+    """
+    if len(chamadas) <= 1:
+        return tuple(funcao(*args) for funcao, *args in chamadas)
+
+    ctx = get_script_run_ctx()
+    def _anexar_contexto():
+        if ctx is not None:
+            add_script_run_ctx(threading.current_thread(), ctx)
+
+    max_threads = min(len(chamadas), max(1, _config_banco('consultas_paralelas', _CONSULTAS_PARALELAS_PADRAO)))
+    with ThreadPoolExecutor(max_workers=max_threads, initializer=_anexar_contexto) as executor:
+        futuros = [executor.submit(contextvars.copy_context().run, funcao, *args) for funcao, *args in chamadas]
+        return tuple(futuro.result() for futuro in futuros)
+        
+@cache_por_tags('funcionarios', 'obras', 'funcoes', obra='obra_id')
+def get_funcionarios(obra_id=None):
+    engine = get_db_connection(leitura=True)
     if engine is None: return pd.DataFrame()
     query = """
     SELECT f.id, f.obra_id, f.funcao_id, f.nome as "NOME", o.nome_obra as "OBRA",
-           fn.funcao as "FUNÇÃO", fn.tipo as "TIPO", fn.salario_base as "SALARIO_BASE",
+           fn.funcao as "FUNÇÃO", fn.tipo as "TIPO", fn.salario_base::float8 as "SALARIO_BASE",
            f.data_admissao  -- <-- Nova coluna adicionada aqui
     FROM funcionarios f
     JOIN obras o ON f.obra_id = o.id
     JOIN funcoes fn ON f.funcao_id = fn.id
-    WHERE f.ativo = TRUE;
+    WHERE f.ativo = TRUE
     """
-    return pd.read_sql(query, engine)
-
-@st.cache_data
-def get_lancamentos_do_mes(mes_referencia):
-    engine = get_db_connection()
-    if engine is None: return pd.DataFrame()
-    
-    fuso_horario_local = timezone(timedelta(hours=-3))
+    params = {}
+    if obra_id is not None:
+        query += " AND f.obra_id = :obra_id"
+        params['obra_id'] = int(obra_id)
+    return _ler_sql(query, engine, params)
+
+@cache_por_tags('lancamentos', 'obras', 'funcionarios', 'servicos', 'disciplinas', obra='obra_id', mes='mes_referencia')
+def get_lancamentos_do_mes(mes_referencia, obra_id=None):
+    inicio, fim = _intervalo_mes(mes_referencia)
+    return _compactar(_com_meses_fechados('lancamentos', inicio, fim, obra_id, _consultar_lancamentos, "Data do Serviço"),
+                      _COLUNAS_CATEGORICAS_LANCAMENTOS)
+
+@cache_por_tags('lancamentos', 'obras', 'funcionarios', 'servicos', 'disciplinas', obra='obra_ids', periodo=('mes_inicio', 'mes_fim'))
+def get_lancamentos_periodo(mes_inicio, mes_fim, obra_ids=None):
+    """Lançamentos de mes_inicio a mes_fim ('YYYY-MM', inclusive) em uma única consulta."""
+    inicio, fim = _intervalo_periodo(mes_inicio, mes_fim)
+    return _compactar(_com_meses_fechados('lancamentos', inicio, fim, obra_ids, _consultar_lancamentos, "Data do Serviço"),
+                      _COLUNAS_CATEGORICAS_LANCAMENTOS)
+
+_EXPR_DISCIPLINA = """CASE 
+            WHEN l.servico_id IS NULL AND l.servico_diverso_descricao LIKE '[GRATIFICACAO]%' THEN 'GRATIFICAÇÃO'
+            WHEN l.servico_id IS NULL THEN 'Diverso'
+            ELSE d.nome
+        END"""
 
-    query = text("""
+_SELECT_LANCAMENTOS = f"""
     SELECT 
         l.id, 
-        l.data_lancamento, 
-        l.data_servico, 
+        (l.data_lancamento AT TIME ZONE :fuso) AS "Data", 
+        l.data_servico::timestamp AS "Data do Serviço", 
         l.obra_id, 
         o.nome_obra AS "Obra",
         l.funcionario_id, 
         f.nome AS "Funcionário", 
-        CASE 
-            WHEN l.servico_id IS NULL AND l.servico_diverso_descricao LIKE '[GRATIFICACAO]%' THEN 'GRATIFICAÇÃO'
-            WHEN l.servico_id IS NULL THEN 'Diverso'
-            ELSE d.nome
-        END AS "Disciplina",
+        {_EXPR_DISCIPLINA} AS "Disciplina",
         CASE
             WHEN l.servico_id IS NULL AND l.servico_diverso_descricao LIKE '[GRATIFICACAO]%' 
             THEN TRIM(SUBSTRING(l.servico_diverso_descricao FROM 16))
             ELSE COALESCE(s.descricao, l.servico_diverso_descricao)
         END AS "Serviço", 
-        l.quantidade AS "Quantidade",
+        l.quantidade::float8 AS "Quantidade",
         COALESCE(s.unidade, 'UN') AS "Unidade", 
-        l.valor_unitario AS "Valor Unitário",
-        (l.quantidade * l.valor_unitario) AS "Valor Parcial", 
+        l.valor_unitario::float8 AS "Valor Unitário",
+        (l.quantidade * l.valor_unitario)::float8 AS "Valor Parcial", 
         l.observacao AS "Observação"
     FROM lancamentos l
     LEFT JOIN obras o ON l.obra_id = o.id
     LEFT JOIN funcionarios f ON l.funcionario_id = f.id
     LEFT JOIN servicos s ON l.servico_id = s.id
     LEFT JOIN disciplinas d ON s.disciplina_id = d.id 
-    WHERE to_char(l.data_servico, 'YYYY-MM') = :mes;
-    """)
-    df = pd.read_sql(query, engine, params={'mes': mes_referencia})
-    if not df.empty:
-        df = df.rename(columns={'data_lancamento': 'Data', 'data_servico': 'Data do Serviço'})
-        
-        df['Data'] = pd.to_datetime(df['Data'])
-        if df['Data'].dt.tz is None:
-
-            try:
-                df['Data'] = df['Data'].dt.tz_localize(timezone.utc)
-            except Exception as e:
-                df['Data'] = df['Data'].apply(lambda x: pd.Timestamp(x, tzinfo=timezone.utc))
-        df['Data'] = df['Data'].dt.tz_convert(fuso_horario_local)
-
-        df['Data do Serviço'] = pd.to_datetime(df['Data do Serviço'])
-        if 'Quantidade' in df.columns:
-            df['Quantidade'] = df['Quantidade'].astype(float) 
-    return df
-@st.cache_data
+    WHERE l.data_servico >= :inicio AND l.data_servico < :fim
+"""
+
+def _consultar_lancamentos(inicio, fim, obra_ids=None, pares=None, incluir=False):
+    engine = get_db_connection(leitura=True)
+    if engine is None: return pd.DataFrame()
+
+    query = _SELECT_LANCAMENTOS
+    params = {'inicio': inicio, 'fim': fim, 'fuso': _FUSO_HORARIO}
+    obras = _lista_obras(obra_ids)
+    if obras is not None:
+        query += " AND l.obra_id = ANY(:obra_ids)"
+        params['obra_ids'] = obras
+    if pares:
+        query += _filtro_pares("l.obra_id", "date_trunc('month', l.data_servico)::date", pares, incluir, params)
+    return _compactar(_ler_sql(query, engine, params), _COLUNAS_CATEGORICAS_LANCAMENTOS)
+
+@cache_por_tags('lancamentos', 'obras', 'funcionarios', 'servicos', 'disciplinas', obra='obra_ids', mes='mes_referencia')
+def get_pagina_lancamentos(mes_referencia, obra_ids=None, funcionario_ids=None, disciplinas=None,
+                           data_inicio=None, data_fim=None, apos=None, tamanho_pagina=50):
+    """Uma página de lançamentos do mês, do mais recente para o mais antigo.
+
+    A paginação é por chave (data_lancamento, id): `apos` é o par (Data, id) do último
+    lançamento da página anterior, e só as linhas da página são lidas do banco. Filtros vazios (None) não
+    restringem. Retorna até tamanho_pagina + 1 linhas; a linha extra indica que há uma
+    próxima página e não deve ser exibida.
+    """
+    engine = get_db_connection(leitura=True)
+    if engine is None: return pd.DataFrame()
+
+    inicio, fim = _intervalo_mes(mes_referencia)
+    query = _SELECT_LANCAMENTOS
+    params = {'inicio': inicio, 'fim': fim, 'fuso': _FUSO_HORARIO, 'limite': int(tamanho_pagina) + 1}
+    obras = _lista_obras(obra_ids)
+    if obras is not None:
+        query += " AND l.obra_id = ANY(:obra_ids)"
+        params['obra_ids'] = obras
+    if funcionario_ids:
+        query += " AND l.funcionario_id = ANY(:funcionario_ids)"
+        params['funcionario_ids'] = [int(f) for f in funcionario_ids]
+    if disciplinas:
+        query += f" AND {_EXPR_DISCIPLINA} = ANY(:disciplinas)"
+        params['disciplinas'] = list(disciplinas)
+    if data_inicio is not None:
+        query += " AND l.data_servico >= :data_inicio"
+        params['data_inicio'] = data_inicio
+    if data_fim is not None:
+        query += " AND l.data_servico <= :data_fim"
+        params['data_fim'] = data_fim
+    if apos is not None:
+        query += " AND (l.data_lancamento, l.id) < (CAST(:apos_data AS timestamp) AT TIME ZONE :fuso, :apos_id)"
+        params['apos_data'], params['apos_id'] = pd.Timestamp(apos[0]).to_pydatetime(), int(apos[1])
+    query += " ORDER BY l.data_lancamento DESC, l.id DESC LIMIT :limite"
+    return _ler_sql(query, engine, params)
+
+@cache_por_tags('lancamentos', 'obras', 'funcionarios', 'servicos', 'disciplinas', obra='obra_ids', mes='mes_referencia')
+def get_opcoes_filtro_lancamentos(mes_referencia, obra_ids=None):
+    """Funcionários e disciplinas distintos com lançamentos no mês, para montar os filtros."""
+    engine = get_db_connection(leitura=True)
+    if engine is None: return pd.DataFrame()
+    query = f"""
+    SELECT DISTINCT l.funcionario_id, f.nome AS "Funcionário", {_EXPR_DISCIPLINA} AS "Disciplina"
+    FROM lancamentos l
+    LEFT JOIN funcionarios f ON l.funcionario_id = f.id
+    LEFT JOIN servicos s ON l.servico_id = s.id
+    LEFT JOIN disciplinas d ON s.disciplina_id = d.id
+    WHERE l.data_servico >= :inicio AND l.data_servico < :fim
+    """
+    inicio, fim = _intervalo_mes(mes_referencia)
+    params = {'inicio': inicio, 'fim': fim}
+    obras = _lista_obras(obra_ids)
+    if obras is not None:
+        query += " AND l.obra_id = ANY(:obra_ids)"
+        params['obra_ids'] = obras
+    return _ler_sql(query, engine, params)
+@cache_por_tags('obras')
 def get_obras():
-    engine = get_db_connection()
+    engine = get_db_connection(leitura=True)
     if engine is None: return pd.DataFrame()
-    return pd.read_sql('SELECT id, nome_obra AS "NOME DA OBRA", status, aviso FROM obras WHERE status = \'Ativa\'', engine)
+    return _ler_sql('SELECT id, nome_obra AS "NOME DA OBRA", status, aviso FROM obras WHERE status = \'Ativa\'', engine)
 
-@st.cache_data
+@cache_por_tags('acessos_obras')
 def get_acessos():
-    engine = get_db_connection()
+    engine = get_db_connection(leitura=True)
     if engine is None: return pd.DataFrame()
-    return pd.read_sql('SELECT obra_id, codigo_acesso FROM acessos_obras', engine)
+    return _ler_sql('SELECT obra_id, codigo_acesso FROM acessos_obras', engine)
 
-@st.cache_data
+@cache_por_tags('servicos', 'disciplinas')
 def get_precos():
-    engine = get_db_connection()
+    engine = get_db_connection(leitura=True)
     if engine is None: return pd.DataFrame()
     query = """
     SELECT s.id, d.nome as "DISCIPLINA", s.descricao as "DESCRIÇÃO DO SERVIÇO", 
-           s.unidade as "UNIDADE", s.valor_unitario as "VALOR" 
+           s.unidade as "UNIDADE", s.valor_unitario::float8 as "VALOR" 
     FROM servicos s
     JOIN disciplinas d ON s.disciplina_id = d.id
     WHERE s.ativo = TRUE AND d.ativo = TRUE;
     """
-    return pd.read_sql(query, engine)
+    return _ler_sql(query, engine)
  
-@st.cache_data
+@cache_por_tags('servicos', 'disciplinas')
 def get_all_servicos():
-    engine = get_db_connection()
+    engine = get_db_connection(leitura=True)
     if engine is None: return pd.DataFrame()
     query = """
     SELECT s.id, d.nome as "DISCIPLINA", s.descricao as "DESCRIÇÃO DO SERVIÇO", 
-           s.unidade as "UNIDADE", s.valor_unitario as "VALOR", s.ativo 
+           s.unidade as "UNIDADE", s.valor_unitario::float8 as "VALOR", s.ativo 
     FROM servicos s
     JOIN disciplinas d ON s.disciplina_id = d.id;
     """
-    return pd.read_sql(query, engine)
+    return _ler_sql(query, engine)
     
-@st.cache_data
+@cache_por_tags('funcoes')
 def get_funcoes():
-    engine = get_db_connection()
+    engine = get_db_connection(leitura=True)
     if engine is None: return pd.DataFrame()
-    return pd.read_sql('SELECT id, funcao as "FUNÇÃO", tipo as "TIPO", salario_base as "SALARIO_BASE" FROM funcoes WHERE ativo = TRUE', engine)
+    return _ler_sql('SELECT id, funcao as "FUNÇÃO", tipo as "TIPO", salario_base::float8 as "SALARIO_BASE" FROM funcoes WHERE ativo = TRUE', engine)
 
-@st.cache_data
+@cache_por_tags('funcoes')
 def get_all_funcoes():
-    engine = get_db_connection()
+    engine = get_db_connection(leitura=True)
     if engine is None: return pd.DataFrame()
-    return pd.read_sql('SELECT id, funcao as "FUNÇÃO", tipo as "TIPO", salario_base as "SALARIO_BASE", ativo FROM funcoes', engine)
+    return _ler_sql('SELECT id, funcao as "FUNÇÃO", tipo as "TIPO", salario_base::float8 as "SALARIO_BASE", ativo FROM funcoes', engine)
 
-@st.cache_data
+@cache_por_tags('disciplinas')
 def get_disciplinas():
     """Busca apenas disciplinas ativas."""
-    engine = get_db_connection()
+    engine = get_db_connection(leitura=True)
     if engine is None: return pd.DataFrame()
-    return pd.read_sql('SELECT id, nome, ativo FROM disciplinas WHERE ativo = TRUE', engine)
+    return _ler_sql('SELECT id, nome, ativo FROM disciplinas WHERE ativo = TRUE', engine)
 
-@st.cache_data
+@cache_por_tags('disciplinas')
 def get_all_disciplinas():
     """Busca todas as disciplinas (ativas e inativas)."""
-    engine = get_db_connection()
+    engine = get_db_connection(leitura=True)
     if engine is None: return pd.DataFrame()
-    return pd.read_sql('SELECT id, nome, ativo FROM disciplinas', engine)
+    return _ler_sql('SELECT id, nome, ativo FROM disciplinas', engine)
 
-@st.cache_data
-def get_status_do_mes(mes_referencia):
-    engine = get_db_connection()
+@cache_por_tags('status_auditoria', 'obras', 'funcionarios', obra='obra_id', mes='mes_referencia')
+def get_status_do_mes(mes_referencia, obra_id=None):
+    inicio, fim = _intervalo_mes(mes_referencia)
+    return _com_meses_fechados('status', inicio, fim, obra_id, _consultar_status, "Mes")
+
+def _consultar_status(inicio, fim, obra_ids=None, pares=None, incluir=False):
+    engine = get_db_connection(leitura=True)
     if engine is None: return pd.DataFrame()
-    query = text("""
+    query = """
     SELECT sa.obra_id, o.nome_obra AS "Obra", sa.funcionario_id, f.nome AS "Funcionario",
            sa.mes_referencia AS "Mes", sa.status AS "Status", sa.comentario AS "Comentario",
            sa.lancamentos_concluidos AS "Lancamentos Concluidos" 
     FROM status_auditoria sa
     LEFT JOIN obras o ON sa.obra_id = o.id
     LEFT JOIN funcionarios f ON sa.funcionario_id = f.id
-    WHERE to_char(sa.mes_referencia, 'YYYY-MM') = :mes;
-    """)
-    df = pd.read_sql(query, engine, params={'mes': mes_referencia})
-    if not df.empty and 'Mes' in df.columns:
-        df['Mes'] = pd.to_datetime(df['Mes']).dt.date
-    return df
-
-@st.cache_data
-def get_folhas_mensais(mes_referencia=None):
-    engine = get_db_connection()
+    WHERE sa.mes_referencia >= :inicio AND sa.mes_referencia < :fim
+    """
+    params = {'inicio': inicio, 'fim': fim}
+    obras = _lista_obras(obra_ids)
+    if obras is not None:
+        query += " AND sa.obra_id = ANY(:obra_ids)"
+        params['obra_ids'] = obras
+    if pares:
+        query += _filtro_pares("sa.obra_id", "sa.mes_referencia", pares, incluir, params)
+    return _ler_sql(query, engine, params)
+
+@cache_por_tags('folhas_mensais', 'obras', obra='obra_id', mes='mes_referencia')
+def get_folhas_mensais(mes_referencia=None, obra_id=None):
+    if mes_referencia:
+        inicio, fim = _intervalo_mes(mes_referencia)
+        return _consultar_folhas(inicio, fim, obra_id)
+    return _consultar_folhas(None, None, obra_id)
+
+@cache_por_tags('folhas_mensais', 'obras', obra='obra_ids', periodo=('mes_inicio', 'mes_fim'))
+def get_folhas_periodo(mes_inicio, mes_fim, obra_ids=None):
+    """Folhas de mes_inicio a mes_fim ('YYYY-MM', inclusive) em uma única consulta."""
+    inicio, fim = _intervalo_periodo(mes_inicio, mes_fim)
+    return _consultar_folhas(inicio, fim, obra_ids)
+
+def _consultar_folhas(inicio, fim, obra_ids=None):
+    engine = get_db_connection(leitura=True)
     if engine is None: return pd.DataFrame()
 
     base_query = """
-    SELECT f.obra_id, o.nome_obra AS "Obra", f.mes_referencia AS "Mes", f.status, f.data_lancamento, f.contador_envios
+    SELECT f.obra_id, o.nome_obra AS "Obra", f.mes_referencia AS "Mes", f.status,
+           (f.data_lancamento AT TIME ZONE :fuso) AS data_lancamento, f.contador_envios
     FROM folhas_mensais f
     LEFT JOIN obras o ON f.obra_id = o.id
     """
-    params = {}
-    if mes_referencia:
-        base_query += " WHERE to_char(f.mes_referencia, 'YYYY-MM') = :mes"
-        params['mes'] = mes_referencia
+    condicoes = []
+    params = {'fuso': _FUSO_HORARIO}
+    if inicio is not None:
+        condicoes.append("f.mes_referencia >= :inicio AND f.mes_referencia < :fim")
+        params['inicio'], params['fim'] = inicio, fim
+    obras = _lista_obras(obra_ids)
+    if obras is not None:
+        condicoes.append("f.obra_id = ANY(:obra_ids)")
+        params['obra_ids'] = obras
+    if condicoes:
+        base_query += " WHERE " + " AND ".join(condicoes)
+
+    return _ler_sql(base_query, engine, params)
+
+@cache_por_tags('holerites_snapshot', 'funcionarios', obra='obra_id', mes='mes_referencia_str')
+def get_snapshot_salarios(mes_referencia_str, obra_id=None):
+    diretorio = _diretorio_meses_fechados()
+    if diretorio and obra_id is not None:
+        par = (int(obra_id), mes_referencia_str[:7])
+        envio = _pares_finalizados(*_intervalo_mes(par[1]), obra_id).get(par)
+        if envio is not None:
+            df, faltando = meses_fechados.ler(diretorio, 'snapshot', {par: envio})
+            if faltando:
+                df = _consultar_snapshot(mes_referencia_str, obra_id)
+                _gravar_mes_fechado(diretorio, 'snapshot', *par, envio, df)
+            return df
+    return _consultar_snapshot(mes_referencia_str, obra_id)
+
+def _consultar_snapshot(mes_referencia_str, obra_id=None):
+    engine = get_db_connection(leitura=True)
+    if engine is None: return pd.DataFrame()
+    query = """
+        SELECT hs.funcionario_id, hs.funcao_na_epoca, hs.salario_base_na_epoca::float8 AS salario_base_na_epoca
+        FROM holerites_snapshot hs
+        WHERE hs.mes_referencia >= :inicio AND hs.mes_referencia < :fim
+    """
+    inicio, fim = _intervalo_mes(mes_referencia_str)
+    params = {'inicio': inicio, 'fim': fim}
+    if obra_id is not None:
+        query += " AND hs.funcionario_id IN (SELECT id FROM funcionarios WHERE obra_id = :obra_id)"
+        params['obra_id'] = int(obra_id)
+    return _ler_sql(query, engine, params)
+
+# --- Meses fechados ---
+# Depois de launch_monthly_sheet a obra-mês não muda mais. Lançamentos, status e snapshot de folhas
+# 'Finalizada' são gravados em Parquet (meses_fechados) e lidos do disco, com memory map, enquanto a
+# folha continuar finalizada; só o restante do período vai ao banco. Meses finalizados antes desta
+# versão (ou por outra instância) são gravados na primeira leitura. Cada arquivo leva o
+# contador_envios da folha, então o de um fechamento anterior ao último nunca é lido. Escritas no
+# escopo (obra, mês) descartam os arquivos, e uma folha devolvida volta a ser lida do banco. Os
+# nomes de obra, funcionário e serviço ficam como estavam no fechamento, como no holerites_snapshot.
+# Diretório em `diretorio_meses_fechados` (padrão .cache/meses_fechados; vazio desliga); caminhos
+# relativos são resolvidos a partir da pasta do projeto, não do diretório de trabalho.
+_CONJUNTOS_POR_TABELA = {'lancamentos': 'lancamentos', 'status_auditoria': 'status', 'holerites_snapshot': 'snapshot'}
+_DIRETORIO_PROJETO = os.path.dirname(os.path.abspath(__file__))
+
+@functools.cache
+def _avisar_sem_pyarrow():
+    print("Meses fechados em disco desligados: o pyarrow não está instalado (ver requirements.txt).", file=sys.stderr)
+
+def _diretorio_meses_fechados():
+    diretorio = _config_banco('diretorio_meses_fechados', '.cache/meses_fechados')
+    if not diretorio:
+        return None
+    if not meses_fechados.PYARROW_AVAILABLE:
+        _avisar_sem_pyarrow()
+        return None
+    return os.path.join(_DIRETORIO_PROJETO, diretorio)
+
+def _pares_finalizados(inicio, fim, obra_ids=None):
+    """{(obra_id, 'YYYY-MM'): contador_envios} das folhas 'Finalizada' no intervalo semiaberto [inicio, fim)."""
+    folhas_df = get_folhas_periodo(inicio.strftime('%Y-%m'), (fim - timedelta(days=1)).strftime('%Y-%m'), obra_ids)
+    if folhas_df.empty:
+        return {}
+    finalizadas = folhas_df[folhas_df['status'] == 'Finalizada']
+    return dict(zip(zip(finalizadas['obra_id'].astype(int), pd.to_datetime(finalizadas['Mes']).dt.strftime('%Y-%m')),
+                    finalizadas['contador_envios'].fillna(0).astype(int)))
+
+def _filtro_pares(coluna_obra, expressao_mes, pares, incluir, params):
+    """Condição SQL que restringe a consulta aos pares (obra_id, 'YYYY-MM') ou os exclui."""
+    pares = sorted(pares)
+    params['pares_obras'] = [obra_id for obra_id, _ in pares]
+    params['pares_meses'] = [_intervalo_mes(mes)[0] for _, mes in pares]
+    return f"""
+    AND {'' if incluir else 'NOT '}EXISTS (
+        SELECT 1 FROM unnest(CAST(:pares_obras AS integer[]), CAST(:pares_meses AS date[])) AS p(obra_id, mes)
+        WHERE p.obra_id = {coluna_obra} AND p.mes = {expressao_mes})"""
+
+def _gravar_mes_fechado(diretorio, conjunto, obra_id, mes, envio, df):
+    try:
+        meses_fechados.gravar(diretorio, conjunto, obra_id, mes, envio, df)
+    except Exception as e:
+        print(f"Falha ao gravar {conjunto} de {mes} (obra {obra_id}) em disco: {e}", file=sys.stderr)
 
-    query = text(base_query)
-    df = pd.read_sql(query, engine, params=params)
+def _com_meses_fechados(conjunto, inicio, fim, obra_ids, consultar, coluna_mes):
+    """Junta os pares (obra, mês) finalizados, lidos do disco, com o restante do intervalo, lido do banco.
 
-    if not df.empty and 'Mes' in df.columns:
-        df['Mes'] = pd.to_datetime(df['Mes']).dt.date
-    return df
+    consultar(inicio, fim, obra_ids, pares, incluir) consulta o banco só nos `pares` (incluir=True)
+    ou fora deles (incluir=False).
+    """
+    diretorio = _diretorio_meses_fechados()
+    pares = _pares_finalizados(inicio, fim, obra_ids) if diretorio else {}
+    if not pares:
+        return consultar(inicio, fim, obra_ids)
+
+    partes = []
+    arquivados_df, faltando = meses_fechados.ler(diretorio, conjunto, pares)
+    if arquivados_df is not None and not arquivados_df.empty:
+        partes.append(arquivados_df)
+    if faltando:
+        novos_df = consultar(inicio, fim, sorted({obra_id for obra_id, _ in faltando}), faltando, True)
+        if not novos_df.empty:
+            partes.append(novos_df)
+        grupos = {}
+        if not novos_df.empty:
+            meses = pd.to_datetime(novos_df[coluna_mes]).dt.strftime('%Y-%m')
+            grupos = {(int(obra_id), mes): df for (obra_id, mes), df in novos_df.groupby([novos_df['obra_id'], meses], sort=False)}
+        for obra_id, mes in faltando:
+            df = grupos.get((obra_id, mes), novos_df.iloc[:0])
+            _gravar_mes_fechado(diretorio, conjunto, obra_id, mes, pares[(obra_id, mes)], df.reset_index(drop=True))
+
+    restante_df = consultar(inicio, fim, obra_ids, pares, False)
+    if not partes:
+        return restante_df
+    if not restante_df.empty:
+        partes.append(restante_df)
+    return pd.concat(partes, ignore_index=True)
+
+def _descartar_mes_fechado(tabela, obra_id, mes):
+    conjunto = _CONJUNTOS_POR_TABELA.get(tabela)
+    diretorio = _diretorio_meses_fechados()
+    if conjunto and diretorio:
+        meses_fechados.descartar(diretorio, obra_id, mes, [conjunto])
+
+cache_utils.ao_invalidar(_descartar_mes_fechado)
+
+def _descartar_meses_fechados():
+    """Remove todos os arquivos de meses fechados (quando invalidações podem ter se perdido)."""
+    diretorio = _diretorio_meses_fechados()
+    if diretorio:
+        meses_fechados.descartar(diretorio)
+
+def _arquivar_mes_fechado(obra_id, mes):
+    """Grava em disco os dados da obra-mês recém-finalizada, lidos do primário."""
+    if not _diretorio_meses_fechados():
+        return
+    try:
+        with ler_do_primario():
+            get_lancamentos_do_mes.sem_cache(mes, obra_id)
+            get_status_do_mes.sem_cache(mes, obra_id)
+            get_snapshot_salarios.sem_cache(mes, obra_id)
+    except Exception as e:
+        print(f"Falha ao arquivar a folha de {mes} (obra {obra_id}): {e}", file=sys.stderr)
+
+# Regras de contrato sobre tipo, salario_base, producao_bruta e gratificacoes: as mesmas de
+# utils.calcular_folha (tests/test_resumo_sql.py confere que os dois concordam no centavo).
+_SQL_REGRAS_FOLHA = """CASE WHEN UPPER(tipo) = 'PRODUCAO' THEN GREATEST(0, producao_bruta - salario_base)
+                ELSE producao_bruta + gratificacoes END AS producao_liquida,
+           gratificacoes AS total_gratificacoes,
+           CASE WHEN UPPER(tipo) = 'PRODUCAO' THEN GREATEST(salario_base, producao_bruta)
+                ELSE salario_base + producao_bruta END + gratificacoes AS salario_a_receber"""
+
+def _sql_resumo_folha(filtro_totais="", filtro_funcionarios=""):
+    """Resumo calculado mês a mês a partir de totais_mensais e do snapshot, com colunas em snake_case.
+
+    Uma linha por funcionário ativo e mês do intervalo [:inicio, :fim) em que já estava admitido.
+    Os totais são agregados uma única vez por funcionário e mês (produção e gratificações lado a
+    lado); o salário e a função vêm do snapshot quando a obra tem folha naquele mês. Os valores
+    saem em numeric arredondado ao centavo (quem lê converte para float8). Os filtros são
+    acrescentados às cláusulas WHERE de totais_mensais (alias tm) e de funcionarios (alias f).
+    """
+    return f"""
+    WITH meses AS (
+        SELECT CAST(m AS date) AS mes
+        FROM generate_series(CAST(:inicio AS timestamp), CAST(:fim AS timestamp) - INTERVAL '1 day', INTERVAL '1 month') m
+    ),
+    totais AS (
+        SELECT tm.funcionario_id, tm.mes,
+               SUM(CASE WHEN tm.is_gratificacao THEN 0 ELSE tm.valor_total END) AS producao_bruta,
+               SUM(CASE WHEN tm.is_gratificacao THEN tm.valor_total ELSE 0 END) AS gratificacoes
+        FROM totais_mensais tm
+        WHERE tm.mes >= :inicio AND tm.mes < :fim{filtro_totais}
+        GROUP BY tm.funcionario_id, tm.mes
+    ),
+    folhas AS (
+        SELECT DISTINCT fm.obra_id, CAST(date_trunc('month', fm.mes_referencia) AS date) AS mes
+        FROM folhas_mensais fm
+        WHERE fm.mes_referencia >= :inicio AND fm.mes_referencia < :fim
+    ),
+    snapshot AS (
+        SELECT hs.funcionario_id, CAST(date_trunc('month', hs.mes_referencia) AS date) AS mes,
+               hs.funcao_na_epoca, hs.salario_base_na_epoca
+        FROM holerites_snapshot hs
+        WHERE hs.mes_referencia >= :inicio AND hs.mes_referencia < :fim
+    ),
+    base AS (
+        SELECT m.mes, f.id, f.obra_id, f.funcao_id, f.nome, o.nome_obra, f.data_admissao, fn.tipo,
+               COALESCE(hs.funcao_na_epoca, fn.funcao) AS funcao,
+               ROUND(COALESCE(hs.salario_base_na_epoca, fn.salario_base, 0), 2) AS salario_base,
+               ROUND(COALESCE(t.producao_bruta, 0), 2) AS producao_bruta,
+               ROUND(COALESCE(t.gratificacoes, 0), 2) AS gratificacoes
+        FROM meses m
+        JOIN funcionarios f ON f.data_admissao < m.mes + INTERVAL '1 month'
+        JOIN obras o ON f.obra_id = o.id
+        JOIN funcoes fn ON f.funcao_id = fn.id
+        LEFT JOIN totais t ON t.funcionario_id = f.id AND t.mes = m.mes
+        LEFT JOIN folhas fo ON fo.obra_id = f.obra_id AND fo.mes = m.mes
+        LEFT JOIN snapshot hs ON hs.funcionario_id = f.id AND hs.mes = m.mes AND fo.obra_id IS NOT NULL
+        WHERE f.ativo = TRUE{filtro_funcionarios}
+    )
+    SELECT mes, id, obra_id, funcao_id, nome, nome_obra, funcao, tipo, data_admissao, salario_base, producao_bruta,
+           {_SQL_REGRAS_FOLHA}
+    FROM base
+    """
+
+# Obra-meses finalizados com resultado congelado em folha_resultado (ver launch_monthly_sheet).
+_SQL_OBRAS_CONGELADAS = """
+    SELECT fm.obra_id, fm.mes_referencia
+    FROM folhas_mensais fm
+    WHERE fm.status = 'Finalizada' AND fm.mes_referencia >= :inicio AND fm.mes_referencia < :fim
+      AND EXISTS (SELECT 1 FROM folha_resultado fr
+                  WHERE fr.obra_id = fm.obra_id AND fr.mes_referencia = fm.mes_referencia)
+"""
 
-@st.cache_data
-def get_snapshot_salarios(mes_referencia_str):
+def _consultar_resumo(inicio, fim, obra_ids=None):
+    """Resumo da folha de cada mês de [inicio, fim): uma linha por funcionário e mês, com a coluna "Mes".
+
+    Único ponto de montagem do resumo; resumo, auditoria, PDF e dashboard leem daqui.
+    """
+    engine = get_db_connection(leitura=True)
+    if engine is None: return pd.DataFrame()
+
+    filtro_totais = ""
+    filtro_funcionarios = ""
+    filtro_congeladas = ""
+    params = {'inicio': inicio, 'fim': fim}
+    obras = _lista_obras(obra_ids)
+    if obras is not None:
+        filtro_totais = " AND tm.obra_id = ANY(:obra_ids)"
+        filtro_funcionarios = " AND f.obra_id = ANY(:obra_ids)"
+        filtro_congeladas = " AND fm.obra_id = ANY(:obra_ids)"
+        params['obra_ids'] = obras
+
+    query = f"""
+    WITH congeladas AS ({_SQL_OBRAS_CONGELADAS}{filtro_congeladas}),
+    resultado AS (
+        SELECT fr.mes_referencia AS mes, fr.funcionario_id AS id, fr.obra_id, fr.funcao_id, fr.nome, fr.nome_obra,
+               fr.funcao, fr.tipo, fr.data_admissao, fr.salario_base, fr.producao_bruta, fr.producao_liquida,
+               fr.total_gratificacoes, fr.salario_a_receber
+        FROM folha_resultado fr
+        JOIN congeladas c ON c.obra_id = fr.obra_id AND c.mes_referencia = fr.mes_referencia
+    ),
+    calculado AS ({_sql_resumo_folha(filtro_totais, filtro_funcionarios)})
+    SELECT mes AS "Mes", id, obra_id, funcao_id, nome AS "NOME", nome_obra AS "OBRA", funcao AS "FUNÇÃO", tipo AS "TIPO",
+           data_admissao,
+           salario_base::float8 AS "SALÁRIO BASE (R$)",
+           producao_bruta::float8 AS "PRODUÇÃO BRUTA (R$)",
+           producao_liquida::float8 AS "PRODUÇÃO LÍQUIDA (R$)",
+           total_gratificacoes::float8 AS "TOTAL GRATIFICAÇÕES (R$)",
+           salario_a_receber::float8 AS "SALÁRIO A RECEBER (R$)"
+    FROM (
+        SELECT * FROM resultado
+        UNION ALL
+        SELECT * FROM calculado ca
+        WHERE NOT EXISTS (SELECT 1 FROM congeladas c WHERE c.obra_id = ca.obra_id AND c.mes_referencia = ca.mes)
+          AND NOT EXISTS (SELECT 1 FROM resultado r WHERE r.id = ca.id AND r.mes = ca.mes)
+    ) resumo
+    ORDER BY mes, nome
+    """
+    return _ler_sql(query, engine, params)
+
+@cache_por_tags('funcionarios', 'funcoes', 'obras', 'lancamentos', 'totais_mensais', 'folhas_mensais', 'holerites_snapshot', 'folha_resultado', obra='obra_id', mes='mes_referencia')
+def get_resumo_folha(mes_referencia, obra_id=None):
+    """Resumo da folha do mês: uma linha por funcionário ativo admitido até o fim do mês.
+
+    Obras com a folha finalizada vêm de folha_resultado, com os valores gravados no fechamento.
+    As demais são calculadas: produção e gratificações de totais_mensais, salário do snapshot
+    (folhas já enviadas) e as regras de contrato PRODUCAO/demais no banco. Com obra_id, só entram
+    os funcionários da obra e os lançamentos feitos nela.
+    """
+    return _consultar_resumo(*_intervalo_mes(mes_referencia), obra_id).drop(columns=['Mes'], errors='ignore')
+
+@cache_por_tags('funcionarios', 'funcoes', 'obras', 'lancamentos', 'totais_mensais', 'folhas_mensais', 'holerites_snapshot', 'folha_resultado', obra='obra_ids', periodo=('mes_inicio', 'mes_fim'))
+def get_resumo_periodo(mes_inicio, mes_fim, obra_ids=None):
+    """Resumo da folha de mes_inicio a mes_fim ('YYYY-MM', inclusive), mês a mês, em uma única consulta.
+
+    Mesmas linhas e valores de get_resumo_folha para cada mês, com a coluna "Mes".
+    """
+    return _consultar_resumo(*_intervalo_periodo(mes_inicio, mes_fim), obra_ids)
+
+def _gravar_folha_resultado(connection, obra_id, mes_inicio):
+    """Grava em folha_resultado o resumo atual da obra-mês, substituindo um anterior."""
+    inicio, fim = _intervalo_mes(str(mes_inicio)[:7])
+    params = {'obra_id': int(obra_id), 'inicio': inicio, 'fim': fim}
+    connection.execute(text("DELETE FROM folha_resultado WHERE obra_id = :obra_id AND mes_referencia = :inicio"), params)
+    connection.execute(text(f"""
+        INSERT INTO folha_resultado (obra_id, mes_referencia, funcionario_id, funcao_id, nome, nome_obra, funcao, tipo,
+                                     data_admissao, salario_base, producao_bruta, producao_liquida,
+                                     total_gratificacoes, salario_a_receber)
+        SELECT :obra_id, :inicio, id, funcao_id, nome, nome_obra, funcao, tipo, data_admissao, salario_base,
+               producao_bruta, producao_liquida, total_gratificacoes, salario_a_receber
+        FROM ({_sql_resumo_folha(" AND tm.obra_id = :obra_id", " AND f.obra_id = :obra_id")}) resumo
+    """), params)
+
+def preencher_folha_resultado():
+    """Grava folha_resultado para as folhas finalizadas que ainda não têm resultado congelado.
+
+    Os valores são recalculados com os dados atuais. Retorna o número de obra-meses preenchidos ou None.
+    """
     engine = get_db_connection()
+    if engine is None: return None
+    try:
+        with engine.connect() as connection:
+            pendentes = connection.execute(text("""
+                SELECT fm.obra_id, fm.mes_referencia FROM folhas_mensais fm
+                WHERE fm.status = 'Finalizada'
+                  AND NOT EXISTS (SELECT 1 FROM folha_resultado fr
+                                  WHERE fr.obra_id = fm.obra_id AND fr.mes_referencia = fm.mes_referencia)
+                ORDER BY fm.mes_referencia, fm.obra_id
+            """)).fetchall()
+        for obra_id, mes_referencia in pendentes:
+            with engine.connect() as connection:
+                with _transacao(connection) as invalidacoes:
+                    _gravar_folha_resultado(connection, obra_id, mes_referencia)
+                    invalidacoes.adicionar('folha_resultado', obra_id=obra_id, mes=mes_referencia)
+        registrar_log(st.session_state.get('user_identifier', 'unknown'), "PREENCHER_FOLHA_RESULTADO", f"{len(pendentes)} folha(s) finalizada(s) preenchida(s).")
+        return len(pendentes)
+    except Exception as e:
+        st.error(f"Erro ao preencher os resultados das folhas finalizadas: {e}")
+        return None
+
+@cache_por_tags('lancamentos', 'totais_mensais', 'obras', 'folhas_mensais', 'folha_resultado', obra='obra_ids', periodo=('mes_inicio', 'mes_fim'))
+def get_totais_mensais(mes_inicio, mes_fim, obra_ids=None):
+    """Totais de lançamentos por obra, funcionário e mês (mantidos por trigger em totais_mensais).
+
+    Nas obra-meses finalizadas os valores vêm de folha_resultado, como foram aprovados, e
+    `lancamentos` fica nulo.
+    """
+    engine = get_db_connection(leitura=True)
     if engine is None: return pd.DataFrame()
-    query = text("""
-        SELECT funcionario_id, funcao_na_epoca, salario_base_na_epoca 
-        FROM holerites_snapshot 
-        WHERE to_char(mes_referencia, 'YYYY-MM') = :mes
-    """)
-    return pd.read_sql(query, engine, params={'mes': mes_referencia_str})
+    inicio, fim = _intervalo_periodo(mes_inicio, mes_fim)
+    params = {'inicio': inicio, 'fim': fim}
+    filtro_totais = filtro_congeladas = ""
+    obras = _lista_obras(obra_ids)
+    if obras is not None:
+        filtro_totais = " AND tm.obra_id = ANY(:obra_ids)"
+        filtro_congeladas = " AND fm.obra_id = ANY(:obra_ids)"
+        params['obra_ids'] = obras
+    query = f"""
+    WITH congeladas AS ({_SQL_OBRAS_CONGELADAS}{filtro_congeladas})
+    SELECT tm.obra_id, o.nome_obra AS "Obra", tm.funcionario_id, tm.mes AS "Mes", tm.is_gratificacao,
+           tm.valor_total::float8 AS valor_total, tm.lancamentos
+    FROM totais_mensais tm
+    LEFT JOIN obras o ON tm.obra_id = o.id
+    WHERE tm.mes >= :inicio AND tm.mes < :fim AND tm.lancamentos > 0{filtro_totais}
+      AND NOT EXISTS (SELECT 1 FROM congeladas c WHERE c.obra_id = tm.obra_id AND c.mes_referencia = tm.mes)
+    UNION ALL
+    SELECT fr.obra_id, o.nome_obra, fr.funcionario_id, fr.mes_referencia, v.is_gratificacao,
+           v.valor_total::float8, NULL
+    FROM folha_resultado fr
+    JOIN congeladas c ON c.obra_id = fr.obra_id AND c.mes_referencia = fr.mes_referencia
+    LEFT JOIN obras o ON fr.obra_id = o.id
+    CROSS JOIN LATERAL (VALUES (FALSE, fr.producao_bruta), (TRUE, fr.total_gratificacoes)) AS v(is_gratificacao, valor_total)
+    WHERE v.valor_total <> 0
+    """
+    return _compactar(_ler_sql(query, engine, params), ['Obra'])
+
+def reconstruir_totais_mensais():
+    """Recalcula totais_mensais a partir de lancamentos. Retorna o número de linhas geradas ou None."""
+    engine = get_db_connection()
+    if engine is None: return None
+    try:
+        with engine.connect() as connection:
+            with _transacao(connection) as invalidacoes:
+                linhas = connection.execute(text("SELECT reconstruir_totais_mensais()")).scalar()
+                invalidacoes.adicionar('totais_mensais')
+        registrar_log(st.session_state.get('user_identifier', 'unknown'), "RECONSTRUIR_TOTAIS_MENSAIS", f"{linhas} linhas recalculadas.")
+        return linhas
+    except Exception as e:
+        st.error(f"Erro ao reconstruir os totais mensais: {e}")
+        return None
     
 def atualizar_lancamento_completo(lancamento_id, data_servico, servico_id, servico_diverso_desc, quantidade, valor_unitario, observacao):
     engine = get_db_connection()
     if engine is None: return False
     try:
         with engine.connect() as connection:
-            with connection.begin() as transaction:
+            with _transacao(connection) as invalidacoes:
                 query = text("""
-                    UPDATE lancamentos 
+                    UPDATE lancamentos l
                     SET data_servico = :data, 
                         servico_id = :serv_id, 
                         servico_diverso_descricao = :serv_div, 
                         quantidade = :qtd, 
                         valor_unitario = :val, 
                         observacao = :obs 
-                    WHERE id = :id
+                    FROM lancamentos anterior
+                    WHERE l.id = :id AND anterior.id = l.id
+                    RETURNING l.obra_id, anterior.data_servico
                 """)
-                connection.execute(query, {
+                alterado = connection.execute(query, {
                     'data': data_servico,
                     'serv_id': servico_id,
                     'serv_div': servico_diverso_desc,
@@ -243,33 +1203,121 @@ def atualizar_lancamento_completo(lancamento_id, data_servico, servico_id, servi
                     'val': valor_unitario,
                     'obs': observacao,
                     'id': lancamento_id
-                })
+                }).fetchone()
+                if alterado is not None:
+                    invalidacoes.adicionar('lancamentos', obra_id=alterado[0], mes=alterado[1])
+                    invalidacoes.adicionar('lancamentos', obra_id=alterado[0], mes=data_servico)
         
         registrar_log(st.session_state.get('user_identifier', 'unknown'), "EDITAR_LANCAMENTO", f"Lançamento ID {lancamento_id} editado completamente.")
-        st.cache_data.clear()
         return True
     except Exception as e:
         st.error(f"Erro ao atualizar lançamento: {e}")
         return False
         
-def registrar_log(usuario, acao, detalhes="", tabela_afetada=None, id_registro_afetado=None):
+_LOG_LOTE_MAXIMO = 50
+_LOG_INTERVALO_SEGUNDOS = 2.0
+_LOG_PENDENTES_MAXIMO = 5000
+
+def _inserir_logs(connection, entradas):
+    """Grava as entradas em log_auditoria com um único INSERT de várias linhas."""
+    valores = []
+    params = {}
+    for i, entrada in enumerate(entradas):
+        valores.append(f"(:usuario_{i}, :acao_{i}, :detalhes_{i}, :tabela_afetada_{i}, :id_registro_afetado_{i})")
+        for chave, valor in entrada.items():
+            params[f"{chave}_{i}"] = valor
+    query = text(
+        "INSERT INTO log_auditoria (usuario, acao, detalhes, tabela_afetada, id_registro_afetado) VALUES "
+        + ", ".join(valores)
+    )
+    connection.execute(query, params)
+
+class _EscritorLogs:
+    """Acumula logs fora de transação e os grava em lote numa thread de fundo.
+
+    Descarrega quando o lote atinge _LOG_LOTE_MAXIMO ou a cada _LOG_INTERVALO_SEGUNDOS.
+    Em caso de falha as entradas voltam para a fila (até _LOG_PENDENTES_MAXIMO).
+    """
+
+    def __init__(self, inserir, descricao):
+        self._inserir = inserir
+        self._descricao = descricao
+        self._pendentes = []
+        self._engine = None
+        self._condicao = threading.Condition()
+        self._thread = None
+
+    def adicionar(self, entrada, engine):
+        with self._condicao:
+            self._engine = engine
+            self._pendentes.append(entrada)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._executar, name="escritor-logs", daemon=True)
+                self._thread.start()
+            if len(self._pendentes) >= _LOG_LOTE_MAXIMO:
+                self._condicao.notify()
+
+    def _executar(self):
+        while True:
+            with self._condicao:
+                self._condicao.wait_for(lambda: len(self._pendentes) >= _LOG_LOTE_MAXIMO, timeout=_LOG_INTERVALO_SEGUNDOS)
+            self.descarregar()
+
+    def descarregar(self):
+        with self._condicao:
+            lote, self._pendentes = self._pendentes, []
+            engine = self._engine
+        if not lote or engine is None:
+            return True
+        try:
+            with engine.begin() as connection:
+                for inicio in range(0, len(lote), _LOG_LOTE_MAXIMO):
+                    self._inserir(connection, lote[inicio:inicio + _LOG_LOTE_MAXIMO])
+            return True
+        except Exception as e:
+            with self._condicao:
+                self._pendentes = (lote + self._pendentes)[-_LOG_PENDENTES_MAXIMO:]
+            print(f"Falha ao gravar {len(lote)} {self._descricao}: {e}", file=sys.stderr)
+            return False
+
+def _inserir_metricas(connection, entradas):
+    """Grava as métricas em query_metrics com um único INSERT de várias linhas."""
+    colunas = ['funcao', 'pagina', 'duracao_ms', 'linhas', 'bytes', 'cache', 'consultas', 'erro', 'sql', 'parametros', 'plano']
+    valores = []
+    params = {}
+    for i, entrada in enumerate(entradas):
+        valores.append("(" + ", ".join(f":{c}_{i}" for c in colunas) + ")")
+        for chave in colunas:
+            params[f"{chave}_{i}"] = entrada[chave]
+    connection.execute(text(f"INSERT INTO query_metrics ({', '.join(colunas)}) VALUES " + ", ".join(valores)), params)
+
+_escritor_logs = _EscritorLogs(_inserir_logs, "log(s) de auditoria")
+atexit.register(_escritor_logs.descarregar)
+_escritor_metricas = _EscritorLogs(_inserir_metricas, "métrica(s) de consulta")
+atexit.register(_escritor_metricas.descarregar)
+
+def descarregar_logs():
+    """Grava imediatamente os logs pendentes do escritor em lote."""
+    return _escritor_logs.descarregar()
+
+def registrar_log(usuario, acao, detalhes="", tabela_afetada=None, id_registro_afetado=None, connection=None):
+    """Registra uma ação em log_auditoria.
+
+    Com `connection`, o INSERT entra na transação do chamador (e falha junto com ela).
+    Sem ela, a entrada vai para o escritor em lote, sem ocupar outra conexão do pool.
+    """
+    if id_registro_afetado is not None:
+        id_registro_afetado = int(id_registro_afetado)
+    entrada = {
+        'usuario': usuario, 'acao': acao, 'detalhes': detalhes,
+        'tabela_afetada': tabela_afetada, 'id_registro_afetado': id_registro_afetado
+    }
+    if connection is not None:
+        _inserir_logs(connection, [entrada])
+        return
     engine = get_db_connection()
     if engine is None: return
-    try:
-        if id_registro_afetado is not None:
-            id_registro_afetado = int(id_registro_afetado)
-        with engine.connect() as connection:
-            with connection.begin() as transaction:
-                query = text("""
-                    INSERT INTO log_auditoria (usuario, acao, detalhes, tabela_afetada, id_registro_afetado)
-                    VALUES (:usuario, :acao, :detalhes, :tabela_afetada, :id_registro_afetado)
-                """)
-                connection.execute(query, {
-                    'usuario': usuario, 'acao': acao, 'detalhes': detalhes,
-                    'tabela_afetada': tabela_afetada, 'id_registro_afetado': id_registro_afetado
-                })
-    except Exception as e:
-        st.toast(f"Falha ao registrar log: {e}", icon="⚠️")
+    _escritor_logs.adicionar(entrada, engine)
 
 def upsert_status_auditoria(obra_id, funcionario_id, mes_referencia, status=None, comentario=None, lancamentos_concluidos=None):
     engine = get_db_connection()
@@ -280,55 +1328,26 @@ def upsert_status_auditoria(obra_id, funcionario_id, mes_referencia, status=None
 
     mes_dt = pd.to_datetime(mes_referencia, format='%Y-%m').date()
 
-    set_clauses = []
-    update_params = {}
-    if status is not None:
-        set_clauses.append("status = EXCLUDED.status")
-        update_params['status'] = status
-    if comentario is not None:
-        set_clauses.append("comentario = EXCLUDED.comentario")
-        update_params['comentario'] = comentario
-    if lancamentos_concluidos is not None:
-        set_clauses.append("lancamentos_concluidos = EXCLUDED.lancamentos_concluidos")
-        update_params['lancamentos_concluidos'] = lancamentos_concluidos
-
-    set_clause_str = ", ".join(set_clauses)
-    if not set_clause_str: 
-         return False
-
     try:
         with engine.connect() as connection:
-            with connection.begin() as transaction:
-                query_insert = text(f"""
-                    INSERT INTO status_auditoria (obra_id, funcionario_id, mes_referencia, status, comentario, lancamentos_concluidos)
-                    VALUES (:obra_id, :func_id, :mes_ref, :status, :comentario, :lanc_concluidos)
+            with _transacao(connection) as invalidacoes:
+                # Campos passados como None mantêm o valor atual (ou o padrão, em linha nova).
+                query = text("""
+                    INSERT INTO status_auditoria AS sa (obra_id, funcionario_id, mes_referencia, status, comentario, lancamentos_concluidos)
+                    VALUES (:obra_id, :func_id, :mes_ref,
+                            COALESCE(CAST(:status AS TEXT), 'A Revisar'),
+                            COALESCE(CAST(:comentario AS TEXT), ''),
+                            COALESCE(CAST(:lanc_concluidos AS BOOLEAN), FALSE))
                     ON CONFLICT (obra_id, funcionario_id, mes_referencia)
-                    DO UPDATE SET {set_clause_str};
+                    DO UPDATE SET status = COALESCE(CAST(:status AS TEXT), sa.status),
+                                  comentario = COALESCE(CAST(:comentario AS TEXT), sa.comentario),
+                                  lancamentos_concluidos = COALESCE(CAST(:lanc_concluidos AS BOOLEAN), sa.lancamentos_concluidos)
                 """)
-
-                current_record_query = text("""
-                    SELECT status, comentario, lancamentos_concluidos 
-                    FROM status_auditoria 
-                    WHERE obra_id = :obra_id AND funcionario_id = :func_id AND mes_referencia = :mes_ref
-                """)
-                current_record = connection.execute(current_record_query, {'obra_id': obra_id, 'func_id': funcionario_id, 'mes_ref': mes_dt}).fetchone()
-
-                current_status = current_record[0] if current_record else 'A Revisar'
-                current_comentario = current_record[1] if current_record else ''
-                current_lanc_concluidos = current_record[2] if current_record else False
-
-                insert_params = {
-                    'obra_id': obra_id, 
-                    'func_id': funcionario_id, 
-                    'mes_ref': mes_dt, 
-                    'status': status if status is not None else current_status, 
-                    'comentario': comentario if comentario is not None else current_comentario,
-                    'lanc_concluidos': lancamentos_concluidos if lancamentos_concluidos is not None else current_lanc_concluidos
-                }
-
-                insert_params.update(update_params)
-
-                connection.execute(query_insert, insert_params)
+                connection.execute(query, {
+                    'obra_id': obra_id, 'func_id': funcionario_id, 'mes_ref': mes_dt,
+                    'status': status, 'comentario': comentario, 'lanc_concluidos': lancamentos_concluidos
+                })
+                invalidacoes.adicionar('status_auditoria', obra_id=obra_id, mes=mes_dt)
 
         details = []
         if status is not None: details.append(f"Status para '{status}'")
@@ -339,22 +1358,81 @@ def upsert_status_auditoria(obra_id, funcionario_id, mes_referencia, status=None
                       "UPSERT_STATUS_AUDITORIA", 
                       f"Registro para func_id {funcionario_id} na obra_id {obra_id} ({mes_referencia}) atualizado: {log_detail_str}")
         
-        st.cache_data.clear() 
         return True
     except Exception as e:
         st.error(f"Erro ao salvar o status/comentário/conclusão: {e}")
         return False
 
+def upsert_status_auditoria_em_lote(obra_id, mes_referencia, alteracoes):
+    """Aplica várias alterações de status_auditoria da obra/mês em uma única instrução.
+
+    `alteracoes` é uma lista de dicts com 'funcionario_id' e, opcionalmente, 'status',
+    'comentario' e 'lancamentos_concluidos'; chaves ausentes ou None mantêm o valor atual.
+    """
+    engine = get_db_connection()
+    if engine is None: return False
+    # Uma linha por funcionário: o ON CONFLICT não aceita a mesma chave duas vezes na instrução.
+    por_funcionario = {}
+    for alteracao in alteracoes:
+        atual = por_funcionario.setdefault(int(alteracao['funcionario_id']), {'funcionario_id': int(alteracao['funcionario_id'])})
+        atual.update({c: v for c, v in alteracao.items() if v is not None})
+    alteracoes = [a for a in por_funcionario.values() if any(a.get(c) is not None for c in ('status', 'comentario', 'lancamentos_concluidos'))]
+    if not alteracoes:
+        st.warning("Nenhuma atualização solicitada para upsert_status_auditoria_em_lote.")
+        return False
+
+    mes_dt = pd.to_datetime(mes_referencia, format='%Y-%m').date()
+    params = {
+        'obra_id': obra_id, 'mes_ref': mes_dt,
+        'func_ids': [int(a['funcionario_id']) for a in alteracoes],
+        'status': [a.get('status') for a in alteracoes],
+        'comentarios': [a.get('comentario') for a in alteracoes],
+        'concluidos': [a.get('lancamentos_concluidos') for a in alteracoes],
+    }
+
+    try:
+        with engine.connect() as connection:
+            with _transacao(connection) as invalidacoes:
+                query = text("""
+                    INSERT INTO status_auditoria (obra_id, funcionario_id, mes_referencia, status, comentario, lancamentos_concluidos)
+                    SELECT :obra_id, u.funcionario_id, :mes_ref,
+                           COALESCE(u.status, atual.status, 'A Revisar'),
+                           COALESCE(u.comentario, atual.comentario, ''),
+                           COALESCE(u.concluido, atual.lancamentos_concluidos, FALSE)
+                    FROM unnest(CAST(:func_ids AS INTEGER[]), CAST(:status AS TEXT[]),
+                                CAST(:comentarios AS TEXT[]), CAST(:concluidos AS BOOLEAN[]))
+                         AS u(funcionario_id, status, comentario, concluido)
+                    LEFT JOIN status_auditoria atual
+                           ON atual.obra_id = :obra_id AND atual.funcionario_id = u.funcionario_id
+                          AND atual.mes_referencia = :mes_ref
+                    ON CONFLICT (obra_id, funcionario_id, mes_referencia)
+                    DO UPDATE SET status = EXCLUDED.status,
+                                  comentario = EXCLUDED.comentario,
+                                  lancamentos_concluidos = EXCLUDED.lancamentos_concluidos
+                """)
+                connection.execute(query, params)
+                invalidacoes.adicionar('status_auditoria', obra_id=obra_id, mes=mes_dt)
+
+        registrar_log(st.session_state.get('user_identifier', 'unknown'),
+                      "UPSERT_STATUS_AUDITORIA_LOTE",
+                      f"{len(alteracoes)} registro(s) na obra_id {obra_id} ({mes_referencia}) atualizados: func_ids {params['func_ids']}")
+
+        return True
+    except Exception as e:
+        st.error(f"Erro ao salvar os status em lote: {e}")
+        return False
+
 def launch_monthly_sheet(obra_id, mes_referencia_dt, obra_nome):
     engine = get_db_connection()
     if engine is None: return False
     mes_inicio = mes_referencia_dt.strftime('%Y-%m-01')
+    _, mes_fim = _intervalo_mes(mes_referencia_dt.strftime('%Y-%m'))
 
     try:
         with engine.connect() as connection:
-            with connection.begin() as transaction:
-                query_arquivar = text("UPDATE lancamentos SET arquivado = TRUE WHERE obra_id = :obra_id AND date_trunc('month', data_servico) = :mes_inicio;")
-                connection.execute(query_arquivar, {'obra_id': obra_id, 'mes_inicio': mes_inicio})
+            with _transacao(connection) as invalidacoes:
+                query_arquivar = text("UPDATE lancamentos SET arquivado = TRUE WHERE obra_id = :obra_id AND data_servico >= :mes_inicio AND data_servico < :mes_fim;")
+                connection.execute(query_arquivar, {'obra_id': obra_id, 'mes_inicio': mes_inicio, 'mes_fim': mes_fim})
 
                 query_update_status = text("UPDATE folhas_mensais SET status = 'Finalizada' WHERE obra_id = :obra_id AND mes_referencia = :mes_inicio;")
                 connection.execute(query_update_status, {'obra_id': obra_id, 'mes_inicio': mes_inicio})
@@ -368,10 +1446,15 @@ def launch_monthly_sheet(obra_id, mes_referencia_dt, obra_nome):
                     ON CONFLICT (mes_referencia, funcionario_id) DO NOTHING;
                 """)
                 connection.execute(query_snapshot, {'obra_id': obra_id, 'mes_inicio': mes_inicio})
+                _gravar_folha_resultado(connection, obra_id, mes_inicio)
 
-                registrar_log(st.session_state.get('user_identifier', 'unknown'), "FINALIZAR_FOLHA", f"Folha para {obra_nome} ({mes_referencia_dt.strftime('%Y-%m')}) finalizada com snapshot gravado.")
+                registrar_log(st.session_state.get('user_identifier', 'unknown'), "FINALIZAR_FOLHA", f"Folha para {obra_nome} ({mes_referencia_dt.strftime('%Y-%m')}) finalizada com snapshot gravado.", connection=connection)
+                invalidacoes.adicionar('lancamentos', obra_id=obra_id, mes=mes_referencia_dt)
+                invalidacoes.adicionar('folhas_mensais', obra_id=obra_id, mes=mes_referencia_dt)
+                invalidacoes.adicionar('holerites_snapshot', mes=mes_referencia_dt)
+                invalidacoes.adicionar('folha_resultado', obra_id=obra_id, mes=mes_referencia_dt)
 
-        st.cache_data.clear()
+        _arquivar_mes_fechado(obra_id, mes_referencia_dt.strftime('%Y-%m'))
         return True
     except Exception as e:
         st.error(f"Ocorreu um erro ao finalizar a folha: {e}")
@@ -385,12 +1468,12 @@ def devolver_folha_para_revisao(obra_id, mes_referencia):
 
     try:
         with engine.connect() as connection:
-            with connection.begin() as transaction:
+            with _transacao(connection) as invalidacoes:
                 query = text("UPDATE folhas_mensais SET status = 'Devolvida para Revisão' WHERE obra_id = :obra_id AND mes_referencia = :mes_ref")
                 connection.execute(query, {'obra_id': obra_id, 'mes_ref': mes_dt})
+                invalidacoes.adicionar('folhas_mensais', obra_id=obra_id, mes=mes_dt)
         registrar_log(st.session_state.get('user_identifier', 'unknown'), "DEVOLVER_FOLHA", f"Folha da obra_id {obra_id} devolvida para revisão.")
         
-        st.cache_data.clear() 
         return True
     except Exception as e:
         st.error(f"Ocorreu um erro ao devolver a folha: {e}")
@@ -403,7 +1486,7 @@ def enviar_folha_para_auditoria(obra_id, mes_referencia, obra_nome):
     
     try:
         with engine.connect() as connection:
-            with connection.begin() as transaction:
+            with _transacao(connection) as invalidacoes:
                 query_insert = text("""
                     INSERT INTO folhas_mensais (obra_id, mes_referencia, status, data_lancamento, contador_envios)
                     VALUES (:obra_id, :mes_ref, 'Enviada para Auditoria', NOW(), 1)
@@ -411,9 +1494,9 @@ def enviar_folha_para_auditoria(obra_id, mes_referencia, obra_nome):
                     DO UPDATE SET status = 'Enviada para Auditoria', data_lancamento = NOW(), contador_envios = folhas_mensais.contador_envios + 1;
                 """)
                 connection.execute(query_insert, {'obra_id': obra_id, 'mes_ref': mes_dt})
+                invalidacoes.adicionar('folhas_mensais', obra_id=obra_id, mes=mes_dt)
         registrar_log(st.session_state.get('user_identifier', 'unknown'), "ENVIAR_FOLHA_AUDITORIA", f"Folha de {obra_nome} enviada.")
         
-        st.cache_data.clear() 
         return True
     except Exception as e:
         st.error(f"Ocorreu um erro ao enviar a folha: {e}")
@@ -430,7 +1513,7 @@ def salvar_novos_lancamentos(df_para_salvar):
     
     try:
         with engine.connect() as connection:
-            with connection.begin() as transaction:
+            with _transacao(connection) as invalidacoes:
                 
                 status_query = text("SELECT status FROM folhas_mensais WHERE obra_id = :obra_id AND mes_referencia = :mes_ref")
                 result = connection.execute(status_query, {'obra_id': obra_id, 'mes_ref': mes_ref_dt}).fetchone()
@@ -447,6 +1530,8 @@ def salvar_novos_lancamentos(df_para_salvar):
                             :servico_diverso_descricao, :quantidade, :valor_unitario, :observacao, :data_lancamento)
                 """)
                 connection.execute(query, lancamentos_dict)
+                for item in lancamentos_dict:
+                    invalidacoes.adicionar('lancamentos', obra_id=item['obra_id'], mes=item['data_servico'])
             
         registrar_log(st.session_state.get('user_identifier', 'unknown'), "SALVAR_LANCAMENTOS", f"{len(lancamentos_dict)} lançamentos salvos.")
         return True
@@ -458,6 +1543,266 @@ def salvar_novos_lancamentos(df_para_salvar):
         st.error(f"Ocorreu um erro ao salvar na base de dados: {e}")
         return False
         
+_COLUNAS_CARGA_LANCAMENTOS = ['data_servico', 'obra_id', 'funcionario_id', 'servico_id', 'servico_diverso_descricao',
+                              'quantidade', 'valor_unitario', 'observacao', 'data_lancamento']
+_COLUNAS_OBRIGATORIAS_CARGA = ['data_servico', 'obra_id', 'funcionario_id', 'quantidade', 'valor_unitario']
+
+def _cabecalho_csv(arquivo):
+    """Nomes das colunas de um CSV aberto em modo texto ou binário; o arquivo volta ao início."""
+    binario = isinstance(arquivo.read(0), bytes)
+    texto = io.TextIOWrapper(arquivo, encoding='utf-8-sig', newline='') if binario else arquivo
+    try:
+        cabecalho = next(csv.reader(texto), [])
+    finally:
+        if binario:
+            texto.detach()
+    arquivo.seek(0)
+    return [c.strip().lstrip('\ufeff') for c in cabecalho]
+
+def carregar_lancamentos_em_massa(origem, descricao_origem=""):
+    """Insere muitos lançamentos de uma vez via COPY para uma tabela temporária.
+
+    `origem` pode ser um DataFrame ou um CSV (caminho ou arquivo aberto) com cabeçalho usando
+    os nomes de _COLUNAS_CARGA_LANCAMENTOS; o CSV é enviado ao banco sem passar pelo pandas.
+    A verificação de folha fechada é feita de uma vez para todos os pares obra/mês do lote,
+    e tudo é gravado em uma única transação. Retorna o número de linhas inseridas ou None.
+    """
+    engine = get_db_connection()
+    if engine is None: return None
+
+    arquivo_aberto = None
+    try:
+        if isinstance(origem, pd.DataFrame):
+            colunas = [c for c in _COLUNAS_CARGA_LANCAMENTOS if c in origem.columns]
+            buffer = io.StringIO()
+            origem[colunas].to_csv(buffer, index=False, header=True, date_format='%Y-%m-%d %H:%M:%S%z')
+            buffer.seek(0)
+        else:
+            buffer = origem
+            if isinstance(origem, (str, os.PathLike)):
+                buffer = arquivo_aberto = open(origem, 'r', encoding='utf-8', newline='')
+            colunas = _cabecalho_csv(buffer)
+
+        desconhecidas = [c for c in colunas if c not in _COLUNAS_CARGA_LANCAMENTOS]
+        faltando = [c for c in _COLUNAS_OBRIGATORIAS_CARGA if c not in colunas]
+        if desconhecidas or faltando:
+            raise ValueError(f"Colunas inválidas na carga. Desconhecidas: {desconhecidas}. Faltando: {faltando}.")
+
+        with engine.connect() as connection:
+            with _transacao(connection) as invalidacoes:
+                connection.execute(text("""
+                    CREATE TEMP TABLE _carga_lancamentos (
+                        data_servico DATE, obra_id NUMERIC, funcionario_id NUMERIC, servico_id NUMERIC,
+                        servico_diverso_descricao TEXT, quantidade NUMERIC, valor_unitario NUMERIC,
+                        observacao TEXT, data_lancamento TIMESTAMPTZ
+                    ) ON COMMIT DROP
+                """))
+                cursor = connection.connection.cursor()
+                cursor.copy_expert(
+                    f"COPY _carga_lancamentos ({', '.join(colunas)}) FROM STDIN WITH (FORMAT csv, HEADER true)",
+                    buffer
+                )
+
+                condicao_nula = " OR ".join(f"{c} IS NULL" for c in _COLUNAS_OBRIGATORIAS_CARGA)
+                invalidas = connection.execute(text(f"SELECT COUNT(*) FROM _carga_lancamentos WHERE {condicao_nula}")).scalar()
+                if invalidas:
+                    raise ValueError(f"{invalidas} linha(s) sem {', '.join(_COLUNAS_OBRIGATORIAS_CARGA)}.")
+
+                pares = connection.execute(text("""
+                    SELECT DISTINCT c.obra_id::integer AS obra_id, date_trunc('month', c.data_servico)::date AS mes, f.status
+                    FROM _carga_lancamentos c
+                    LEFT JOIN folhas_mensais f
+                           ON f.obra_id = c.obra_id AND f.mes_referencia = date_trunc('month', c.data_servico)::date
+                """)).fetchall()
+                fechadas = [p for p in pares if p.status in ('Enviada para Auditoria', 'Finalizada')]
+                if fechadas:
+                    lista = ", ".join(f"obra_id {p.obra_id} em {p.mes.strftime('%Y-%m')} ({p.status})" for p in fechadas)
+                    raise FolhaFechadaException(f"Não foi possível carregar: folhas já enviadas ou finalizadas: {lista}.")
+
+                inseridas = connection.execute(text("""
+                    INSERT INTO lancamentos (data_servico, obra_id, funcionario_id, servico_id,
+                                             servico_diverso_descricao, quantidade, valor_unitario, observacao, data_lancamento)
+                    SELECT data_servico, obra_id::integer, funcionario_id::integer, servico_id::integer,
+                           servico_diverso_descricao, quantidade, valor_unitario, observacao, COALESCE(data_lancamento, NOW())
+                    FROM _carga_lancamentos
+                """)).rowcount
+
+                registrar_log(st.session_state.get('user_identifier', 'unknown'), "CARGA_LANCAMENTOS",
+                              f"{inseridas} lançamentos carregados em massa. {descricao_origem}".strip(),
+                              connection=connection)
+                for par in pares:
+                    invalidacoes.adicionar('lancamentos', obra_id=par.obra_id, mes=par.mes)
+
+        return inseridas
+
+    except FolhaFechadaException as ffe:
+        st.error(str(ffe))
+        return None
+    except Exception as e:
+        st.error(f"Erro na carga em massa de lançamentos: {e}")
+        return None
+    finally:
+        if arquivo_aberto is not None:
+            arquivo_aberto.close()
+
+COLUNAS_PLANILHA_LANCAMENTOS = ['Data', 'Funcionário', 'Tipo', 'Disciplina', 'Serviço', 'Quantidade', 'Valor Unitário', 'Observação']
+_TIPOS_PLANILHA = {'SERVICO': 'Serviço', 'DIVERSO': 'Diverso', 'GRATIFICACAO': 'Gratificação'}
+_SERVICO_AMBIGUO = object()
+
+def _normalizar_texto(valor):
+    """Chave de busca: sem acentos, maiúsculas e espaços simples."""
+    if valor is None or (isinstance(valor, float) and pd.isna(valor)):
+        return ''
+    texto = unicodedata.normalize('NFKD', str(valor)).encode('ascii', 'ignore').decode('ascii')
+    return ' '.join(texto.upper().split())
+
+def _ler_planilha_em_lotes(arquivo, nome_arquivo, tamanho_lote):
+    """Gera DataFrames de até `tamanho_lote` linhas de um CSV ou XLSX, sem carregar o arquivo inteiro."""
+    if nome_arquivo.lower().endswith('.xlsx'):
+        if not OPENPYXL_AVAILABLE:
+            raise ValueError("A biblioteca 'openpyxl' não está instalada; envie a planilha em CSV.")
+        planilha = load_workbook(arquivo, read_only=True, data_only=True)
+        try:
+            linhas = planilha.worksheets[0].iter_rows(values_only=True)
+            cabecalho = [str(c).strip() if c is not None else '' for c in next(linhas, [])]
+            lote = []
+            for linha in linhas:
+                if all(v is None for v in linha):
+                    continue
+                lote.append(linha[:len(cabecalho)])
+                if len(lote) >= tamanho_lote:
+                    yield pd.DataFrame(lote, columns=cabecalho)
+                    lote = []
+            if lote:
+                yield pd.DataFrame(lote, columns=cabecalho)
+        finally:
+            planilha.close()
+    else:
+        for lote in pd.read_csv(arquivo, sep=None, engine='python', dtype=str, chunksize=tamanho_lote, encoding='utf-8-sig'):
+            lote.columns = [str(c).strip() for c in lote.columns]
+            yield lote
+
+def _celula_vazia(valor):
+    return valor is None or (isinstance(valor, str) and not valor.strip()) or (not isinstance(valor, str) and pd.isna(valor))
+
+def _ler_datas_planilha(valores):
+    """Datas da planilha valor a valor: dd/mm/aaaa e, se não casar, ISO (aaaa-mm-dd); datas do XLSX passam direto."""
+    texto = valores.map(lambda v: v.strip() if isinstance(v, str) else v)
+    data = pd.to_datetime(texto, format='%d/%m/%Y', errors='coerce')
+    return data.fillna(pd.to_datetime(texto.where(data.isna()), format='ISO8601', errors='coerce'))
+
+def _escolher_servico(por_disciplina, disciplina):
+    """(id, valor) do serviço; a disciplina só é exigida quando a descrição existe em mais de uma."""
+    if not isinstance(por_disciplina, dict):
+        return None
+    if disciplina:
+        return por_disciplina.get(disciplina)
+    if len(por_disciplina) == 1:
+        return next(iter(por_disciplina.values()))
+    return _SERVICO_AMBIGUO
+
+def _validar_lote_planilha(lote, primeira_linha, funcionarios_por_nome, servicos_por_nome, inicio, fim):
+    colunas = {_normalizar_texto(c): c for c in lote.columns}
+    df = pd.DataFrame({nome: lote[colunas[_normalizar_texto(nome)]] if _normalizar_texto(nome) in colunas else None
+                       for nome in COLUNAS_PLANILHA_LANCAMENTOS})
+    df['linha'] = range(primeira_linha, primeira_linha + len(df))
+
+    tipo = df['Tipo'].map(_normalizar_texto).replace('', 'SERVICO')
+    df['Tipo'] = tipo.map(_TIPOS_PLANILHA)
+    data = _ler_datas_planilha(df['Data'])
+    quantidade = df['Quantidade'].map(utils.ler_numero).astype(float)
+    valor_informado = df['Valor Unitário'].map(utils.ler_numero).astype(float)
+    quantidade_vazia = df['Quantidade'].map(_celula_vazia).astype(bool)
+    valor_vazio = df['Valor Unitário'].map(_celula_vazia).astype(bool)
+    descricao = df['Serviço'].fillna('').astype(str).str.strip()
+    observacao = df['Observação'].fillna('').astype(str).str.strip()
+
+    funcionario_id = df['Funcionário'].map(_normalizar_texto).map(funcionarios_por_nome)
+    disciplina = df['Disciplina'].map(_normalizar_texto)
+    servico = pd.Series([_escolher_servico(candidatos, d) for candidatos, d in zip(descricao.map(_normalizar_texto).map(servicos_por_nome), disciplina)],
+                        index=df.index, dtype=object)
+    servico_ambiguo = servico.map(lambda s: s is _SERVICO_AMBIGUO)
+    servico_id = servico.map(lambda s: s[0] if isinstance(s, tuple) else None)
+    valor_tabela = servico.map(lambda s: s[1] if isinstance(s, tuple) else None).astype(float)
+
+    e_servico = df['Tipo'] == 'Serviço'
+    e_gratificacao = df['Tipo'] == 'Gratificação'
+    # Só células vazias recebem o padrão (1 na gratificação, preço da tabela no serviço); texto inválido é erro.
+    quantidade_invalida = ~quantidade_vazia & quantidade.isna()
+    quantidade = quantidade.where(~e_gratificacao | ~quantidade_vazia, 1.0)
+    valor_invalido = ~valor_vazio & valor_informado.isna()
+    valor_unitario = valor_informado.where(~e_servico | ~valor_vazio, valor_tabela)
+
+    regras = [
+        (df['Tipo'].isna(), "Tipo inválido (use Serviço, Diverso ou Gratificação)."),
+        (funcionario_id.isna(), "Funcionário não encontrado nesta obra."),
+        (data.isna(), "Data inválida."),
+        (data.notna() & ((data.dt.date < inicio) | (data.dt.date >= fim)), "Data fora do mês de referência."),
+        (quantidade_invalida, "Quantidade inválida."),
+        (~quantidade_invalida & (quantidade.isna() | (quantidade <= 0)), "Quantidade deve ser maior que zero."),
+        (descricao == '', "Serviço/descrição obrigatório."),
+        (e_servico & servico_ambiguo, "Serviço existe em mais de uma disciplina; informe a coluna Disciplina."),
+        (e_servico & (descricao != '') & servico_id.isna() & ~servico_ambiguo, "Serviço não encontrado na tabela de preços."),
+        (e_servico & servico_id.notna() & valor_informado.notna() & ((valor_informado - valor_tabela).abs() > 0.005),
+         "Valor unitário diferente da tabela de preços."),
+        (valor_invalido, "Valor unitário inválido."),
+        (df['Tipo'].notna() & ~valor_invalido & (valor_unitario.isna() | (valor_unitario <= 0)), "Valor unitário deve ser maior que zero."),
+        (observacao == '', "Observação obrigatória."),
+    ]
+    erros = pd.concat(
+        [pd.DataFrame({'Linha': df.loc[mascara.fillna(False), 'linha'], 'Erro': mensagem}) for mascara, mensagem in regras],
+        ignore_index=True
+    )
+
+    validos = ~df['linha'].isin(erros['Linha'])
+    validos_df = pd.DataFrame({
+        'data_servico': data.dt.date,
+        'funcionario_id': funcionario_id,
+        'servico_id': servico_id.where(e_servico),
+        'servico_diverso_descricao': descricao.where(~e_servico).where(~e_gratificacao, '[GRATIFICACAO] ' + descricao),
+        'quantidade': quantidade,
+        'valor_unitario': valor_unitario,
+        'observacao': observacao,
+    })[validos]
+    return validos_df, erros
+
+def validar_planilha_lancamentos(arquivo, nome_arquivo, obra_id, mes_referencia, tamanho_lote=1000):
+    """Lê uma planilha CSV/XLSX em lotes e valida os lançamentos para a obra e o mês.
+
+    Nomes de funcionário e serviço são resolvidos por dicionários montados uma única vez (serviço
+    por descrição e disciplina; a coluna Disciplina só é exigida quando a descrição se repete);
+    as regras são aplicadas por coluna em cada lote. Retorna (validos_df, erros_df), onde
+    validos_df já está no formato de carregar_lancamentos_em_massa. Levanta
+    FolhaFechadaException se a folha do mês já foi enviada ou finalizada.
+    """
+    inicio, fim = _intervalo_mes(mes_referencia)
+    folhas_df = get_folhas_mensais(mes_referencia, obra_id)
+    if not folhas_df.empty and folhas_df['status'].isin(['Enviada para Auditoria', 'Finalizada']).any():
+        raise FolhaFechadaException(f"A folha de {mes_referencia} desta obra já foi enviada ou finalizada.")
+
+    funcionarios_df = get_funcionarios(obra_id)
+    precos_df = get_precos()
+    funcionarios_por_nome = {_normalizar_texto(n): int(i) for n, i in zip(funcionarios_df.get('NOME', []), funcionarios_df.get('id', []))}
+    servicos_por_nome = {}
+    for disciplina, descricao, servico_id, valor in zip(precos_df.get('DISCIPLINA', []), precos_df.get('DESCRIÇÃO DO SERVIÇO', []),
+                                                        precos_df.get('id', []), precos_df.get('VALOR', [])):
+        servicos_por_nome.setdefault(_normalizar_texto(descricao), {})[_normalizar_texto(disciplina)] = (int(servico_id), float(valor))
+
+    validos, erros = [], []
+    primeira_linha = 2
+    for lote in _ler_planilha_em_lotes(arquivo, nome_arquivo, tamanho_lote):
+        validos_lote, erros_lote = _validar_lote_planilha(lote, primeira_linha, funcionarios_por_nome, servicos_por_nome, inicio, fim)
+        validos.append(validos_lote)
+        erros.append(erros_lote)
+        primeira_linha += len(lote)
+
+    validos_df = pd.concat(validos, ignore_index=True) if validos else pd.DataFrame()
+    erros_df = pd.concat(erros, ignore_index=True).sort_values('Linha', kind='stable') if erros else pd.DataFrame(columns=['Linha', 'Erro'])
+    if not validos_df.empty:
+        validos_df.insert(1, 'obra_id', int(obra_id))
+        validos_df['data_lancamento'] = pd.Timestamp.now(tz=timezone.utc)
+    return validos_df, erros_df.reset_index(drop=True)
+
 def remover_lancamentos_por_id(ids_para_remover, razao="", obra_id=None, mes_referencia=None):
     engine = get_db_connection()
     if engine is None: return False
@@ -465,7 +1810,7 @@ def remover_lancamentos_por_id(ids_para_remover, razao="", obra_id=None, mes_ref
     
     try:
         with engine.connect() as connection:
-            with connection.begin() as transaction:
+            with _transacao(connection) as invalidacoes:
                 
                 if obra_id is not None and mes_referencia is not None:
                     mes_ref_dt = pd.to_datetime(mes_referencia, format='%Y-%m').date()
@@ -475,8 +1820,9 @@ def remover_lancamentos_por_id(ids_para_remover, razao="", obra_id=None, mes_ref
                     
                     if status_atual == 'Finalizada':
                         raise FolhaFechadaException(f"Não foi possível remover: A folha está com status 'Finalizada'.")
-                query = text("DELETE FROM lancamentos WHERE id = ANY(:ids)")
-                connection.execute(query, {'ids': ids_para_remover})
+                query = text("DELETE FROM lancamentos WHERE id = ANY(:ids) RETURNING obra_id, data_servico")
+                for obra_removida, data_servico in connection.execute(query, {'ids': ids_para_remover}):
+                    invalidacoes.adicionar('lancamentos', obra_id=obra_removida, mes=data_servico)
         
         registrar_log(st.session_state.get('user_identifier', 'unknown'), "REMOVER_LANCAMENTOS", f"IDs: {ids_para_remover}. Razão: {razao}")
         return True
@@ -493,12 +1839,12 @@ def save_aviso_data(obra_id, novo_aviso):
     if engine is None: return False
     try:
         with engine.connect() as connection:
-            with connection.begin() as transaction:
+            with _transacao(connection) as invalidacoes:
                 query = text("UPDATE obras SET aviso = :aviso WHERE id = :id")
                 connection.execute(query, {'aviso': novo_aviso, 'id': obra_id})
+                invalidacoes.adicionar('obras', obra_id=obra_id)
         registrar_log(st.session_state.get('user_identifier', 'unknown'), "SALVAR_AVISO", f"Aviso para obra_id {obra_id} atualizado.")
         
-        st.cache_data.clear() 
         return True
     except Exception as e:
         st.error(f"Erro ao salvar o aviso: {e}")
@@ -510,13 +1856,15 @@ def atualizar_observacoes(updates_list):
     if not updates_list: return True
     try:
         with engine.connect() as connection:
-            with connection.begin() as transaction:
+            with _transacao(connection) as invalidacoes:
                 query = text("UPDATE lancamentos SET observacao = :obs WHERE id = :id")
                 connection.execute(query, updates_list)
+                query_escopo = text("SELECT DISTINCT obra_id, date_trunc('month', data_servico)::date FROM lancamentos WHERE id = ANY(:ids)")
+                for obra_alterada, mes in connection.execute(query_escopo, {'ids': [item['id'] for item in updates_list]}):
+                    invalidacoes.adicionar('lancamentos', obra_id=obra_alterada, mes=mes)
         ids_str = ", ".join([str(item['id']) for item in updates_list])
         registrar_log(st.session_state.get('user_identifier', 'unknown'), "ATUALIZAR_OBSERVACOES", f"Observações atualizadas para IDs: {ids_str}")
         
-        st.cache_data.clear() 
         return True
     except Exception as e:
         st.error(f"Ocorreu um erro ao salvar as observações: {e}")
@@ -527,16 +1875,17 @@ def adicionar_obra(nome_obra, codigo_acesso):
     if engine is None: return False
     try:
         with engine.connect() as connection:
-            with connection.begin() as transaction:
+            with _transacao(connection) as invalidacoes:
                 query_obra = text("INSERT INTO obras (nome_obra, status) VALUES (:nome, 'Ativa') RETURNING id")
                 result = connection.execute(query_obra, {'nome': nome_obra})
                 new_obra_id = result.scalar_one()
 
                 query_acesso = text("INSERT INTO acessos_obras (obra_id, codigo_acesso) VALUES (:obra_id, :codigo)")
                 connection.execute(query_acesso, {'obra_id': new_obra_id, 'codigo': codigo_acesso})
+                invalidacoes.adicionar('obras')
+                invalidacoes.adicionar('acessos_obras')
         registrar_log(st.session_state.get('user_identifier', 'unknown'), "ADICIONAR_OBRA", f"Obra '{nome_obra}' adicionada.")
         
-        st.cache_data.clear() 
         return True
     except Exception as e:
         st.error(f"Erro ao adicionar obra no banco de dados: {e}")
@@ -547,13 +1896,14 @@ def remover_obra(obra_id):
     if engine is None: return False
     try:
         with engine.connect() as connection:
-            with connection.begin() as transaction:
+            with _transacao(connection) as invalidacoes:
                 query = text("UPDATE obras SET status = 'Inativa' WHERE id = :id")
                 connection.execute(query, {'id': obra_id})
                 connection.execute(text("DELETE FROM acessos_obras WHERE obra_id = :id"), {'id': obra_id})
+                invalidacoes.adicionar('obras', obra_id=obra_id)
+                invalidacoes.adicionar('acessos_obras')
         registrar_log(st.session_state.get('user_identifier', 'unknown'), "REMOVER_OBRA", f"Obra ID {obra_id} INATIVADA.")
         
-        st.cache_data.clear() 
         return True
     except Exception as e:
         st.error(f"Erro ao inativar obra: {e}.")
@@ -564,12 +1914,12 @@ def mudar_codigo_acesso_obra(obra_id, novo_codigo):
     if engine is None: return False
     try:
         with engine.connect() as connection:
-            with connection.begin() as transaction:
+            with _transacao(connection) as invalidacoes:
                 query = text("UPDATE acessos_obras SET codigo_acesso = :novo_codigo WHERE obra_id = :obra_id")
                 connection.execute(query, {'novo_codigo': novo_codigo, 'obra_id': obra_id})
+                invalidacoes.adicionar('acessos_obras')
         registrar_log(st.session_state.get('user_identifier', 'unknown'), "MUDAR_CODIGO_ACESSO", f"Código de acesso da obra ID {obra_id} alterado.")
         
-        st.cache_data.clear() 
         return True
     except Exception as e:
         st.error(f"Erro ao alterar o código de acesso: {e}")
@@ -580,7 +1930,7 @@ def adicionar_funcao(nome, tipo, salario_base):
     if engine is None: return False
     try:
         with engine.connect() as connection:
-            with connection.begin() as transaction:
+            with _transacao(connection) as invalidacoes:
                 query = text("""
                     INSERT INTO funcoes (funcao, tipo, salario_base, ativo)
                     VALUES (:nome, :tipo, :salario_base, TRUE)
@@ -590,11 +1940,11 @@ def adicionar_funcao(nome, tipo, salario_base):
                     'tipo': tipo, 
                     'salario_base': salario_base
                 })
+                invalidacoes.adicionar('funcoes')
         
         registrar_log(st.session_state.get('user_identifier', 'admin'), 
                       "ADICIONAR_FUNCAO", 
                       f"Função '{nome}' adicionada.")
-        st.cache_data.clear() 
         return True
     except Exception as e:
         if 'unique constraint' in str(e).lower():
@@ -609,7 +1959,7 @@ def atualizar_funcao(funcao_id, novo_nome, novo_tipo, novo_salario):
     
     try:
         with engine.connect() as connection:
-            with connection.begin() as transaction:
+            with _transacao(connection) as invalidacoes:
                 query = text("""
                     UPDATE funcoes 
                     SET funcao = :nome, 
@@ -623,11 +1973,11 @@ def atualizar_funcao(funcao_id, novo_nome, novo_tipo, novo_salario):
                     'salario_base': novo_salario,
                     'id': funcao_id
                 })
+                invalidacoes.adicionar('funcoes')
         
         registrar_log(st.session_state.get('user_identifier', 'admin'), 
                       "ATUALIZAR_FUNCAO", 
                       f"Função ID {funcao_id} ('{novo_nome}') atualizada.")
-        st.cache_data.clear() 
         return True
         
     except Exception as e:
@@ -640,7 +1990,7 @@ def inativar_funcao(funcao_id):
     
     try:
         with engine.connect() as connection:
-            with connection.begin() as transaction:
+            with _transacao(connection) as invalidacoes:
                 check_query = text("SELECT COUNT(*) FROM funcionarios WHERE funcao_id = :id AND ativo = TRUE")
                 count = connection.execute(check_query, {'id': funcao_id}).scalar_one()
                 
@@ -650,11 +2000,11 @@ def inativar_funcao(funcao_id):
                 
                 query = text("UPDATE funcoes SET ativo = FALSE WHERE id = :id")
                 connection.execute(query, {'id': funcao_id})
+                invalidacoes.adicionar('funcoes')
         
         registrar_log(st.session_state.get('user_identifier', 'admin'), 
                       "INATIVAR_FUNCAO", 
                       f"Função ID {funcao_id} foi inativada.")
-        st.cache_data.clear() 
         return True
     except Exception as e:
         st.error(f"Erro ao inativar função no banco de dados: {e}")
@@ -666,7 +2016,7 @@ def adicionar_funcionario(nome, funcao_id, obra_id, data_admissao):
 
     try:
         with engine.connect() as connection:
-            with connection.begin() as transaction:
+            with _transacao(connection) as invalidacoes:
                 query = text("""
                 INSERT INTO funcionarios (nome, funcao_id, obra_id, ativo, data_admissao)
                 VALUES (:nome, :funcao_id, :obra_id, TRUE, :data_admissao)
@@ -680,8 +2030,9 @@ def adicionar_funcionario(nome, funcao_id, obra_id, data_admissao):
 
                 registrar_log(st.session_state.get('user_identifier', 'admin'),
                               "ADICIONAR_FUNCIONARIO",
-                              f"Funcionário '{nome}' adicionado.")
-        st.cache_data.clear()
+                              f"Funcionário '{nome}' adicionado.",
+                              connection=connection)
+                invalidacoes.adicionar('funcionarios')
         return True
     except Exception as e:
         if 'unique constraint' in str(e).lower():
@@ -696,16 +2047,16 @@ def inativar_funcionario(funcionario_id):
     
     try:
         with engine.connect() as connection:
-            with connection.begin() as transaction:
+            with _transacao(connection) as invalidacoes:
                 query = text("""
                     UPDATE funcionarios SET ativo = FALSE WHERE id = :id
                 """)
                 connection.execute(query, {'id': funcionario_id})
+                invalidacoes.adicionar('funcionarios')
         
         registrar_log(st.session_state.get('user_identifier', 'admin'), 
                       "INATIVAR_FUNCIONARIO", 
                       f"Funcionário ID {funcionario_id} foi inativado.")
-        st.cache_data.clear() 
         return True
     except Exception as e:
         st.error(f"Erro ao inativar funcionário no banco de dados: {e}")
@@ -717,7 +2068,7 @@ def editar_funcionario(funcionario_id, novo_nome, nova_funcao_id, nova_obra_id):
     
     try:
         with engine.connect() as connection:
-            with connection.begin() as transaction:
+            with _transacao(connection) as invalidacoes:
                 query = text("""
                     UPDATE funcionarios 
                     SET nome = :novo_nome, 
@@ -731,11 +2082,11 @@ def editar_funcionario(funcionario_id, novo_nome, nova_funcao_id, nova_obra_id):
                     'nova_obra_id': nova_obra_id,
                     'funcionario_id': funcionario_id
                 })
+                invalidacoes.adicionar('funcionarios')
         
         registrar_log(st.session_state.get('user_identifier', 'admin'), 
                       "EDITAR_FUNCIONARIO",
                       f"Dados do funcionário ID {funcionario_id} atualizados (Nome: {novo_nome}, Obra ID: {nova_obra_id}, Função ID: {nova_funcao_id}).")
-        st.cache_data.clear() 
         return True
     except Exception as e:
         if 'unique constraint' in str(e).lower():
@@ -750,18 +2101,18 @@ def limpar_concluidos_obra_mes(obra_id, mes_referencia):
     mes_dt = pd.to_datetime(mes_referencia, format='%Y-%m').date()
     try:
         with engine.connect() as connection:
-            with connection.begin() as transaction:
+            with _transacao(connection) as invalidacoes:
                 query = text("""
                     UPDATE status_auditoria 
                     SET lancamentos_concluidos = FALSE 
                     WHERE obra_id = :obra_id AND mes_referencia = :mes_ref AND funcionario_id != 0
                 """)
                 connection.execute(query, {'obra_id': obra_id, 'mes_ref': mes_dt})
+                invalidacoes.adicionar('status_auditoria', obra_id=obra_id, mes=mes_dt)
         registrar_log(st.session_state.get('user_identifier', 'unknown'), 
                       "LIMPAR_CONCLUIDOS", 
                       f"Status de conclusão limpo para obra_id {obra_id} no mês {mes_referencia}.")
         
-        st.cache_data.clear() 
         return True
     except Exception as e:
         st.error(f"Erro ao limpar status de concluídos: {e}")
@@ -773,11 +2124,11 @@ def adicionar_disciplina(nome):
     if engine is None: return False
     try:
         with engine.connect() as connection:
-            with connection.begin() as transaction:
+            with _transacao(connection) as invalidacoes:
                 query = text("INSERT INTO disciplinas (nome, ativo) VALUES (:nome, TRUE)")
                 connection.execute(query, {'nome': nome})
+                invalidacoes.adicionar('disciplinas')
         registrar_log(st.session_state.get('user_identifier', 'admin'), "ADICIONAR_DISCIPLINA", f"Disciplina '{nome}' adicionada.")
-        st.cache_data.clear()
         return True
     except Exception as e:
         if 'unique constraint' in str(e).lower():
@@ -791,7 +2142,7 @@ def inativar_disciplina(disciplina_id):
     if engine is None: return False
     try:
         with engine.connect() as connection:
-            with connection.begin() as transaction:
+            with _transacao(connection) as invalidacoes:
                 check_query = text("SELECT COUNT(*) FROM servicos WHERE disciplina_id = :id AND ativo = TRUE")
                 count = connection.execute(check_query, {'id': disciplina_id}).scalar_one()
                 
@@ -801,8 +2152,8 @@ def inativar_disciplina(disciplina_id):
                 
                 query = text("UPDATE disciplinas SET ativo = FALSE WHERE id = :id")
                 connection.execute(query, {'id': disciplina_id})
+                invalidacoes.adicionar('disciplinas')
         registrar_log(st.session_state.get('user_identifier', 'admin'), "INATIVAR_DISCIPLINA", f"Disciplina ID {disciplina_id} inativada.")
-        st.cache_data.clear()
         return True
     except Exception as e:
         st.error(f"Erro ao inativar disciplina: {e}")
@@ -813,11 +2164,11 @@ def reativar_disciplina(disciplina_id):
     if engine is None: return False
     try:
         with engine.connect() as connection:
-            with connection.begin() as transaction:
+            with _transacao(connection) as invalidacoes:
                 query = text("UPDATE disciplinas SET ativo = TRUE WHERE id = :id")
                 connection.execute(query, {'id': disciplina_id})
+                invalidacoes.adicionar('disciplinas')
         registrar_log(st.session_state.get('user_identifier', 'admin'), "REATIVAR_DISCIPLINA", f"Disciplina ID {disciplina_id} reativada.")
-        st.cache_data.clear()
         return True
     except Exception as e:
         st.error(f"Erro ao reativar disciplina: {e}")
@@ -828,7 +2179,7 @@ def adicionar_servico(disciplina_id, descricao, unidade, valor_unitario):
     if engine is None: return False
     try:
         with engine.connect() as connection:
-            with connection.begin() as transaction:
+            with _transacao(connection) as invalidacoes:
                 query = text("""
                     INSERT INTO servicos (disciplina_id, descricao, unidade, valor_unitario, ativo)
                     VALUES (:disciplina_id, :descricao, :unidade, :valor, TRUE)
@@ -839,11 +2190,11 @@ def adicionar_servico(disciplina_id, descricao, unidade, valor_unitario):
                     'unidade': unidade,
                     'valor': valor_unitario
                 })
+                invalidacoes.adicionar('servicos')
         
         registrar_log(st.session_state.get('user_identifier', 'admin'), 
                       "ADICIONAR_SERVICO", 
                       f"Serviço '{descricao}' adicionado.")
-        st.cache_data.clear() 
         return True
     except Exception as e:
         if 'unique constraint' in str(e).lower():
@@ -857,7 +2208,7 @@ def editar_servico(servico_id, disciplina_id, descricao, unidade, valor_unitario
     if engine is None: return False
     try:
         with engine.connect() as connection:
-            with connection.begin() as transaction:
+            with _transacao(connection) as invalidacoes:
                 query = text("""
                     UPDATE servicos 
                     SET disciplina_id = :disciplina_id, 
@@ -873,11 +2224,11 @@ def editar_servico(servico_id, disciplina_id, descricao, unidade, valor_unitario
                     'valor': valor_unitario,
                     'id': servico_id
                 })
+                invalidacoes.adicionar('servicos')
         
         registrar_log(st.session_state.get('user_identifier', 'admin'), 
                       "EDITAR_SERVICO", 
                       f"Serviço ID {servico_id} ('{descricao}') atualizado.")
-        st.cache_data.clear() 
         return True
     except Exception as e:
         if 'unique constraint' in str(e).lower():
@@ -891,14 +2242,14 @@ def inativar_servico(servico_id):
     if engine is None: return False
     try:
         with engine.connect() as connection:
-            with connection.begin() as transaction:
+            with _transacao(connection) as invalidacoes:
                 query = text("UPDATE servicos SET ativo = FALSE WHERE id = :id")
                 connection.execute(query, {'id': servico_id})
+                invalidacoes.adicionar('servicos')
         
         registrar_log(st.session_state.get('user_identifier', 'admin'), 
                       "INATIVAR_SERVICO", 
                       f"Serviço ID {servico_id} inativado.")
-        st.cache_data.clear() 
         return True
     except Exception as e:
         st.error(f"Erro ao inativar serviço: {e}")
@@ -909,14 +2260,14 @@ def reativar_servico(servico_id):
     if engine is None: return False
     try:
         with engine.connect() as connection:
-            with connection.begin() as transaction:
+            with _transacao(connection) as invalidacoes:
                 query = text("UPDATE servicos SET ativo = TRUE WHERE id = :id")
                 connection.execute(query, {'id': servico_id})
+                invalidacoes.adicionar('servicos')
         
         registrar_log(st.session_state.get('user_identifier', 'admin'), 
                       "REATIVAR_SERVICO", 
                       f"Serviço ID {servico_id} reativado.")
-        st.cache_data.clear() 
         return True
     except Exception as e:
         st.error(f"Erro ao reativar serviço: {e}")
@@ -927,14 +2278,14 @@ def editar_disciplina(disciplina_id, novo_nome):
     if engine is None: return False
     try:
         with engine.connect() as connection:
-            with connection.begin() as transaction:
+            with _transacao(connection) as invalidacoes:
                 query = text("UPDATE disciplinas SET nome = :nome WHERE id = :id")
                 connection.execute(query, {'nome': novo_nome, 'id': disciplina_id})
+                invalidacoes.adicionar('disciplinas')
         
         registrar_log(st.session_state.get('user_identifier', 'admin'), 
                       "EDITAR_DISCIPLINA", 
                       f"Disciplina ID {disciplina_id} renomeada para '{novo_nome}'.")
-        st.cache_data.clear() 
         return True
     except Exception as e:
         if 'unique constraint' in str(e).lower():
@@ -943,18 +2294,12 @@ def editar_disciplina(disciplina_id, novo_nome):
             st.error(f"Erro ao editar disciplina: {e}")
         return False
 
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
+_NAO_INSTRUMENTAR = {
+    'get_db_connection', 'get_estatisticas_pool', 'carregar_em_paralelo', 'ler_do_primario',
+    'registrar_log', 'descarregar_logs', 'get_metricas_consultas', 'get_consultas_lentas',
+    'resumir_metricas_consultas', 'limpar_metricas_consultas',
+}
+for _nome, _funcao in list(globals().items()):
+    if (not _nome.startswith('_') and _nome not in _NAO_INSTRUMENTAR
+            and inspect.isfunction(_funcao) and _funcao.__module__ == __name__):
+        globals()[_nome] = _instrumentar(_funcao)
@@ -25,6 +25,8 @@ from paginas import (
     gerenciar_obras, 
     resumo_da_folha, 
     remover_lancamentos, 
+    importar_lancamentos,
+    desempenho,
     dashboard_de_analise,
     gerenciar_funcoes,
     gerenciar_servicos  
@@ -111,6 +113,7 @@ def login_page():
                 st.session_state.logged_in = True
                 st.session_state.role = 'admin'
                 st.session_state.obra_logada = 'Todas' 
+                st.session_state.obra_logada_id = None
                 st.session_state.user_identifier = 'admin' 
                 st.session_state.page = 'auditoria' 
                 st.rerun()
@@ -143,6 +146,7 @@ def login_page():
                         st.session_state.logged_in = True
                         st.session_state.role = 'user'
                         st.session_state.obra_logada = obra_login 
+                        st.session_state.obra_logada_id = int(obras_com_acesso.loc[obras_com_acesso['NOME DA OBRA'] == obra_login, 'id'].iloc[0])
                         st.session_state.user_identifier = f"user_{obra_login}" 
                         st.session_state.page = 'lancamento_folha' 
                         st.rerun()
@@ -169,20 +173,29 @@ else:
     if 'page' not in st.session_state:
         st.session_state.page = 'auditoria' if st.session_state.role == 'admin' else 'lancamento_folha'
 
-    @st.cache_data
-    def get_sidebar_data(mes_atual):
+    def get_sidebar_data(mes_atual, obra_id):
         obras_df = db_utils.get_obras() 
-        folhas_df = db_utils.get_folhas_mensais() 
-        status_df = db_utils.get_status_do_mes(mes_atual) 
+        folhas_df = db_utils.get_folhas_mensais(obra_id=obra_id) 
+        status_df = db_utils.get_status_do_mes(mes_atual, obra_id=obra_id) 
         return obras_df, folhas_df, status_df
 
     mes_atual_sidebar = datetime.now().strftime('%Y-%m')
-    obras_df_sidebar, folhas_df_sidebar, status_df_sidebar = get_sidebar_data(mes_atual_sidebar)
+    obra_id_sessao = st.session_state.get('obra_logada_id') if st.session_state.role != 'admin' else None
+    obras_df_sidebar, folhas_df_sidebar, status_df_sidebar = get_sidebar_data(mes_atual_sidebar, obra_id_sessao)
 
     with st.sidebar:
         st.image("Lavie.png", use_container_width=True)
         if st.session_state['role'] == 'admin':
             st.info("Visão de Administrador")
+            with st.expander("Conexões do Banco"):
+                stats_pool = db_utils.get_estatisticas_pool()
+                if stats_pool:
+                    col_p1, col_p2 = st.columns(2)
+                    col_p1.metric("Em uso", f"{stats_pool['em_uso']}/{stats_pool['tamanho_pool']}")
+                    col_p2.metric("Overflow", f"{stats_pool['overflow']}/{stats_pool['max_overflow']}")
+                    col_p1.metric("Espera média", f"{stats_pool['espera_media_ms']:.1f} ms")
+                    col_p2.metric("Espera máx.", f"{stats_pool['espera_max_ms']:.1f} ms")
+                    st.caption(f"Checkouts: {stats_pool['checkouts']} | Timeouts: {stats_pool['timeouts']}")
         else:
             st.metric(label="Obra Ativa", value=st.session_state['obra_logada'])
             obra_info = obras_df_sidebar.loc[obras_df_sidebar['NOME DA OBRA'] == st.session_state['obra_logada']]
@@ -239,13 +252,15 @@ else:
                 'dashboard_de_analise': ("Dashboard", "graph-up"),
                 'resumo_da_folha': ("Resumo da Folha", "file-earmark-text"),
                 'remover_lancamentos': ("Lançamentos", "trash"),
+                'importar_lancamentos': ("Importar Planilha", "file-earmark-spreadsheet"),
                 'gerenciar_funcionarios': ("Funcionários", "people-fill"),
                 'gerenciar_funcoes': ("Funções", "gear-fill"),
                 'gerenciar_servicos': ("Serviços", "tools"),
                 'gerenciar_obras': ("Obras", "building"),
+                'desempenho': ("Desempenho", "speedometer2"),
             }
-            admin_pages = ['auditoria', 'resumo_da_folha', 'gerenciar_funcionarios', 'gerenciar_funcoes', 'gerenciar_servicos', 'gerenciar_obras', 'remover_lancamentos', 'dashboard_de_analise']
-            user_pages = ['lancamento_folha', 'resumo_da_folha', 'remover_lancamentos', 'dashboard_de_analise']
+            admin_pages = ['auditoria', 'resumo_da_folha', 'gerenciar_funcionarios', 'gerenciar_funcoes', 'gerenciar_servicos', 'gerenciar_obras', 'remover_lancamentos', 'importar_lancamentos', 'dashboard_de_analise', 'desempenho']
+            user_pages = ['lancamento_folha', 'importar_lancamentos', 'resumo_da_folha', 'remover_lancamentos', 'dashboard_de_analise']
             pages_to_show_keys = admin_pages if st.session_state.role == 'admin' else user_pages
 
             menu_titles = [page_definitions[key][0] for key in pages_to_show_keys]
@@ -294,7 +309,10 @@ else:
                 if st.button("🏗️ Gerenciar Obras", use_container_width=True): nova_pagina = 'gerenciar_obras'
             if st.button("📊 Resumo da Folha", use_container_width=True): nova_pagina = 'resumo_da_folha'
             if st.button("🗑️ Remover Lançamentos", use_container_width=True): nova_pagina = 'remover_lancamentos'
+            if st.button("📥 Importar Planilha", use_container_width=True): nova_pagina = 'importar_lancamentos'
             if st.button("📈 Dashboard de Análise", use_container_width=True): nova_pagina = 'dashboard_de_analise'
+            if st.session_state.role == 'admin':
+                if st.button("⏱️ Desempenho", use_container_width=True): nova_pagina = 'desempenho'
 
             if st.session_state.page != nova_pagina:
                 st.session_state.page = nova_pagina
@@ -347,12 +365,12 @@ else:
                     with st.spinner("Enviando folha..."):
                         if db_utils.enviar_folha_para_auditoria(obra_id_envio, mes_selecionado_str, st.session_state['obra_logada']):
                             st.success("Folha enviada com sucesso!")
-                            st.cache_data.clear() 
                             st.rerun()
             st.markdown("---")
         st.header("Relatório")
         
         obra_pdf_selecionada = "Todas" 
+        obra_pdf_id = None
         obra_pdf_nome_arquivo = "Geral"
         obra_pdf_titulo = None
         
@@ -364,61 +382,27 @@ else:
                 key="sidebar_pdf_obra_filter"
             )
             if obra_pdf_selecionada != "Todas":
+                 obra_pdf_id = int(obras_df_sidebar.loc[obras_df_sidebar['NOME DA OBRA'] == obra_pdf_selecionada, 'id'].iloc[0])
                  obra_pdf_nome_arquivo = obra_pdf_selecionada.replace(" ", "_") 
                  obra_pdf_titulo = obra_pdf_selecionada
         elif st.session_state['role'] == 'user':
             obra_pdf_selecionada = st.session_state['obra_logada']
+            obra_pdf_id = obra_id_sessao
             obra_pdf_nome_arquivo = obra_pdf_selecionada.replace(" ", "_")
             obra_pdf_titulo = obra_pdf_selecionada
         
         pdf_download_placeholder = st.empty()
         if pdf_download_placeholder.button("Gerar Relatório em PDF", use_container_width=True, key="gerar_pdf_sidebar"):
             with st.spinner("Gerando relatório..."):
-                funcionarios_pdf = db_utils.get_funcionarios() 
-                lancamentos_pdf = db_utils.get_lancamentos_do_mes(st.session_state.selected_month) 
+                resumo_pdf = db_utils.get_resumo_folha(st.session_state.selected_month, obra_pdf_id)
+                lancamentos_pdf = db_utils.get_lancamentos_do_mes(st.session_state.selected_month, obra_pdf_id) 
                 
-                if funcionarios_pdf.empty:
+                if resumo_pdf.empty:
                     st.toast("Nenhum funcionário ativo para gerar relatório.", icon="🤷")
                 else:
-                    base_para_resumo = funcionarios_pdf.copy()
-                    base_para_resumo['funcionario_id'] = base_para_resumo['id'] 
-                    base_para_resumo['SALARIO_BASE'] = base_para_resumo['SALARIO_BASE'].apply(utils.safe_float)
-
-                    producao_bruta_pdf_df = pd.DataFrame()
-                    total_gratificacoes_pdf_df = pd.DataFrame()
-
-                    if not lancamentos_pdf.empty:
-                         lancamentos_pdf['Valor Parcial'] = lancamentos_pdf['Valor Parcial'].apply(utils.safe_float)
-                         lanc_producao_pdf = lancamentos_pdf[lancamentos_pdf['Disciplina'] != 'GRATIFICAÇÃO']
-                         if not lanc_producao_pdf.empty:
-                             producao_bruta_pdf_df = lanc_producao_pdf.groupby('funcionario_id')['Valor Parcial'].sum().reset_index()
-                             producao_bruta_pdf_df.rename(columns={'Valor Parcial': 'PRODUÇÃO BRUTA (R$)'}, inplace=True)
-                         lanc_gratificacoes_pdf = lancamentos_pdf[lancamentos_pdf['Disciplina'] == 'GRATIFICAÇÃO']
-                         if not lanc_gratificacoes_pdf.empty:
-                             total_gratificacoes_pdf_df = lanc_gratificacoes_pdf.groupby('funcionario_id')['Valor Parcial'].sum().reset_index()
-                             total_gratificacoes_pdf_df.rename(columns={'Valor Parcial': 'TOTAL GRATIFICAÇÕES (R$)'}, inplace=True)
-                    
-                    resumo_pdf = base_para_resumo.copy()
-                    if not producao_bruta_pdf_df.empty:
-                        resumo_pdf = pd.merge(resumo_pdf, producao_bruta_pdf_df, on='funcionario_id', how='left')
-                    else: resumo_pdf['PRODUÇÃO BRUTA (R$)'] = 0.0
-                    if not total_gratificacoes_pdf_df.empty:
-                         resumo_pdf = pd.merge(resumo_pdf, total_gratificacoes_pdf_df, on='funcionario_id', how='left')
-                    else: resumo_pdf['TOTAL GRATIFICAÇÕES (R$)'] = 0.0
-
-                    resumo_pdf = resumo_pdf.loc[:,~resumo_pdf.columns.duplicated()]
-                    if 'funcionario_id' in resumo_pdf.columns and 'id' in resumo_pdf.columns and 'funcionario_id' != 'id':
-                         resumo_pdf = resumo_pdf.drop(columns=['funcionario_id'])
-
-                    resumo_pdf.rename(columns={'NOME': 'Funcionário', 'SALARIO_BASE': 'SALÁRIO BASE (R$)'}, inplace=True)
-                    resumo_pdf['PRODUÇÃO BRUTA (R$)'] = resumo_pdf['PRODUÇÃO BRUTA (R$)'].fillna(0.0).apply(utils.safe_float)
-                    resumo_pdf['TOTAL GRATIFICAÇÕES (R$)'] = resumo_pdf['TOTAL GRATIFICAÇÕES (R$)'].fillna(0.0).apply(utils.safe_float)
-                    resumo_pdf['SALÁRIO BASE (R$)'] = resumo_pdf['SALÁRIO BASE (R$)'].fillna(0.0)
-
-                    resumo_pdf['PRODUÇÃO LÍQUIDA (R$)'] = resumo_pdf.apply(utils.calcular_producao_liquida, axis=1)
-                    resumo_pdf['SALÁRIO A RECEBER (R$)'] = resumo_pdf.apply(utils.calcular_salario_final, axis=1)
-
-                    status_pdf = db_utils.get_status_do_mes(st.session_state.selected_month) 
+                    resumo_pdf = resumo_pdf.rename(columns={'NOME': 'Funcionário'})
+
+                    status_pdf = db_utils.get_status_do_mes(st.session_state.selected_month, obra_pdf_id) 
                     concluidos_df = status_pdf[status_pdf['Lancamentos Concluidos'] == True][['funcionario_id']].drop_duplicates()
                     if not concluidos_df.empty:
                          resumo_pdf = pd.merge(resumo_pdf, concluidos_df, left_on='id', right_on='funcionario_id', how='left', indicator=True)
@@ -468,7 +452,6 @@ else:
 
         st.markdown("---")
         if st.button("Sair", use_container_width=True, type="primary"):
-            st.cache_data.clear() 
             for key in list(st.session_state.keys()):
                 del st.session_state[key]
             st.rerun()
@@ -483,6 +466,8 @@ else:
         'gerenciar_obras': gerenciar_obras,
         'resumo_da_folha': resumo_da_folha,
         'remover_lancamentos': remover_lancamentos,
+        'importar_lancamentos': importar_lancamentos,
+        'desempenho': desempenho,
         'dashboard_de_analise': dashboard_de_analise
     }
     if page_to_render in page_map:
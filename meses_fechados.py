@@ -0,0 +1,93 @@
+import glob
+import os
+import shutil
+import sys
+import tempfile
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+    pa = pq = None
+
+# Arquivos Parquet com os dados de folhas finalizadas, um por (conjunto, mês, obra, envio):
+#     <diretorio>/v<versão>/<conjunto>/<YYYY-MM>/obra_<id>_e<envio>.parquet
+# `envio` é o folhas_mensais.contador_envios da folha finalizada: uma folha devolvida, reenviada e
+# finalizada de novo tem outro envio, e o arquivo do fechamento anterior deixa de ser lido.
+# Incremente _VERSAO quando as colunas de algum conjunto mudarem; os arquivos antigos deixam de ser lidos.
+_VERSAO = 2
+
+def _caminho(diretorio, conjunto, obra_id, mes, envio):
+    return os.path.join(diretorio, f"v{_VERSAO}", conjunto, mes, f"obra_{int(obra_id)}_e{int(envio)}.parquet")
+
+def _remover_arquivos(pasta, obra_id, manter=None):
+    for caminho in glob.glob(os.path.join(pasta, f"obra_{int(obra_id)}_e*.parquet")):
+        if caminho == manter:
+            continue
+        try:
+            os.remove(caminho)
+        except FileNotFoundError:
+            pass
+
+def ler(diretorio, conjunto, pares):
+    """Lê os arquivos dos pares {(obra_id, 'YYYY-MM'): envio} de um conjunto num único DataFrame.
+
+    Retorna (df, faltando): df é None se nenhum par tiver arquivo do envio informado; `faltando`
+    lista os pares (obra_id, 'YYYY-MM') sem arquivo. As tabelas são lidas com memory map e
+    concatenadas no Arrow, com uma só conversão para pandas.
+    """
+    tabelas, faltando = [], []
+    for (obra_id, mes), envio in sorted(pares.items()):
+        caminho = _caminho(diretorio, conjunto, obra_id, mes, envio)
+        try:
+            tabela = pq.read_table(caminho, memory_map=True)
+        except FileNotFoundError:
+            faltando.append((obra_id, mes))
+            continue
+        except Exception as e:
+            print(f"Arquivo de mês fechado ilegível ({caminho}), descartado: {e}", file=sys.stderr)
+            descartar(diretorio, obra_id, mes, [conjunto])
+            faltando.append((obra_id, mes))
+            continue
+        tabelas.append(tabela)
+    if not tabelas:
+        return None, faltando
+    com_linhas = [t for t in tabelas if t.num_rows] or tabelas[:1]
+    tabela = pa.concat_tables(com_linhas, promote_options='permissive')
+    return tabela.to_pandas(), faltando
+
+def gravar(diretorio, conjunto, obra_id, mes, envio, df):
+    """Grava o DataFrame de forma atômica (arquivo temporário + rename) e remove os envios anteriores."""
+    caminho = _caminho(diretorio, conjunto, obra_id, mes, envio)
+    os.makedirs(os.path.dirname(caminho), exist_ok=True)
+    descritor, temporario = tempfile.mkstemp(dir=os.path.dirname(caminho), suffix='.tmp')
+    os.close(descritor)
+    try:
+        df.to_parquet(temporario, index=False)
+        os.replace(temporario, caminho)
+    except Exception:
+        os.remove(temporario)
+        raise
+    _remover_arquivos(os.path.dirname(caminho), obra_id, manter=caminho)
+
+def descartar(diretorio, obra_id=None, mes=None, conjuntos=None):
+    """Remove os arquivos do escopo informado; None em obra_id, mes ou conjuntos não restringe."""
+    raiz = os.path.join(diretorio, f"v{_VERSAO}")
+    if obra_id is None and mes is None and conjuntos is None:
+        shutil.rmtree(raiz, ignore_errors=True)
+        return
+    if not os.path.isdir(raiz):
+        return
+    for conjunto in conjuntos or os.listdir(raiz):
+        pasta_conjunto = os.path.join(raiz, conjunto)
+        if not os.path.isdir(pasta_conjunto):
+            continue
+        for mes_dir in [mes] if mes is not None else os.listdir(pasta_conjunto):
+            pasta = os.path.join(pasta_conjunto, mes_dir)
+            if obra_id is None:
+                shutil.rmtree(pasta, ignore_errors=True)
+                continue
+            _remover_arquivos(pasta, obra_id)
@@ -0,0 +1,99 @@
+-- Esquema base usado pelo db_utils. Em produção as tabelas já existem no Supabase; este script
+-- serve para montar um banco local (ex.: com scripts/gerar_dados_sinteticos.py) e documenta
+-- as colunas de que o app depende.
+
+CREATE TABLE IF NOT EXISTS obras (
+    id          SERIAL PRIMARY KEY,
+    nome_obra   TEXT NOT NULL UNIQUE,
+    status      TEXT NOT NULL DEFAULT 'Ativa',
+    aviso       TEXT
+);
+
+CREATE TABLE IF NOT EXISTS acessos_obras (
+    obra_id        INTEGER PRIMARY KEY REFERENCES obras (id),
+    codigo_acesso  TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS funcoes (
+    id            SERIAL PRIMARY KEY,
+    funcao        TEXT NOT NULL UNIQUE,
+    tipo          TEXT NOT NULL,
+    salario_base  NUMERIC(12, 2) NOT NULL DEFAULT 0,
+    ativo         BOOLEAN NOT NULL DEFAULT TRUE
+);
+
+CREATE TABLE IF NOT EXISTS funcionarios (
+    id             SERIAL PRIMARY KEY,
+    nome           TEXT NOT NULL,
+    obra_id        INTEGER REFERENCES obras (id),
+    funcao_id      INTEGER REFERENCES funcoes (id),
+    ativo          BOOLEAN NOT NULL DEFAULT TRUE,
+    data_admissao  DATE
+);
+
+CREATE TABLE IF NOT EXISTS disciplinas (
+    id     SERIAL PRIMARY KEY,
+    nome   TEXT NOT NULL UNIQUE,
+    ativo  BOOLEAN NOT NULL DEFAULT TRUE
+);
+
+CREATE TABLE IF NOT EXISTS servicos (
+    id              SERIAL PRIMARY KEY,
+    disciplina_id   INTEGER REFERENCES disciplinas (id),
+    descricao       TEXT NOT NULL,
+    unidade         TEXT,
+    valor_unitario  NUMERIC(12, 2),
+    ativo           BOOLEAN NOT NULL DEFAULT TRUE,
+    UNIQUE (disciplina_id, descricao)
+);
+
+CREATE TABLE IF NOT EXISTS lancamentos (
+    id                         BIGSERIAL PRIMARY KEY,
+    data_lancamento            TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    data_servico               DATE NOT NULL,
+    obra_id                    INTEGER REFERENCES obras (id),
+    funcionario_id             INTEGER REFERENCES funcionarios (id),
+    servico_id                 INTEGER REFERENCES servicos (id),
+    servico_diverso_descricao  TEXT,
+    quantidade                 NUMERIC(12, 2) NOT NULL,
+    valor_unitario             NUMERIC(12, 2) NOT NULL,
+    observacao                 TEXT,
+    arquivado                  BOOLEAN NOT NULL DEFAULT FALSE
+);
+
+CREATE TABLE IF NOT EXISTS status_auditoria (
+    obra_id                 INTEGER NOT NULL,
+    funcionario_id          INTEGER NOT NULL,  -- 0 = status geral da obra
+    mes_referencia          DATE NOT NULL,
+    status                  TEXT NOT NULL DEFAULT 'A Revisar',
+    comentario              TEXT,
+    lancamentos_concluidos  BOOLEAN NOT NULL DEFAULT FALSE,
+    PRIMARY KEY (obra_id, funcionario_id, mes_referencia)
+);
+
+CREATE TABLE IF NOT EXISTS folhas_mensais (
+    obra_id          INTEGER NOT NULL REFERENCES obras (id),
+    mes_referencia   DATE NOT NULL,
+    status           TEXT NOT NULL,
+    data_lancamento  TIMESTAMPTZ,
+    contador_envios  INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (obra_id, mes_referencia)
+);
+
+CREATE TABLE IF NOT EXISTS holerites_snapshot (
+    mes_referencia         DATE NOT NULL,
+    funcionario_id         INTEGER NOT NULL,
+    funcao_na_epoca        TEXT,
+    salario_base_na_epoca  NUMERIC(12, 2),
+    PRIMARY KEY (mes_referencia, funcionario_id)
+);
+
+CREATE TABLE IF NOT EXISTS log_auditoria (
+    id                   BIGSERIAL PRIMARY KEY,
+    data_hora            TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    usuario              TEXT,
+    acao                 TEXT,
+    detalhes             TEXT,
+    tabela_afetada       TEXT,
+    id_registro_afetado  INTEGER
+);
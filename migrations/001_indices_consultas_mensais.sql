@@ -0,0 +1,21 @@
+-- Índices para as consultas por mês de referência do db_utils.
+-- As consultas filtram por intervalo semiaberto (col >= inicio AND col < fim),
+-- o que permite ao Postgres usar estes índices em vez de varrer a tabela inteira.
+--
+-- Em produção, com a aplicação no ar, prefira executar cada comando com
+-- CREATE INDEX CONCURRENTLY (fora de um bloco de transação) para não bloquear escritas.
+
+CREATE INDEX IF NOT EXISTS idx_lancamentos_data_servico
+    ON lancamentos (data_servico);
+
+CREATE INDEX IF NOT EXISTS idx_lancamentos_obra_data_servico
+    ON lancamentos (obra_id, data_servico);
+
+CREATE INDEX IF NOT EXISTS idx_status_auditoria_mes_referencia
+    ON status_auditoria (mes_referencia);
+
+CREATE INDEX IF NOT EXISTS idx_folhas_mensais_mes_referencia
+    ON folhas_mensais (mes_referencia);
+
+CREATE INDEX IF NOT EXISTS idx_holerites_snapshot_mes_referencia
+    ON holerites_snapshot (mes_referencia);
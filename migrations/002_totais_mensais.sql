@@ -0,0 +1,115 @@
+-- Totais mensais de lançamentos por (obra, funcionário, mês, gratificação).
+-- Mantidos por triggers de instrução (com tabelas de transição) em lancamentos, de modo que
+-- os resumos da folha leem uma linha por funcionário em vez de somar todos os lançamentos.
+--
+-- Se os totais divergirem (ex.: carga feita com os triggers desabilitados), reconstrua com
+--     SELECT reconstruir_totais_mensais();
+-- ou com `python scripts/reconstruir_totais_mensais.py`.
+
+CREATE TABLE IF NOT EXISTS totais_mensais (
+    obra_id         INTEGER NOT NULL,
+    funcionario_id  INTEGER NOT NULL,
+    mes             DATE    NOT NULL,
+    is_gratificacao BOOLEAN NOT NULL,
+    valor_total     NUMERIC NOT NULL DEFAULT 0,
+    lancamentos     INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (obra_id, funcionario_id, mes, is_gratificacao)
+);
+
+CREATE INDEX IF NOT EXISTS idx_totais_mensais_mes
+    ON totais_mensais (mes);
+
+CREATE OR REPLACE FUNCTION atualizar_totais_mensais() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO totais_mensais AS t (obra_id, funcionario_id, mes, is_gratificacao, valor_total, lancamentos)
+        SELECT obra_id, funcionario_id, date_trunc('month', data_servico)::date,
+               (servico_id IS NULL AND COALESCE(servico_diverso_descricao, '') LIKE '[GRATIFICACAO]%'),
+               SUM(quantidade * valor_unitario), COUNT(*)
+        FROM novos
+        WHERE obra_id IS NOT NULL AND funcionario_id IS NOT NULL
+        GROUP BY 1, 2, 3, 4
+        ON CONFLICT (obra_id, funcionario_id, mes, is_gratificacao) DO UPDATE
+        SET valor_total = t.valor_total + EXCLUDED.valor_total,
+            lancamentos = t.lancamentos + EXCLUDED.lancamentos;
+
+    ELSIF TG_OP = 'DELETE' THEN
+        INSERT INTO totais_mensais AS t (obra_id, funcionario_id, mes, is_gratificacao, valor_total, lancamentos)
+        SELECT obra_id, funcionario_id, date_trunc('month', data_servico)::date,
+               (servico_id IS NULL AND COALESCE(servico_diverso_descricao, '') LIKE '[GRATIFICACAO]%'),
+               -SUM(quantidade * valor_unitario), -COUNT(*)
+        FROM antigos
+        WHERE obra_id IS NOT NULL AND funcionario_id IS NOT NULL
+        GROUP BY 1, 2, 3, 4
+        ON CONFLICT (obra_id, funcionario_id, mes, is_gratificacao) DO UPDATE
+        SET valor_total = t.valor_total + EXCLUDED.valor_total,
+            lancamentos = t.lancamentos + EXCLUDED.lancamentos;
+
+    ELSE
+        -- UPDATE: aplica (novo - antigo) por chave; mudanças que não afetam os totais
+        -- (ex.: arquivado, observacao) resultam em delta zero e não tocam a tabela.
+        INSERT INTO totais_mensais AS t (obra_id, funcionario_id, mes, is_gratificacao, valor_total, lancamentos)
+        SELECT obra_id, funcionario_id, mes, is_gratificacao, SUM(valor), SUM(qtd)
+        FROM (
+            SELECT obra_id, funcionario_id, date_trunc('month', data_servico)::date AS mes,
+                   (servico_id IS NULL AND COALESCE(servico_diverso_descricao, '') LIKE '[GRATIFICACAO]%') AS is_gratificacao,
+                   quantidade * valor_unitario AS valor, 1 AS qtd
+            FROM novos
+            UNION ALL
+            SELECT obra_id, funcionario_id, date_trunc('month', data_servico)::date,
+                   (servico_id IS NULL AND COALESCE(servico_diverso_descricao, '') LIKE '[GRATIFICACAO]%'),
+                   -(quantidade * valor_unitario), -1
+            FROM antigos
+        ) delta
+        WHERE obra_id IS NOT NULL AND funcionario_id IS NOT NULL
+        GROUP BY 1, 2, 3, 4
+        HAVING SUM(valor) <> 0 OR SUM(qtd) <> 0
+        ON CONFLICT (obra_id, funcionario_id, mes, is_gratificacao) DO UPDATE
+        SET valor_total = t.valor_total + EXCLUDED.valor_total,
+            lancamentos = t.lancamentos + EXCLUDED.lancamentos;
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_totais_mensais_insert ON lancamentos;
+CREATE TRIGGER trg_totais_mensais_insert
+    AFTER INSERT ON lancamentos
+    REFERENCING NEW TABLE AS novos
+    FOR EACH STATEMENT EXECUTE FUNCTION atualizar_totais_mensais();
+
+DROP TRIGGER IF EXISTS trg_totais_mensais_update ON lancamentos;
+CREATE TRIGGER trg_totais_mensais_update
+    AFTER UPDATE ON lancamentos
+    REFERENCING OLD TABLE AS antigos NEW TABLE AS novos
+    FOR EACH STATEMENT EXECUTE FUNCTION atualizar_totais_mensais();
+
+DROP TRIGGER IF EXISTS trg_totais_mensais_delete ON lancamentos;
+CREATE TRIGGER trg_totais_mensais_delete
+    AFTER DELETE ON lancamentos
+    REFERENCING OLD TABLE AS antigos
+    FOR EACH STATEMENT EXECUTE FUNCTION atualizar_totais_mensais();
+
+-- Recalcula a tabela inteira a partir de lancamentos. Bloqueia escritas em lancamentos
+-- durante a reconstrução para que nenhum delta dos triggers se perca.
+CREATE OR REPLACE FUNCTION reconstruir_totais_mensais() RETURNS INTEGER
+LANGUAGE plpgsql AS $$
+DECLARE
+    linhas INTEGER;
+BEGIN
+    LOCK TABLE lancamentos IN SHARE MODE;
+    DELETE FROM totais_mensais;
+    INSERT INTO totais_mensais (obra_id, funcionario_id, mes, is_gratificacao, valor_total, lancamentos)
+    SELECT obra_id, funcionario_id, date_trunc('month', data_servico)::date,
+           (servico_id IS NULL AND COALESCE(servico_diverso_descricao, '') LIKE '[GRATIFICACAO]%'),
+           SUM(quantidade * valor_unitario), COUNT(*)
+    FROM lancamentos
+    WHERE obra_id IS NOT NULL AND funcionario_id IS NOT NULL
+    GROUP BY 1, 2, 3, 4;
+    GET DIAGNOSTICS linhas = ROW_COUNT;
+    RETURN linhas;
+END;
+$$;
+
+SELECT reconstruir_totais_mensais();
@@ -0,0 +1,11 @@
+-- Índices para a grade paginada de lançamentos (db_utils.get_pagina_lancamentos), que ordena
+-- por (data_lancamento, id) e continua a partir da última linha da página anterior.
+--
+-- Em produção, com a aplicação no ar, prefira executar cada comando com
+-- CREATE INDEX CONCURRENTLY (fora de um bloco de transação) para não bloquear escritas.
+
+CREATE INDEX IF NOT EXISTS idx_lancamentos_data_lancamento_id
+    ON lancamentos (data_lancamento, id);
+
+CREATE INDEX IF NOT EXISTS idx_lancamentos_obra_data_lancamento_id
+    ON lancamentos (obra_id, data_lancamento, id);
@@ -0,0 +1,22 @@
+-- Métricas das chamadas ao db_utils, gravadas em lote quando `gravar_metricas` está ligado
+-- (DB_GRAVAR_METRICAS=true ou st.secrets["database"]["gravar_metricas"]).
+-- Linhas com `sql` preenchido são comandos acima de `consulta_lenta_ms`, com parâmetros e plano.
+
+CREATE TABLE IF NOT EXISTS query_metrics (
+    id          BIGSERIAL PRIMARY KEY,
+    data_hora   TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    funcao      TEXT,
+    pagina      TEXT,
+    duracao_ms  DOUBLE PRECISION NOT NULL,
+    linhas      INTEGER,
+    bytes       BIGINT,
+    cache       TEXT,
+    consultas   INTEGER,
+    erro        TEXT,
+    sql         TEXT,
+    parametros  TEXT,
+    plano       TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_query_metrics_funcao_data_hora
+    ON query_metrics (funcao, data_hora);
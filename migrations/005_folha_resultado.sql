@@ -0,0 +1,29 @@
+-- Resumo da folha congelado no fechamento: uma linha por funcionário, gravada por
+-- launch_monthly_sheet na mesma transação que finaliza a folha. Enquanto a folha estiver
+-- 'Finalizada', o resumo, a auditoria, o PDF e o dashboard leem os valores daqui, exatamente
+-- como foram aprovados, em vez de recalculá-los.
+--
+-- Para folhas finalizadas antes desta migração: `python scripts/preencher_folha_resultado.py`
+-- (recalcula com os dados atuais).
+
+CREATE TABLE IF NOT EXISTS folha_resultado (
+    obra_id              INTEGER NOT NULL,
+    mes_referencia       DATE    NOT NULL,
+    funcionario_id       INTEGER NOT NULL,
+    funcao_id            INTEGER,
+    nome                 TEXT,
+    nome_obra            TEXT,
+    funcao               TEXT,
+    tipo                 TEXT,
+    data_admissao        DATE,
+    salario_base         NUMERIC(12, 2) NOT NULL DEFAULT 0,
+    producao_bruta       NUMERIC(12, 2) NOT NULL DEFAULT 0,
+    producao_liquida     NUMERIC(12, 2) NOT NULL DEFAULT 0,
+    total_gratificacoes  NUMERIC(12, 2) NOT NULL DEFAULT 0,
+    salario_a_receber    NUMERIC(12, 2) NOT NULL DEFAULT 0,
+    finalizado_em        TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (obra_id, mes_referencia, funcionario_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_folha_resultado_mes
+    ON folha_resultado (mes_referencia);
@@ -54,24 +54,15 @@ def render_page():
 
     mes_selecionado = st.session_state.selected_month
 
-    @st.cache_data
-    def get_audit_data(mes):
-        return db_utils.get_lancamentos_do_mes(mes), db_utils.get_funcionarios(), db_utils.get_obras(), db_utils.get_status_do_mes(mes), db_utils.get_folhas_mensais(mes)
+    def get_audit_data(mes, obra_id):
+        return db_utils.carregar_em_paralelo(
+            (db_utils.get_lancamentos_do_mes, mes, obra_id),
+            (db_utils.get_resumo_folha, mes, obra_id),
+            (db_utils.get_status_do_mes, mes, obra_id),
+            (db_utils.get_folhas_mensais, mes, obra_id),
+        )
 
-    lancamentos_df, funcionarios_df, obras_df, status_df, folhas_df = get_audit_data(mes_selecionado)
-    funcionarios_df = utils.filtrar_funcionarios_por_mes(funcionarios_df, mes_selecionado)
-    
-    snapshots_df = db_utils.get_snapshot_salarios(mes_selecionado)
-    if not snapshots_df.empty and not funcionarios_df.empty:
-        for index, func in funcionarios_df.iterrows():
-            folha_obra = folhas_df[folhas_df['obra_id'] == func['obra_id']]
-            status_folha_atual = folha_obra['status'].iloc[0] if not folha_obra.empty else "Aberta"
-            
-            if status_folha_atual != "Aberta":
-                snap = snapshots_df[snapshots_df['funcionario_id'] == func['id']]
-                if not snap.empty:
-                    funcionarios_df.at[index, 'SALARIO_BASE'] = snap['salario_base_na_epoca'].iloc[0]
-                    funcionarios_df.at[index, 'FUNÇÃO'] = snap['funcao_na_epoca'].iloc[0]
+    obras_df = db_utils.get_obras()
 
     st.header(f"Auditoria de Lançamentos - {mes_selecionado}")
 
@@ -80,13 +71,15 @@ def render_page():
     
     if not obra_selecionada: st.info("Selecione uma obra para começar."); st.stop()
 
+    obra_id_selecionada = int(obras_df.loc[obras_df['NOME DA OBRA'] == obra_selecionada, 'id'].iloc[0])
+    lancamentos_df, resumo_obra_df, status_df, folhas_df = get_audit_data(mes_selecionado, obra_id_selecionada)
+
     funcionarios_filtrados_nomes = []
-    funcionarios_da_obra = sorted(funcionarios_df[funcionarios_df['OBRA'] == obra_selecionada]['NOME'].unique())
+    funcionarios_da_obra = sorted(resumo_obra_df['NOME'].unique()) if not resumo_obra_df.empty else []
     funcionarios_filtrados_nomes = col_filtro2.multiselect("Filtrar Funcionário", options=funcionarios_da_obra, key="aud_func_multiselect")
 
-    obra_id_selecionada = int(obras_df.loc[obras_df['NOME DA OBRA'] == obra_selecionada, 'id'].iloc[0])
     lancamentos_obra_df = lancamentos_df[lancamentos_df['Obra'] == obra_selecionada]
-    funcionarios_obra_df = funcionarios_df[funcionarios_df['OBRA'] == obra_selecionada]
+    funcionarios_obra_df = resumo_obra_df
     if funcionarios_filtrados_nomes: funcionarios_obra_df = funcionarios_obra_df[funcionarios_obra_df['NOME'].isin(funcionarios_filtrados_nomes)]
     folha_do_mes = folhas_df[folhas_df['obra_id'] == obra_id_selecionada]
     status_folha = folha_do_mes['status'].iloc[0] if not folha_do_mes.empty else "Não Enviada"
@@ -138,16 +131,16 @@ def render_page():
             if st.button("Salvar Status da Obra"):
                 if selected_status_obra != status_auditoria_interno:
                     db_utils.upsert_status_auditoria(obra_id_selecionada, 0, mes_selecionado, status=selected_status_obra) 
-                    st.toast("Status da Obra atualizado!", icon="✅"); st.cache_data.clear(); st.rerun()
+                    st.toast("Status da Obra atualizado!", icon="✅"); st.rerun()
         st.space("medium")
         pode_finalizar = status_auditoria_interno == "Aprovado" and status_folha == "Enviada para Auditoria"
         if st.button("Finalizar e Arquivar Folha", use_container_width=True, type="primary", disabled=not pode_finalizar, help="Status interno 'Aprovado' e folha 'Enviada' necessários."):
             mes_dt = pd.to_datetime(mes_selecionado, format='%Y-%m')
-            if db_utils.launch_monthly_sheet(obra_id_selecionada, mes_dt, obra_selecionada): st.cache_data.clear(); st.rerun()
+            if db_utils.launch_monthly_sheet(obra_id_selecionada, mes_dt, obra_selecionada): st.rerun()
         
         pode_devolver = status_auditoria_interno == "Analisar" and status_folha == "Enviada para Auditoria"
         if st.button("Devolver Folha para Revisão", use_container_width=True, disabled=not pode_devolver, help="Status interno 'Analisar' e folha 'Enviada' necessários."):
-            if db_utils.devolver_folha_para_revisao(obra_id_selecionada, mes_selecionado): st.cache_data.clear(); st.rerun()
+            if db_utils.devolver_folha_para_revisao(obra_id_selecionada, mes_selecionado): st.rerun()
 
 
     with col_aviso_geral:
@@ -164,53 +157,33 @@ def render_page():
         aviso_val = obras_df.loc[obras_df['id'] == obra_id_selecionada, 'aviso'].iloc[0]
         novo_aviso = st.text_area("Aviso aos Engenheiros:", value=aviso_val if pd.notna(aviso_val) else "", key=f"aviso_{obra_selecionada}")
         if st.button("Salvar Aviso"):
-             db_utils.save_aviso_data(obra_id_selecionada, novo_aviso); st.toast("Salvo!"); st.cache_data.clear(); st.rerun()
+             db_utils.save_aviso_data(obra_id_selecionada, novo_aviso); st.toast("Salvo!"); st.rerun()
 
     st.markdown("---")
 
     if not funcionarios_obra_df.empty:
-        funcionarios_obra_df['SALARIO_BASE'] = funcionarios_obra_df['SALARIO_BASE'].apply(utils.safe_float)
-        
-        producao_bruta_df = pd.DataFrame()
-        total_gratificacoes_df = pd.DataFrame()
-
-        if not lancamentos_obra_df.empty:
-            lancamentos_obra_df['Valor Parcial'] = lancamentos_obra_df['Valor Parcial'].apply(utils.safe_float)
-            
-            lanc_producao = lancamentos_obra_df[lancamentos_obra_df['Disciplina'] != 'GRATIFICAÇÃO']
-            if not lanc_producao.empty:
-                producao_bruta_df = lanc_producao.groupby('funcionario_id')['Valor Parcial'].sum().reset_index()
-                producao_bruta_df.rename(columns={'Valor Parcial': 'PRODUÇÃO BRUTA (R$)'}, inplace=True)
-            
-            lanc_gratificacoes = lancamentos_obra_df[lancamentos_obra_df['Disciplina'] == 'GRATIFICAÇÃO']
-            if not lanc_gratificacoes.empty:
-                total_gratificacoes_df = lanc_gratificacoes.groupby('funcionario_id')['Valor Parcial'].sum().reset_index()
-                total_gratificacoes_df.rename(columns={'Valor Parcial': 'TOTAL GRATIFICAÇÕES (R$)'}, inplace=True)
-
-        resumo_df = funcionarios_obra_df.copy()
-        
-        if not producao_bruta_df.empty:
-            resumo_df = pd.merge(resumo_df, producao_bruta_df, left_on='id', right_on='funcionario_id', how='left')
-            if 'funcionario_id' in resumo_df.columns: resumo_df.drop(columns=['funcionario_id'], inplace=True)
-        else:
-            resumo_df['PRODUÇÃO BRUTA (R$)'] = 0.0
-            
-        if not total_gratificacoes_df.empty:
-             resumo_df = pd.merge(resumo_df, total_gratificacoes_df, left_on='id', right_on='funcionario_id', how='left', suffixes=('', '_grat'))
-             if 'funcionario_id_grat' in resumo_df.columns: resumo_df.drop(columns=['funcionario_id_grat'], inplace=True)
-             if 'funcionario_id' in resumo_df.columns and 'id' in resumo_df.columns and 'funcionario_id' != 'id': resumo_df.drop(columns=['funcionario_id'], inplace=True)
-        else:
-             resumo_df['TOTAL GRATIFICAÇÕES (R$)'] = 0.0
-        resumo_df.rename(columns={'NOME': 'Funcionário', 'SALARIO_BASE': 'SALÁRIO BASE (R$)'}, inplace=True)
-        resumo_df['PRODUÇÃO BRUTA (R$)'] = resumo_df['PRODUÇÃO BRUTA (R$)'].fillna(0.0).apply(utils.safe_float)
-        resumo_df['TOTAL GRATIFICAÇÕES (R$)'] = resumo_df['TOTAL GRATIFICAÇÕES (R$)'].fillna(0.0).apply(utils.safe_float)
-        resumo_df['SALÁRIO BASE (R$)'] = resumo_df['SALÁRIO BASE (R$)'].fillna(0.0)
-
-        resumo_df['PRODUÇÃO LÍQUIDA (R$)'] = resumo_df.apply(utils.calcular_producao_liquida, axis=1)
-        resumo_df['SALÁRIO A RECEBER (R$)'] = resumo_df.apply(utils.calcular_salario_final, axis=1)
+        resumo_df = funcionarios_obra_df.rename(columns={'NOME': 'Funcionário'})
 
         st.subheader("Análise por Funcionário")
 
+        with st.expander("Ações em Lote"):
+            col_lote_prod, col_lote_sel = st.columns(2)
+            with col_lote_prod:
+                ids_com_producao = resumo_df.loc[resumo_df['id'].isin(lancamentos_obra_df['funcionario_id'].unique()), 'id'].tolist()
+                st.caption(f"{len(ids_com_producao)} funcionário(s) com produção no mês.")
+                if st.button("Aprovar todos com produção", key=f"aud_lote_aprovar_{obra_selecionada}", disabled=edicao_bloqueada or not ids_com_producao, use_container_width=True):
+                    alteracoes = [{'funcionario_id': func_id, 'status': 'Aprovado'} for func_id in ids_com_producao]
+                    if db_utils.upsert_status_auditoria_em_lote(obra_id_selecionada, mes_selecionado, alteracoes):
+                        st.toast(f"{len(alteracoes)} funcionário(s) aprovados!", icon="✅"); st.rerun()
+            with col_lote_sel:
+                nomes_lote = st.multiselect("Funcionários:", options=resumo_df['Funcionário'].tolist(), key=f"aud_lote_func_{obra_selecionada}", disabled=edicao_bloqueada)
+                status_lote = st.radio("Marcar como:", options=['A Revisar', 'Aprovado', 'Analisar'], horizontal=True, key=f"aud_lote_status_{obra_selecionada}", disabled=edicao_bloqueada)
+                if st.button("Marcar Selecionados", key=f"aud_lote_marcar_{obra_selecionada}", disabled=edicao_bloqueada or not nomes_lote, use_container_width=True):
+                    ids_lote = resumo_df.loc[resumo_df['Funcionário'].isin(nomes_lote), 'id'].tolist()
+                    alteracoes = [{'funcionario_id': func_id, 'status': status_lote} for func_id in ids_lote]
+                    if db_utils.upsert_status_auditoria_em_lote(obra_id_selecionada, mes_selecionado, alteracoes):
+                        st.toast(f"{len(alteracoes)} funcionário(s) marcados como '{status_lote}'!", icon="✅"); st.rerun()
+
         for _, row in resumo_df.iterrows():
             with st.container(border=True):
                 funcionario_nome = row['Funcionário'] 
@@ -252,7 +225,7 @@ def render_page():
                         if st.button("Salvar Status", key=f"btn_func_{obra_selecionada}_{funcionario_nome}", disabled=edicao_bloqueada):
                             if selected_status_func != status_f:
                                 db_utils.upsert_status_auditoria(obra_id_selecionada, row['id'], mes_selecionado, status=selected_status_func)
-                                st.toast(f"Status de {funcionario_nome} atualizado!", icon="✅"); st.cache_data.clear(); st.rerun()
+                                st.toast(f"Status de {funcionario_nome} atualizado!", icon="✅"); st.rerun()
                     
                     with col_comment:
                         st.markdown("##### Comentário de Auditoria")
@@ -296,7 +269,7 @@ def render_page():
                                     if not alteracoes.empty:
                                         updates_list = [{'id': int(lanc_id), 'obs': str(nova_obs)} for lanc_id, nova_obs in alteracoes.items()]
                                         if db_utils.atualizar_observacoes(updates_list):
-                                            st.toast("Observações salvas!", icon="✅"); st.cache_data.clear(); st.rerun()
+                                            st.toast("Observações salvas!", icon="✅"); st.rerun()
                                     else: 
                                         st.toast("Nenhuma alteração detectada.", icon="🤷")
                                 except Exception as e:
@@ -81,7 +81,8 @@ def render_page():
     
     st.header("Dashboard de Análise")
     
-    folhas_historico = db_utils.get_folhas_mensais()
+    obra_id_sessao = st.session_state.get('obra_logada_id') if st.session_state['role'] != 'admin' else None
+    folhas_historico = db_utils.get_folhas_mensais(obra_id=obra_id_sessao)
     
     opcoes_meses_reais = []
     if not folhas_historico.empty:
@@ -115,23 +116,26 @@ def render_page():
             is_periodo_composto = len(meses_para_consulta) > 1
             texto_periodo = ", ".join(meses_para_consulta)
 
-        @st.cache_data
-        def get_data_multi(lista_meses):
-            dfs_lanc = []
-            dfs_folha = []
-            for m in lista_meses:
-                l = db_utils.get_lancamentos_do_mes(m)
-                f = db_utils.get_folhas_mensais(m)
-                if not l.empty: dfs_lanc.append(l)
-                if not f.empty: dfs_folha.append(f)
-            
-            lanc_final = pd.concat(dfs_lanc, ignore_index=True) if dfs_lanc else pd.DataFrame()
-            folha_final = pd.concat(dfs_folha, ignore_index=True) if dfs_folha else pd.DataFrame()
-            return lanc_final, folha_final
-
-        funcionarios_df = db_utils.get_funcionarios()
-        
-        lancamentos_df, folhas_df = get_data_multi(meses_para_consulta)
+        def get_data_multi(lista_meses, obra_id):
+            if not lista_meses:
+                return pd.DataFrame(), pd.DataFrame(), pd.DataFrame()
+            mes_inicio, mes_fim = min(lista_meses), max(lista_meses)
+            lanc_final, folha_final, resumo_final = db_utils.carregar_em_paralelo(
+                (db_utils.get_lancamentos_periodo, mes_inicio, mes_fim, obra_id),
+                (db_utils.get_folhas_periodo, mes_inicio, mes_fim, obra_id),
+                (db_utils.get_resumo_periodo, mes_inicio, mes_fim, obra_id),
+            )
+
+            # A consulta cobre o intervalo inteiro; meses fora da seleção são descartados aqui.
+            if not lanc_final.empty:
+                lanc_final = lanc_final[lanc_final['Data do Serviço'].dt.strftime('%Y-%m').isin(lista_meses)].reset_index(drop=True)
+            if not folha_final.empty:
+                folha_final = folha_final[pd.to_datetime(folha_final['Mes']).dt.strftime('%Y-%m').isin(lista_meses)].reset_index(drop=True)
+            if not resumo_final.empty:
+                resumo_final = resumo_final[pd.to_datetime(resumo_final['Mes']).dt.strftime('%Y-%m').isin(lista_meses)].reset_index(drop=True)
+            return lanc_final, folha_final, resumo_final
+
+        lancamentos_df, folhas_df, resumo_mensal = get_data_multi(meses_para_consulta, obra_id_sessao)
 
         if not lancamentos_df.empty:
             obras_disp = sorted(lancamentos_df['Obra'].unique())
@@ -147,42 +151,44 @@ def render_page():
             lancs_f = lancs_f[lancs_f['Obra'].isin(sel_obras)]
 
         funcoes_disp = []
-        if not funcionarios_df.empty:
-            funcoes_disp = sorted(funcionarios_df['FUNÇÃO'].unique())
+        if not resumo_mensal.empty:
+            funcoes_disp = sorted(resumo_mensal['FUNÇÃO'].unique())
             
         sel_func = c_func.multiselect("Função", funcoes_disp)
         
         nomes_disp = []
-        if not funcionarios_df.empty:
-             nomes_disp = sorted(funcionarios_df['NOME'].unique())
+        if not resumo_mensal.empty:
+             nomes_disp = sorted(resumo_mensal['NOME'].unique())
         sel_nome = c_nome.multiselect("Nome", nomes_disp)
 
     if lancs_f.empty:
         st.warning(f"Sem lançamentos encontrados para: {texto_periodo}")
         return
 
-    lancs_f['Valor Parcial'] = pd.to_numeric(lancs_f['Valor Parcial'], errors='coerce').fillna(0)
-    lancs_f.rename(columns={'data_servico': 'Data do Serviço'}, inplace=True)
-    lancs_f['Data do Serviço'] = pd.to_datetime(lancs_f['Data do Serviço'])
-
-    funcionarios_df['SALARIO_BASE'] = pd.to_numeric(funcionarios_df['SALARIO_BASE'], errors='coerce').fillna(0)
-    
-    prod = lancs_f[lancs_f['Disciplina']!='GRATIFICAÇÃO'].groupby('funcionario_id')['Valor Parcial'].sum().reset_index().rename(columns={'Valor Parcial': 'PRODUÇÃO BRUTA (R$)'})
-    grat = lancs_f[lancs_f['Disciplina']=='GRATIFICAÇÃO'].groupby('funcionario_id')['Valor Parcial'].sum().reset_index().rename(columns={'Valor Parcial': 'TOTAL GRATIFICAÇÕES (R$)'})
-    
-    resumo = funcionarios_df.merge(prod, left_on='id', right_on='funcionario_id', how='left').merge(grat, left_on='id', right_on='funcionario_id', how='left')
-    resumo[['PRODUÇÃO BRUTA (R$)', 'TOTAL GRATIFICAÇÕES (R$)']] = resumo[['PRODUÇÃO BRUTA (R$)', 'TOTAL GRATIFICAÇÕES (R$)']].fillna(0)
-    
-    resumo['PRODUÇÃO LÍQUIDA (R$)'] = resumo.apply(utils.calcular_producao_liquida, axis=1)
+    # Folha de cada mês (a mesma do resumo, da auditoria e do PDF) somada por funcionário, em centavos.
+    # SALARIO_BASE é o salário mensal do último mês; o ROI compara a produção com os salários do período.
+    colunas_moeda = ['SALÁRIO BASE (R$)', 'PRODUÇÃO BRUTA (R$)', 'PRODUÇÃO LÍQUIDA (R$)', 'TOTAL GRATIFICAÇÕES (R$)', 'SALÁRIO A RECEBER (R$)']
+    # O filtro de obra vale para cada mês: quem trocou de obra soma só os meses nas obras selecionadas.
+    resumo_obras = resumo_mensal
+    if sel_obras and not resumo_obras.empty:
+        resumo_obras = resumo_obras[resumo_obras['OBRA'].isin(sel_obras)]
+    if resumo_obras.empty: st.warning("Sem dados nos filtros selecionados."); return
+
+    resumo_centavos = resumo_obras.assign(**{coluna: utils.para_centavos(resumo_obras[coluna]) for coluna in colunas_moeda})
+    resumo = resumo_centavos.groupby('id', sort=False).agg(
+        obra_id=('obra_id', 'last'), NOME=('NOME', 'last'), OBRA=('OBRA', 'last'), FUNÇÃO=('FUNÇÃO', 'last'),
+        TIPO=('TIPO', 'last'), SALARIO_BASE=('SALÁRIO BASE (R$)', 'last'),
+        **{coluna: (coluna, 'sum') for coluna in colunas_moeda}
+    ).reset_index()
+    resumo[colunas_moeda + ['SALARIO_BASE']] = resumo[colunas_moeda + ['SALARIO_BASE']] / 100
     
-    resumo['ROI'] = np.where(resumo['SALARIO_BASE'] > 0, resumo['PRODUÇÃO BRUTA (R$)'] / resumo['SALARIO_BASE'], 0)
+    resumo['ROI'] = np.where(resumo['SALÁRIO BASE (R$)'] > 0, resumo['PRODUÇÃO BRUTA (R$)'] / resumo['SALÁRIO BASE (R$)'], 0)
     resumo['ROI'] = pd.to_numeric(resumo['ROI'], errors='coerce').fillna(0)
     resumo['ROI'] = resumo['ROI'].replace([np.inf, -np.inf], 0)
     
     resumo['Funcionário'] = resumo['NOME']
 
     df_f = resumo.copy()
-    if sel_obras: df_f = df_f[df_f['OBRA'].isin(sel_obras)]
     if sel_func: df_f = df_f[df_f['FUNÇÃO'].isin(sel_func)]
     if sel_nome: df_f = df_f[df_f['NOME'].isin(sel_nome)]
     
@@ -205,9 +211,9 @@ def render_page():
     with tabs[0]:
         st.subheader("Resumo do Período")
         
-        tot_bruta = df_f['PRODUÇÃO BRUTA (R$)'].sum()
-        tot_liq = df_f['PRODUÇÃO LÍQUIDA (R$)'].sum()
-        tot_grat = df_f['TOTAL GRATIFICAÇÕES (R$)'].sum()
+        tot_bruta = utils.somar_moeda(df_f['PRODUÇÃO BRUTA (R$)'])
+        tot_liq = utils.somar_moeda(df_f['PRODUÇÃO LÍQUIDA (R$)'])
+        tot_grat = utils.somar_moeda(df_f['TOTAL GRATIFICAÇÕES (R$)'])
         med_liq = df_f['PRODUÇÃO LÍQUIDA (R$)'].mean()
         
         destaque_nome = "N/A"
@@ -262,7 +268,7 @@ def render_page():
             top_efic = df_f.groupby('OBRA')['PRODUÇÃO LÍQUIDA (R$)'].mean().idxmax() if not df_f.empty else "N/A"
             
             lancs_prod = lancs_f[lancs_f['Disciplina']!='GRATIFICAÇÃO']
-            top_serv = lancs_prod.groupby('Serviço')['Valor Parcial'].sum().idxmax() if not lancs_prod.empty else "N/A"
+            top_serv = lancs_prod.groupby('Serviço', observed=True)['Valor Parcial'].sum().idxmax() if not lancs_prod.empty else "N/A"
             if len(str(top_serv)) > 20: top_serv = str(top_serv)[:20] + "..."
 
             ak1, ak2, ak3, ak4 = st.columns(4)
@@ -337,7 +343,7 @@ def render_page():
         
         with c_det1:
             if not lancs_f.empty:
-                pareto = lancs_f[lancs_f['Disciplina']!='GRATIFICAÇÃO'].groupby('Serviço')['Valor Parcial'].sum().reset_index().sort_values('Valor Parcial', ascending=False)
+                pareto = lancs_f[lancs_f['Disciplina']!='GRATIFICAÇÃO'].groupby('Serviço', observed=True)['Valor Parcial'].sum().reset_index().sort_values('Valor Parcial', ascending=False)
                 pareto['Acum'] = pareto['Valor Parcial'].cumsum() / pareto['Valor Parcial'].sum() * 100
                 pareto = pareto.head(15)
                 pareto['Serviço_Visual'] = pareto['Serviço'].apply(lambda x: x[:20] + '...' if len(x) > 20 else x)
@@ -363,7 +369,6 @@ def render_page():
         st.subheader("Linha do Tempo")
         c_t1, c_t2 = st.columns([2,1])
         with c_t1:
-            lancs_f['Data do Serviço'] = pd.to_datetime(lancs_f['Data do Serviço'])
             evo = lancs_f.groupby(lancs_f['Data do Serviço'].dt.date)['Valor Parcial'].sum().reset_index()
             fig_line = px.line(evo, x='Data do Serviço', y='Valor Parcial', markers=True, title="Produção Diária")
             fig_line.update_traces(line_color=cor_bruta)
@@ -371,7 +376,7 @@ def render_page():
         
         with c_t2:
             lancs_f['Dia'] = lancs_f['Data do Serviço'].dt.day
-            heat_df = pd.merge(lancs_f[['Dia', 'funcionario_id', 'Valor Parcial']], funcionarios_df[['id', 'FUNÇÃO']], left_on='funcionario_id', right_on='id')
+            heat_df = pd.merge(lancs_f[['Dia', 'funcionario_id', 'Valor Parcial']], resumo[['id', 'FUNÇÃO']], left_on='funcionario_id', right_on='id')
             piv = heat_df.pivot_table(index='FUNÇÃO', columns='Dia', values='Valor Parcial', aggfunc='sum').fillna(0)
             if not piv.empty:
                 fig_heat = px.imshow(piv, aspect='auto', color_continuous_scale='magma', title="Mapa de Calor (Dia x Função)")
@@ -386,12 +391,12 @@ def render_page():
             lancs_prod = lancs_f[lancs_f['Disciplina']!='GRATIFICAÇÃO']
             if not lancs_prod.empty:
                 with c_d1:
-                    top_s = lancs_prod.groupby('Serviço')['Valor Parcial'].sum().nlargest(10).reset_index().sort_values('Valor Parcial', ascending=True)
+                    top_s = lancs_prod.groupby('Serviço', observed=True)['Valor Parcial'].sum().nlargest(10).reset_index().sort_values('Valor Parcial', ascending=True)
                     fig = px.bar(top_s, y='Serviço', x='Valor Parcial', orientation='h', title="Top 10 Serviços (Custo Total)", text_auto='.2s')
                     fig.update_traces(marker_color=cor_bruta, textposition='outside', cliponaxis=False)
                     st.plotly_chart(style_fig(fig), use_container_width=True)
                 with c_d2:
-                    top_d = lancs_prod.groupby('Disciplina')['Valor Parcial'].sum().nlargest(10).reset_index().sort_values('Valor Parcial', ascending=True)
+                    top_d = lancs_prod.groupby('Disciplina', observed=True)['Valor Parcial'].sum().nlargest(10).reset_index().sort_values('Valor Parcial', ascending=True)
                     fig = px.bar(top_d, y='Disciplina', x='Valor Parcial', orientation='h', title="Top 10 Disciplinas", text_auto='.2s')
                     fig.update_traces(marker_color=cor_bruta, textposition='outside', cliponaxis=False)
                     st.plotly_chart(style_fig(fig), use_container_width=True)
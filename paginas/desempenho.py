@@ -0,0 +1,70 @@
+import streamlit as st
+import db_utils
+
+
+def render_page():
+    if st.session_state['role'] != 'admin':
+        st.error("Acesso negado.")
+        st.stop()
+
+    st.header("Desempenho")
+    st.caption("Chamadas ao banco registradas por este processo desde o último reinício (buffer circular).")
+
+    resumo_df = db_utils.resumir_metricas_consultas()
+    stats_pool = db_utils.get_estatisticas_pool()
+
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Chamadas", int(resumo_df['chamadas'].sum()) if not resumo_df.empty else 0)
+    col2.metric("Tempo total", f"{resumo_df['total_ms'].sum() / 1000:.1f} s" if not resumo_df.empty else "0 s")
+    if stats_pool:
+        col3.metric("Conexões em uso", f"{stats_pool['em_uso']}/{stats_pool['tamanho_pool']}")
+        col4.metric("Espera média do pool", f"{stats_pool['espera_media_ms']:.1f} ms")
+        replica = stats_pool.get('replica')
+        if replica:
+            st.caption(f"Réplica: {replica['em_uso']}/{replica['tamanho_pool']} conexões em uso, "
+                       f"espera média {replica['espera_media_ms']:.1f} ms (máx. {replica['espera_max_ms']:.1f} ms), "
+                       f"{replica['checkouts']} checkouts, {replica['timeouts']} timeouts.")
+
+    st.subheader("Por função")
+    if resumo_df.empty:
+        st.info("Nenhuma chamada registrada ainda.")
+    else:
+        resumo_df['acerto_cache'] = resumo_df['acerto_cache'] * 100
+        resumo_df['bytes_media'] = resumo_df['bytes_media'] / 1024
+        st.dataframe(
+            resumo_df,
+            use_container_width=True, hide_index=True,
+            column_config={
+                'funcao': st.column_config.TextColumn("Função"),
+                'chamadas': st.column_config.NumberColumn("Chamadas"),
+                'p50_ms': st.column_config.NumberColumn("p50", format="%.1f ms"),
+                'p95_ms': st.column_config.NumberColumn("p95", format="%.1f ms"),
+                'max_ms': st.column_config.NumberColumn("Máx.", format="%.1f ms"),
+                'total_ms': st.column_config.NumberColumn("Total", format="%.0f ms"),
+                'acerto_cache': st.column_config.NumberColumn("Cache", format="%.0f%%"),
+                'linhas_media': st.column_config.NumberColumn("Linhas (média)", format="%.0f"),
+                'bytes_media': st.column_config.NumberColumn("Tamanho (média)", format="%.0f KB"),
+                'erros': st.column_config.NumberColumn("Falhas"),
+            }
+        )
+
+    st.subheader("Consultas lentas")
+    lentas_df = db_utils.get_consultas_lentas()
+    if lentas_df.empty:
+        st.info("Nenhuma consulta acima do limite configurado (consulta_lenta_ms).")
+    else:
+        for _, consulta in lentas_df.iloc[::-1].iterrows():
+            titulo = f"{consulta['duracao_ms']:.0f} ms • {consulta['funcao'] or '-'} • {consulta['pagina'] or '-'} • {consulta['data_hora']:%d/%m %H:%M:%S}"
+            with st.expander(titulo):
+                st.code(consulta['sql'], language="sql")
+                if consulta['parametros']:
+                    st.caption(f"Parâmetros: {consulta['parametros']}")
+                if consulta['plano']:
+                    st.code(consulta['plano'], language="text")
+
+    with st.expander("Últimas chamadas"):
+        st.dataframe(db_utils.get_metricas_consultas().iloc[::-1].head(500), use_container_width=True, hide_index=True)
+
+    if st.button("Limpar métricas"):
+        db_utils.limpar_metricas_consultas()
+        st.rerun()
@@ -7,7 +7,6 @@ from datetime import date
 def render_page():
     st.header("Gerenciar Funcionários")
 
-    @st.cache_data
     def get_all_data():
         funcionarios_df = db_utils.get_funcionarios()
         obras_df = db_utils.get_obras()
@@ -65,7 +64,6 @@ def render_page():
                         with st.spinner("Adicionando funcionário..."):
                             if db_utils.adicionar_funcionario(nome, funcao_id, obra_id, data_admissao):
                                 st.success(f"Funcionário '{nome}' adicionado com sucesso!")
-                                st.cache_data.clear() 
                                 st.rerun()
 
     with tab_inativar:
@@ -116,7 +114,6 @@ def render_page():
                         funcionario_id = int(funcionario_info.iloc[0])
                         if db_utils.inativar_funcionario(funcionario_id):
                             st.success(f"Funcionário '{func_para_remover_nome}' inativado com sucesso!")
-                            st.cache_data.clear() 
                             st.rerun()
                     else:
                         st.error(f"Erro: Funcionário '{func_para_remover_nome}' não encontrado.")
@@ -175,7 +172,6 @@ def render_page():
                                 with st.spinner("Salvando alterações..."):
                                     if db_utils.editar_funcionario(func_id, novo_nome, nova_funcao_id, nova_obra_id):
                                         st.success(f"Funcionário '{novo_nome}' atualizado com sucesso!")
-                                        st.cache_data.clear()
                                         st.rerun()
             except Exception as e:
                 st.error(f"Erro ao carregar dados do funcionário. A função ou obra dele pode ter sido inativada. Detalhe: {e}")
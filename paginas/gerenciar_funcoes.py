@@ -6,11 +6,9 @@ import utils
 def render_page():
     st.header("Gerenciar Funções")
 
-    @st.cache_data
     def get_all_funcoes_cached():
         return db_utils.get_all_funcoes()
 
-    @st.cache_data
     def get_funcionarios_cached():
         return db_utils.get_funcionarios()
 
@@ -38,7 +36,6 @@ def render_page():
                         with st.spinner("Adicionando função..."):
                             if db_utils.adicionar_funcao(nome_funcao, tipo_valor, salario_base):
                                 st.success(f"Função '{nome_funcao}' adicionada com sucesso!")
-                                st.cache_data.clear() 
                                 st.rerun()
 
     st.subheader("Funções Ativas")
@@ -112,7 +109,6 @@ def render_page():
                                     )
                                     if sucesso:
                                         st.success("Atualizado!")
-                                        st.cache_data.clear()
                                         st.rerun()
             with col_btn2:
                 with st.popover("Inativar Função", use_container_width=True):
@@ -128,7 +124,6 @@ def render_page():
                             with st.spinner("Inativando..."):
                                 if db_utils.inativar_funcao(funcao_id):
                                     st.success("Inativada com sucesso.")
-                                    st.cache_data.clear() 
                                     st.rerun()
             
             st.write("")
@@ -23,7 +23,6 @@ def render_page():
                 with st.spinner("Adicionando nova obra, aguarde..."):
                     if db_utils.adicionar_obra(nome_obra, codigo_acesso):
                         st.success(f"Obra '{nome_obra}' adicionada com sucesso!")
-                        st.cache_data.clear()
                         st.rerun()
             else:
                 st.warning("O nome da obra e o código de acesso não podem estar em branco.")
@@ -68,7 +67,6 @@ def render_page():
                         obra_id_para_remover = int(obra_info.iloc[0])
                         if db_utils.remover_obra(obra_id_para_remover):
                             st.success(f"Obra '{obra_para_remover_nome}' removida com sucesso!")
-                            st.cache_data.clear()
                             st.rerun()
                     else:
                         st.error(f"Erro: Obra '{obra_para_remover_nome}' não encontrada. A página pode estar desatualizada.")
@@ -93,7 +91,6 @@ def render_page():
                         obra_id_para_alterar = int(obra_info.iloc[0])
                         if db_utils.mudar_codigo_acesso_obra(obra_id_para_alterar, novo_codigo):
                             st.success(f"Código de acesso da obra '{obra_para_alterar_codigo_nome}' alterado com sucesso!")
-                            st.cache_data.clear()
                             st.rerun()
                     else:
                         st.error(f"Erro: Obra '{obra_para_alterar_codigo_nome}' não encontrada. A página pode estar desatualizada.")
@@ -9,7 +9,6 @@ def render_page():
 
     st.header("Gerenciar Serviços e Disciplinas")
 
-    @st.cache_data
     def get_servicos_e_disciplinas_data():
         all_servicos_df = db_utils.get_all_servicos()
         all_disciplinas_df = db_utils.get_all_disciplinas()
@@ -41,7 +40,6 @@ def render_page():
                             with st.spinner("Adicionando..."):
                                 if db_utils.adicionar_disciplina(nome_disciplina.upper()):
                                     st.success(f"Disciplina '{nome_disciplina.upper()}' adicionada!")
-                                    st.cache_data.clear()
                                     st.rerun()
         
         with col_add_serv:
@@ -74,7 +72,6 @@ def render_page():
                                 with st.spinner("Adicionando serviço..."):
                                     if db_utils.adicionar_servico(disciplina_id, descricao, unidade.upper(), valor_unitario):
                                         st.success(f"Serviço '{descricao}' adicionado com sucesso!")
-                                        st.cache_data.clear()
                                         st.rerun()
 
     with tab_inativar:
@@ -112,7 +109,6 @@ def render_page():
                                 with st.spinner("Inativando..."):
                                     if db_utils.inativar_servico(servico_id):
                                         st.success("Serviço inativado!")
-                                        st.cache_data.clear()
                                         st.rerun()
                         else:
                             st.success(f"Este serviço está **Inativo**.")
@@ -120,7 +116,6 @@ def render_page():
                                 with st.spinner("Reativando..."):
                                     if db_utils.reativar_servico(servico_id):
                                         st.success("Serviço reativado!")
-                                        st.cache_data.clear()
                                         st.rerun()
         
         with col_inativar_disc:
@@ -155,7 +150,6 @@ def render_page():
                                     with st.spinner("Inativando..."):
                                         if db_utils.inativar_disciplina(disciplina_id):
                                             st.success("Disciplina inativada!")
-                                            st.cache_data.clear()
                                             st.rerun()
                         else:
                             st.success(f"A disciplina '{disciplina_selecionada_nome}' está **Inativa**.")
@@ -163,7 +157,6 @@ def render_page():
                                 with st.spinner("Reativando..."):
                                     if db_utils.reativar_disciplina(disciplina_id):
                                         st.success("Disciplina reativada!")
-                                        st.cache_data.clear()
                                         st.rerun()
 
         
@@ -227,7 +220,6 @@ def render_page():
                                     with st.spinner("Salvando alterações..."):
                                         if db_utils.editar_servico(servico_id_edit, novo_disciplina_id, novo_descricao, novo_unidade.upper(), novo_valor):
                                             st.success("Serviço atualizado com sucesso!")
-                                            st.cache_data.clear()
                                             st.rerun()
         
         with col_edit_disc:
@@ -260,7 +252,6 @@ def render_page():
                                     with st.spinner("Renomeando..."):
                                         if db_utils.editar_disciplina(disciplina_id_edit, novo_nome_disciplina.upper()):
                                             st.success("Disciplina renomeada!")
-                                            st.cache_data.clear()
                                             st.rerun()
 
         if all_servicos_df.empty:
@@ -0,0 +1,95 @@
+import time
+import streamlit as st
+import pandas as pd
+import db_utils
+import utils
+
+
+def _modelo_csv():
+    exemplo = pd.DataFrame([
+        {'Data': '05/01/2025', 'Funcionário': 'NOME DO FUNCIONÁRIO', 'Tipo': 'Serviço', 'Disciplina': 'DISCIPLINA', 'Serviço': 'DESCRIÇÃO DO SERVIÇO',
+         'Quantidade': 10, 'Valor Unitário': '', 'Observação': 'Pavimento 2'},
+        {'Data': '06/01/2025', 'Funcionário': 'NOME DO FUNCIONÁRIO', 'Tipo': 'Gratificação', 'Serviço': 'Bônus de meta',
+         'Quantidade': 1, 'Valor Unitário': 150, 'Observação': 'Meta atingida'},
+    ], columns=db_utils.COLUNAS_PLANILHA_LANCAMENTOS)
+    return exemplo.to_csv(index=False, sep=';').encode('utf-8-sig')
+
+
+def render_page():
+    mes_selecionado = st.session_state.selected_month
+    st.header(f"Importar Lançamentos • {mes_selecionado}")
+
+    if st.session_state['role'] == 'admin':
+        obras_df = db_utils.get_obras()
+        if obras_df.empty:
+            st.info("Nenhuma obra cadastrada.")
+            return
+        obra_nome = st.selectbox("Obra", options=sorted(obras_df['NOME DA OBRA'].unique()), key="import_obra")
+        obra_id = int(obras_df.loc[obras_df['NOME DA OBRA'] == obra_nome, 'id'].iloc[0])
+    else:
+        obra_id = st.session_state.get('obra_logada_id')
+        obra_nome = st.session_state.get('obra_logada')
+        if obra_id is None:
+            st.error("Não foi possível identificar a obra logada. Por favor, faça login novamente.")
+            st.stop()
+
+    st.markdown(
+        "Envie um arquivo **CSV** ou **XLSX** com as colunas "
+        + ", ".join(f"`{c}`" for c in db_utils.COLUNAS_PLANILHA_LANCAMENTOS)
+        + ". `Tipo` pode ser Serviço (padrão), Diverso ou Gratificação; em serviços, `Valor Unitário` em branco usa a tabela de preços"
+        " e `Disciplina` pode ficar em branco, exceto quando a mesma descrição existe em mais de uma disciplina."
+        " Datas em dd/mm/aaaa ou aaaa-mm-dd; números no formato brasileiro (1.234,56)."
+    )
+    st.download_button("Baixar modelo CSV", data=_modelo_csv(), file_name="modelo_lancamentos.csv", mime="text/csv")
+
+    arquivo = st.file_uploader("Planilha de lançamentos", type=['csv', 'xlsx'], key="import_arquivo")
+    if arquivo is None:
+        st.session_state.pop('import_resultado', None)
+        return
+
+    chave = (arquivo.name, arquivo.size, obra_id, mes_selecionado)
+    resultado = st.session_state.get('import_resultado')
+    if resultado is not None and resultado['chave'] != chave:
+        resultado = st.session_state['import_resultado'] = None
+
+    if st.button("Validar planilha", type="primary"):
+        inicio = time.perf_counter()
+        try:
+            with st.spinner("Validando..."):
+                validos_df, erros_df = db_utils.validar_planilha_lancamentos(arquivo, arquivo.name, obra_id, mes_selecionado)
+        except db_utils.FolhaFechadaException as ffe:
+            st.error(str(ffe))
+            return
+        except Exception as e:
+            st.error(f"Não foi possível ler a planilha: {e}")
+            return
+        resultado = st.session_state['import_resultado'] = {
+            'chave': chave, 'validos': validos_df, 'erros': erros_df, 'tempo': time.perf_counter() - inicio
+        }
+
+    if resultado is None:
+        return
+
+    validos_df, erros_df = resultado['validos'], resultado['erros']
+    linhas_com_erro = erros_df['Linha'].nunique() if not erros_df.empty else 0
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Linhas válidas", len(validos_df))
+    col2.metric("Linhas com erro", linhas_com_erro)
+    col3.metric("Validação", f"{resultado['tempo']:.2f} s")
+
+    if not erros_df.empty:
+        st.warning("Corrija as linhas abaixo na planilha e envie novamente. As linhas válidas podem ser importadas agora.")
+        st.dataframe(erros_df, use_container_width=True, hide_index=True)
+
+    if validos_df.empty:
+        return
+
+    total = (validos_df['quantidade'] * validos_df['valor_unitario']).sum()
+    st.caption(f"Valor total a importar: {utils.format_currency(total)}")
+    if st.button(f"Importar {len(validos_df)} lançamentos", key="import_confirmar"):
+        inicio = time.perf_counter()
+        with st.spinner("Importando..."):
+            inseridas = db_utils.carregar_lancamentos_em_massa(validos_df, f"Planilha '{arquivo.name}' ({obra_nome}, {mes_selecionado}).")
+        if inseridas is not None:
+            st.session_state.pop('import_resultado', None)
+            st.success(f"{inseridas} lançamentos importados em {time.perf_counter() - inicio:.2f} s.")
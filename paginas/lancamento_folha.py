@@ -60,18 +60,23 @@ def render_page():
 
     mes_selecionado = st.session_state.selected_month
 
-    @st.cache_data
-    def get_launch_page_data(mes):
-        funcionarios_df = db_utils.get_funcionarios()
-        precos_df = db_utils.get_precos()
-        obras_df = db_utils.get_obras()
-        lancamentos_do_mes_df = db_utils.get_lancamentos_do_mes(mes)
-        status_df = db_utils.get_status_do_mes(mes)
-        folhas_df = db_utils.get_folhas_mensais(mes) 
-        return funcionarios_df, precos_df, obras_df, lancamentos_do_mes_df, status_df, folhas_df
-
-    funcionarios_df, precos_df, obras_df, lancamentos_do_mes_df, status_df, folhas_df = get_launch_page_data(mes_selecionado)
-    snapshots_df = db_utils.get_snapshot_salarios(mes_selecionado)
+    def get_launch_page_data(mes, obra_id):
+        return db_utils.carregar_em_paralelo(
+            (db_utils.get_funcionarios, obra_id),
+            (db_utils.get_precos,),
+            (db_utils.get_obras,),
+            (db_utils.get_lancamentos_do_mes, mes, obra_id),
+            (db_utils.get_status_do_mes, mes, obra_id),
+            (db_utils.get_folhas_mensais, mes, obra_id),
+            (db_utils.get_snapshot_salarios, mes, obra_id),
+        )
+
+    obra_logada_id = st.session_state.get('obra_logada_id')
+    if obra_logada_id is None:
+        st.error("Não foi possível identificar a obra logada. Por favor, faça login novamente.")
+        st.stop()
+
+    funcionarios_df, precos_df, obras_df, lancamentos_do_mes_df, status_df, folhas_df, snapshots_df = get_launch_page_data(mes_selecionado, obra_logada_id)
     
     if not funcionarios_df.empty and 'data_admissao' in funcionarios_df.columns:
         funcionarios_df['data_admissao'] = pd.to_datetime(funcionarios_df['data_admissao']).dt.date
@@ -88,11 +93,6 @@ def render_page():
     st.header(f"Lançamentos de Produção • {mes_selecionado}")
 
     obra_logada = st.session_state['obra_logada']
-    obra_logada_id_info = obras_df.loc[obras_df['NOME DA OBRA'] == obra_logada, 'id']
-    if obra_logada_id_info.empty:
-        st.error("Não foi possível identificar a obra logada. Por favor, faça login novamente.")
-        st.stop()
-    obra_logada_id = int(obra_logada_id_info.iloc[0])
 
     try:
         mes_selecionado_dt = pd.to_datetime(mes_selecionado).date().replace(day=1)
@@ -338,7 +338,6 @@ def render_page():
 
                                 if db_utils.salvar_novos_lancamentos(df_para_salvar): 
                                     st.success(f"{len(novos_lancamentos)} lançamento(s) adicionado(s)!")
-                                    st.cache_data.clear() 
 
                                     keys_to_delete = [
                                         "lf_disciplina_select", "lf_servico_select", 
@@ -411,7 +410,6 @@ def render_page():
                     if st.button("Concluir Lançamentos", use_container_width=True, disabled=is_concluded, help="Marca este funcionário como concluído para este mês."):
                         if db_utils.upsert_status_auditoria(obra_logada_id, func_id, mes_selecionado, lancamentos_concluidos=True):
                             st.toast(f"'{funcionario_selecionado}' marcado como concluído.", icon="👍")
-                            st.cache_data.clear() 
                             st.rerun()
 
             funcionarios_concluidos_db = status_df[
@@ -423,7 +421,6 @@ def render_page():
                  if st.button("Limpar Concluídos", use_container_width=True, help="Remove a marcação de 'Concluído' de TODOS os funcionários desta obra para este mês."):
                     if db_utils.limpar_concluidos_obra_mes(obra_logada_id, mes_selecionado):
                         st.toast("Marcação de concluídos reiniciada.", icon="🧹")
-                        st.cache_data.clear()
                         st.rerun()
 
 
@@ -121,137 +121,177 @@ def abrir_modal_edicao(row, precos_df):
 def render_page():
     mes_selecionado = st.session_state.selected_month
     
-    @st.cache_data
-    def get_remove_page_data(mes):
-        lancamentos_df = db_utils.get_lancamentos_do_mes(mes)
-        obras_df = db_utils.get_obras() 
-        folhas_df = db_utils.get_folhas_mensais(mes)
-        precos_df = db_utils.get_precos()
-        return lancamentos_df, obras_df, folhas_df, precos_df
+    def get_remove_page_data(mes, obra_id):
+        return db_utils.carregar_em_paralelo(
+            (db_utils.get_obras,),
+            (db_utils.get_folhas_mensais, mes, obra_id),
+            (db_utils.get_precos,),
+        )
 
-    lancamentos_df, obras_df, folhas_df, precos_df = get_remove_page_data(mes_selecionado)
+    obra_id_sessao = st.session_state.get('obra_logada_id') if st.session_state['role'] == 'user' else None
+    obras_df, folhas_df, precos_df = get_remove_page_data(mes_selecionado, obra_id_sessao)
     
     st.header("Gerenciar Lançamentos")
-    
-    if lancamentos_df.empty:
-        st.info("Não há lançamentos para gerenciar no mês selecionado.")
+
+    obra_id_para_verificar = None
+    if st.session_state['role'] == 'user':
+        obra_ids_filtro = [obra_id_sessao] if obra_id_sessao is not None else None
+        obra_id_para_verificar = obra_id_sessao
+        filtro_col1, filtro_col2, filtro_col3 = st.columns(3)
+        col_func, col_disc, col_data = filtro_col1, filtro_col2, filtro_col3
     else:
-        df_filtrado = lancamentos_df.copy()
-        obra_id_para_verificar = None
-        
-        if st.session_state['role'] == 'user':
-            obra_logada_nome = st.session_state['obra_logada']
-            df_filtrado = df_filtrado[df_filtrado['Obra'] == obra_logada_nome]
-            obra_info = obras_df[obras_df['NOME DA OBRA'] == obra_logada_nome]
-            if not obra_info.empty: obra_id_para_verificar = int(obra_info.iloc[0]['id'])
-            
-            funcionarios_para_filtrar = sorted(df_filtrado['Funcionário'].unique())
-            funcionario_filtrado = st.multiselect("Filtrar por Funcionário:", options=funcionarios_para_filtrar, key="rl_func_user")
-            if funcionario_filtrado: df_filtrado = df_filtrado[df_filtrado['Funcionário'].isin(funcionario_filtrado)]
-        else:
-            filtro_col1, filtro_col2 = st.columns(2)
-            with filtro_col1:
-                obras_disponiveis = sorted(df_filtrado['Obra'].unique())
-                obras_filtradas_nomes = st.multiselect("Filtrar por Obra(s):", options=obras_disponiveis, key="rl_obras_admin")
-                if obras_filtradas_nomes:
-                    df_filtrado = df_filtrado[df_filtrado['Obra'].isin(obras_filtradas_nomes)]
-                    if len(obras_filtradas_nomes) == 1:
-                         obra_info = obras_df[obras_df['NOME DA OBRA'] == obras_filtradas_nomes[0]]
-                         if not obra_info.empty: obra_id_para_verificar = int(obra_info.iloc[0]['id'])
-            with filtro_col2:
-                funcionarios_para_filtrar = sorted(df_filtrado['Funcionário'].unique())
-                funcionario_filtrado = st.multiselect("Filtrar por Funcionário:", options=funcionarios_para_filtrar, key="rl_func_admin")
-                if funcionario_filtrado: df_filtrado = df_filtrado[df_filtrado['Funcionário'].isin(funcionario_filtrado)]
-      
-        if df_filtrado.empty:
-            st.info("Nenhum lançamento encontrado para os filtros selecionados.")
-        else:
-            edicao_bloqueada = False
-            msg_bloqueio = ""
-            status_folha = "Não Enviada" 
-            
-            if obra_id_para_verificar:
-                folha_do_mes = folhas_df[folhas_df['obra_id'] == obra_id_para_verificar]
-                if not folha_do_mes.empty:
-                    status_folha = folha_do_mes['status'].iloc[0]
-                
-                if st.session_state['role'] == 'user':
-                    if status_folha in ['Enviada para Auditoria', 'Finalizada']:
-                        edicao_bloqueada = True
-                        msg_bloqueio = f"Mês Fechado: Status '{status_folha}'. Edição bloqueada para usuários."
-                
-                elif st.session_state['role'] == 'admin':
-                    if status_folha != 'Enviada para Auditoria':
-                        edicao_bloqueada = True
-                        if status_folha == 'Finalizada':
-                            msg_bloqueio = f"Folha Finalizada: Edição bloqueada permanentemente."
-                        else:
-                            msg_bloqueio = f"Modo Leitura: Admin só pode editar quando for 'Enviada para Auditoria'. (Status atual: {status_folha})"
+        filtro_col1, filtro_col2, filtro_col3, filtro_col4 = st.columns(4)
+        col_func, col_disc, col_data = filtro_col2, filtro_col3, filtro_col4
+        with filtro_col1:
+            obras_filtradas_nomes = st.multiselect("Filtrar por Obra(s):", options=sorted(obras_df['NOME DA OBRA'].unique()), key="rl_obras_admin")
+        obra_ids_filtro = None
+        if obras_filtradas_nomes:
+            obra_ids_filtro = sorted(int(i) for i in obras_df.loc[obras_df['NOME DA OBRA'].isin(obras_filtradas_nomes), 'id'])
+            if len(obra_ids_filtro) == 1: obra_id_para_verificar = obra_ids_filtro[0]
 
-            if edicao_bloqueada:
-                st.error(msg_bloqueio)
+    opcoes_df = db_utils.get_opcoes_filtro_lancamentos(mes_selecionado, obra_ids_filtro)
+    if opcoes_df.empty:
+        st.info("Não há lançamentos para gerenciar no mês selecionado.")
+        return
 
-            df_filtrado['Remover'] = False
-            df_filtrado['Editar'] = False
-            
-            colunas_visiveis = ['id', 'Editar', 'Remover', 'Data', 'Obra', 'Funcionário', 'Disciplina', 'Serviço', 'Quantidade', 'Valor Unitário', 'Valor Parcial', 'Observação']
-            
-            if edicao_bloqueada:
-                config_disabled = True
-            else:
-                config_disabled = df_filtrado.columns.drop(['Remover', 'Editar'])
+    with col_func:
+        funcionarios_opcoes = opcoes_df.drop_duplicates('funcionario_id').set_index('funcionario_id')['Funcionário'].dropna()
+        funcionario_filtrado = st.multiselect("Filtrar por Funcionário:", options=sorted(funcionarios_opcoes.unique()), key="rl_func_user" if st.session_state['role'] == 'user' else "rl_func_admin")
+        funcionario_ids_filtro = sorted(int(i) for i in funcionarios_opcoes[funcionarios_opcoes.isin(funcionario_filtrado)].index) or None
+    with col_disc:
+        disciplinas_filtro = st.multiselect("Filtrar por Disciplina:", options=sorted(opcoes_df['Disciplina'].dropna().unique()), key="rl_disciplina") or None
+    with col_data:
+        inicio_mes = pd.to_datetime(mes_selecionado, format='%Y-%m').date()
+        fim_mes = (pd.Timestamp(inicio_mes) + pd.offsets.MonthEnd(0)).date()
+        periodo = st.date_input("Data do serviço:", value=(inicio_mes, fim_mes), min_value=inicio_mes, max_value=fim_mes, format="DD/MM/YYYY", key="rl_periodo")
+    data_inicio, data_fim = (periodo + (periodo[0],))[:2] if len(periodo) else (None, None)
+    if data_inicio == inicio_mes: data_inicio = None
+    if data_fim == fim_mes: data_fim = None
+
+    # Pilha com o cursor (Data, id) de cada página já visitada; volta para a primeira
+    # página sempre que os filtros mudam.
+    filtros = (mes_selecionado, tuple(obra_ids_filtro or ()), tuple(funcionario_ids_filtro or ()), tuple(disciplinas_filtro or ()), data_inicio, data_fim)
+    if st.session_state.get('rl_filtros') != filtros:
+        st.session_state['rl_filtros'] = filtros
+        st.session_state['rl_cursores'] = [None]
+    cursores = st.session_state['rl_cursores']
+
+    col_pag_info, col_tamanho = st.columns([3, 1])
+    with col_tamanho:
+        tamanho_pagina = st.selectbox("Linhas por página", options=[25, 50, 100, 200], index=1, key="rl_tamanho_pagina")
+    if st.session_state.get('rl_tamanho_atual') != tamanho_pagina:
+        st.session_state['rl_tamanho_atual'] = tamanho_pagina
+        cursores[:] = [None]
+
+    pagina_df = db_utils.get_pagina_lancamentos(
+        mes_selecionado, obra_ids_filtro, funcionario_ids_filtro, disciplinas_filtro,
+        data_inicio, data_fim, cursores[-1], tamanho_pagina
+    )
+    tem_proxima = len(pagina_df) > tamanho_pagina
+    df_filtrado = pagina_df.iloc[:tamanho_pagina].copy()
+
+    if df_filtrado.empty:
+        st.info("Nenhum lançamento encontrado para os filtros selecionados.")
+        if len(cursores) > 1 and st.button("◀ Voltar à primeira página", key="rl_primeira"):
+            cursores[:] = [None]
+            st.rerun()
+        return
 
-            df_modificado = st.data_editor(
-                df_filtrado[colunas_visiveis],
-                hide_index=True,
-                key="rl_data_editor",
-                column_config={
-                    "id": None, 
+    with col_pag_info:
+        st.caption(f"Página {len(cursores)} • {len(df_filtrado)} lançamento(s), do mais recente para o mais antigo.")
+
+    edicao_bloqueada = False
+    msg_bloqueio = ""
+    status_folha = "Não Enviada" 
+    
+    if obra_id_para_verificar:
+        folha_do_mes = folhas_df[folhas_df['obra_id'] == obra_id_para_verificar]
+        if not folha_do_mes.empty:
+            status_folha = folha_do_mes['status'].iloc[0]
         
-                    "Editar": st.column_config.CheckboxColumn(width="small"),
-                    "Data": st.column_config.DatetimeColumn("Data", format="DD/MM HH:mm"),
-                    "Quantidade": st.column_config.NumberColumn("Qtd", format="%.2f"),
-                    "Valor Unitário": st.column_config.NumberColumn("Unit.", format="R$ %.2f"), 
-                    "Valor Parcial": st.column_config.NumberColumn("Total", format="R$ %.2f"),
-                    "Disciplina": st.column_config.TextColumn(width="medium"),
-                    "Serviço": st.column_config.TextColumn(width="large"),
-                },
-                disabled=config_disabled
-            )
-            
-            linhas_para_editar = df_modificado[df_modificado['Editar']]
-            if not linhas_para_editar.empty:
-                if len(linhas_para_editar) > 1:
-                    st.warning("Selecione apenas um item por vez para editar.")
+        if st.session_state['role'] == 'user':
+            if status_folha in ['Enviada para Auditoria', 'Finalizada']:
+                edicao_bloqueada = True
+                msg_bloqueio = f"Mês Fechado: Status '{status_folha}'. Edição bloqueada para usuários."
+        
+        elif st.session_state['role'] == 'admin':
+            if status_folha != 'Enviada para Auditoria':
+                edicao_bloqueada = True
+                if status_folha == 'Finalizada':
+                    msg_bloqueio = f"Folha Finalizada: Edição bloqueada permanentemente."
                 else:
-                    row_to_edit = linhas_para_editar.iloc[0]
-                    abrir_modal_edicao(row_to_edit, precos_df)
+                    msg_bloqueio = f"Modo Leitura: Admin só pode editar quando for 'Enviada para Auditoria'. (Status atual: {status_folha})"
 
-            linhas_para_remover = df_modificado[df_modificado['Remover']]
-            if not linhas_para_remover.empty:
-                st.divider()
-                st.warning(f"Você selecionou {len(linhas_para_remover)} item(ns) para remoção permanente:")
-                
-                razao_remocao = ""
-                if st.session_state['role'] == 'admin':
-                    st.markdown("**Justificativa de Auditoria (Remoção)**")
-                    razao_remocao = st.text_input("Motivo da remoção (Obrigatório):", key="rl_razao_remocao")
-                
-                col_confirm, col_btn_del = st.columns([3, 1])
-                with col_confirm:
-                    confirmacao = st.checkbox("Confirmo que esta ação é irreversível.", key="rl_confirmacao_remocao")
-                
-                bloqueio_justificativa = (st.session_state['role'] == 'admin' and not razao_remocao.strip())
-                is_disabled = edicao_bloqueada or bloqueio_justificativa or not confirmacao
+    if edicao_bloqueada:
+        st.error(msg_bloqueio)
 
-                with col_btn_del:
-                    if st.button("Remover Selecionados", disabled=is_disabled, type="primary", key="rl_remover_btn"):
-                        ids_a_remover = linhas_para_remover['id'].tolist()
-                        if db_utils.remover_lancamentos_por_id(ids_a_remover, razao_remocao, obra_id_para_verificar, mes_selecionado):
-                            st.success("Removido com sucesso!")
-                            st.cache_data.clear() 
-                            st.rerun()
+    df_filtrado['Remover'] = False
+    df_filtrado['Editar'] = False
+    
+    colunas_visiveis = ['id', 'Editar', 'Remover', 'Data', 'Obra', 'Funcionário', 'Disciplina', 'Serviço', 'Quantidade', 'Valor Unitário', 'Valor Parcial', 'Observação']
+    
+    if edicao_bloqueada:
+        config_disabled = True
+    else:
+        config_disabled = df_filtrado.columns.drop(['Remover', 'Editar'])
+
+    df_modificado = st.data_editor(
+        df_filtrado[colunas_visiveis],
+        hide_index=True,
+        key=f"rl_data_editor_{hash(filtros)}_{len(cursores)}_{tamanho_pagina}",
+        column_config={
+            "id": None, 
 
+            "Editar": st.column_config.CheckboxColumn(width="small"),
+            "Data": st.column_config.DatetimeColumn("Data", format="DD/MM HH:mm"),
+            "Quantidade": st.column_config.NumberColumn("Qtd", format="%.2f"),
+            "Valor Unitário": st.column_config.NumberColumn("Unit.", format="R$ %.2f"), 
+            "Valor Parcial": st.column_config.NumberColumn("Total", format="R$ %.2f"),
+            "Disciplina": st.column_config.TextColumn(width="medium"),
+            "Serviço": st.column_config.TextColumn(width="large"),
+        },
+        disabled=config_disabled
+    )
 
+    col_anterior, _, col_proxima = st.columns([1, 3, 1])
+    with col_anterior:
+        if st.button("◀ Anterior", disabled=len(cursores) == 1, use_container_width=True, key="rl_pagina_anterior"):
+            cursores.pop()
+            st.rerun()
+    with col_proxima:
+        if st.button("Próxima ▶", disabled=not tem_proxima, use_container_width=True, key="rl_pagina_proxima"):
+            ultima = df_filtrado.iloc[-1]
+            cursores.append((ultima['Data'], int(ultima['id'])))
+            st.rerun()
+    
+    linhas_para_editar = df_modificado[df_modificado['Editar']]
+    if not linhas_para_editar.empty:
+        if len(linhas_para_editar) > 1:
+            st.warning("Selecione apenas um item por vez para editar.")
+        else:
+            row_to_edit = linhas_para_editar.iloc[0]
+            abrir_modal_edicao(row_to_edit, precos_df)
 
+    linhas_para_remover = df_modificado[df_modificado['Remover']]
+    if not linhas_para_remover.empty:
+        st.divider()
+        st.warning(f"Você selecionou {len(linhas_para_remover)} item(ns) para remoção permanente:")
+        
+        razao_remocao = ""
+        if st.session_state['role'] == 'admin':
+            st.markdown("**Justificativa de Auditoria (Remoção)**")
+            razao_remocao = st.text_input("Motivo da remoção (Obrigatório):", key="rl_razao_remocao")
+        
+        col_confirm, col_btn_del = st.columns([3, 1])
+        with col_confirm:
+            confirmacao = st.checkbox("Confirmo que esta ação é irreversível.", key="rl_confirmacao_remocao")
+        
+        bloqueio_justificativa = (st.session_state['role'] == 'admin' and not razao_remocao.strip())
+        is_disabled = edicao_bloqueada or bloqueio_justificativa or not confirmacao
 
+        with col_btn_del:
+            if st.button("Remover Selecionados", disabled=is_disabled, type="primary", key="rl_remover_btn"):
+                ids_a_remover = linhas_para_remover['id'].tolist()
+                if db_utils.remover_lancamentos_por_id(ids_a_remover, razao_remocao, obra_id_para_verificar, mes_selecionado):
+                    st.success("Removido com sucesso!")
+                    st.rerun()
@@ -61,35 +61,14 @@ def render_page():
     mes_selecionado = st.session_state.selected_month
     st.header(f"Resumo da Folha - {mes_selecionado}")
 
-    @st.cache_data
-    def get_resumo_data(mes):
-        funcionarios_df = db_utils.get_funcionarios()
-        lancamentos_df = db_utils.get_lancamentos_do_mes(mes)
-        obras_df = db_utils.get_obras()
-        status_df = db_utils.get_status_do_mes(mes)
-        folhas_df = db_utils.get_folhas_mensais(mes) 
-        return funcionarios_df, lancamentos_df, obras_df, status_df, folhas_df
-
-    funcionarios_df, lancamentos_df, obras_df, status_df, folhas_df = get_resumo_data(mes_selecionado)
-    
-    funcionarios_df = utils.filtrar_funcionarios_por_mes(funcionarios_df, mes_selecionado)
-    
-    snapshots_df = db_utils.get_snapshot_salarios(mes_selecionado)
-    if not snapshots_df.empty and not funcionarios_df.empty:
-        for index, func in funcionarios_df.iterrows():
-            folha_obra = folhas_df[folhas_df['obra_id'] == func['obra_id']]
-            status_folha_atual = folha_obra['status'].iloc[0] if not folha_obra.empty else "Aberta"
-            
-            if status_folha_atual != "Aberta":
-                snap = snapshots_df[snapshots_df['funcionario_id'] == func['id']]
-                if not snap.empty:
-                    funcionarios_df.at[index, 'SALARIO_BASE'] = snap['salario_base_na_epoca'].iloc[0]
-                    funcionarios_df.at[index, 'FUNÇÃO'] = snap['funcao_na_epoca'].iloc[0]
-
+    def get_resumo_data(mes, obra_id):
+        return db_utils.carregar_em_paralelo(
+            (db_utils.get_obras,),
+            (db_utils.get_status_do_mes, mes, obra_id),
+        )
 
-    if funcionarios_df.empty:
-        st.info("Nenhum funcionário ativo encontrado.")
-        return
+    obra_id_sessao = st.session_state.get('obra_logada_id') if st.session_state['role'] != 'admin' else None
+    obras_df, status_df = get_resumo_data(mes_selecionado, obra_id_sessao)
 
     st.subheader("Filtros")
     obra_filtrada = None
@@ -108,63 +87,23 @@ def render_page():
     else: 
         obra_filtrada = st.session_state['obra_logada']
         obra_relatorio_nome = obra_filtrada
-    funcionarios_filtrados_df = funcionarios_df.copy()
-    lancamentos_filtrados_df = lancamentos_df.copy()
     status_filtrado_df = status_df.copy() 
 
     obra_id_filtrada = None 
     if obra_filtrada and obra_filtrada != "Todas":
         obra_id_filtrada_info = obras_df.loc[obras_df['NOME DA OBRA'] == obra_filtrada, 'id']
-        if not obra_id_filtrada_info.empty:
-            obra_id_filtrada = obra_id_filtrada_info.iloc[0]
-            funcionarios_filtrados_df = funcionarios_filtrados_df[funcionarios_filtrados_df['OBRA'] == obra_filtrada]
-            if not lancamentos_filtrados_df.empty:
-                lancamentos_filtrados_df = lancamentos_filtrados_df[lancamentos_filtrados_df['Obra'] == obra_filtrada]
-            if not status_filtrado_df.empty:
-                 status_filtrado_df = status_filtrado_df[status_filtrado_df['obra_id'] == obra_id_filtrada]
-        else: 
-             funcionarios_filtrados_df = pd.DataFrame(columns=funcionarios_df.columns) 
-             lancamentos_filtrados_df = pd.DataFrame(columns=lancamentos_df.columns)
-             status_filtrado_df = pd.DataFrame(columns=status_df.columns)
-
-    if funcionarios_filtrados_df.empty:
-         st.warning(f"Nenhum funcionário encontrado para a obra '{obra_filtrada}'.")
-         return
-
-    if 'id' not in funcionarios_filtrados_df.columns: st.error("Erro: ID não encontrado."); return
-    funcionarios_filtrados_df['SALARIO_BASE'] = funcionarios_filtrados_df['SALARIO_BASE'].apply(utils.safe_float)
-
-    producao_bruta_df = pd.DataFrame()
-    total_gratificacoes_df = pd.DataFrame()
-
-    if not lancamentos_filtrados_df.empty:
-        lancamentos_filtrados_df['Valor Parcial'] = lancamentos_filtrados_df['Valor Parcial'].apply(utils.safe_float)
-        lanc_producao = lancamentos_filtrados_df[lancamentos_filtrados_df['Disciplina'] != 'GRATIFICAÇÃO']
-        if not lanc_producao.empty:
-            producao_bruta_df = lanc_producao.groupby('funcionario_id')['Valor Parcial'].sum().reset_index()
-            producao_bruta_df.rename(columns={'Valor Parcial': 'PRODUÇÃO BRUTA (R$)'}, inplace=True)
-        lanc_gratificacoes = lancamentos_filtrados_df[lancamentos_filtrados_df['Disciplina'] == 'GRATIFICAÇÃO']
-        if not lanc_gratificacoes.empty:
-            total_gratificacoes_df = lanc_gratificacoes.groupby('funcionario_id')['Valor Parcial'].sum().reset_index()
-            total_gratificacoes_df.rename(columns={'Valor Parcial': 'TOTAL GRATIFICAÇÕES (R$)'}, inplace=True)
-
-    resumo_df = funcionarios_filtrados_df.copy()
-    if not producao_bruta_df.empty:
-        resumo_df = pd.merge(resumo_df, producao_bruta_df, left_on='id', right_on='funcionario_id', how='left')
-        if 'funcionario_id' in resumo_df.columns and 'funcionario_id' != 'id': resumo_df = resumo_df.drop(columns=['funcionario_id'])
-    else: resumo_df['PRODUÇÃO BRUTA (R$)'] = 0.0
-
-    if not total_gratificacoes_df.empty:
-            resumo_df = pd.merge(resumo_df, total_gratificacoes_df, left_on='id', right_on='funcionario_id', how='left')
-            if 'funcionario_id' in resumo_df.columns and 'funcionario_id' != 'id': resumo_df = resumo_df.drop(columns=['funcionario_id'])
-    else: resumo_df['TOTAL GRATIFICAÇÕES (R$)'] = 0.0
-
-    resumo_df.rename(columns={'SALARIO_BASE': 'SALÁRIO BASE (R$)'}, inplace=True)
-    cols_to_fix = ['PRODUÇÃO BRUTA (R$)', 'TOTAL GRATIFICAÇÕES (R$)', 'SALÁRIO BASE (R$)']
-    for col in cols_to_fix: resumo_df[col] = resumo_df[col].fillna(0.0).apply(utils.safe_float)
-
-    resumo_df['PRODUÇÃO LÍQUIDA (R$)'] = resumo_df.apply(utils.calcular_producao_liquida, axis=1)
-    resumo_df['SALÁRIO A RECEBER (R$)'] = resumo_df.apply(utils.calcular_salario_final, axis=1)
+        if obra_id_filtrada_info.empty:
+            st.warning(f"Nenhum funcionário encontrado para a obra '{obra_filtrada}'.")
+            return
+        obra_id_filtrada = int(obra_id_filtrada_info.iloc[0])
+        if not status_filtrado_df.empty:
+             status_filtrado_df = status_filtrado_df[status_filtrado_df['obra_id'] == obra_id_filtrada]
+
+    resumo_df = db_utils.get_resumo_folha(mes_selecionado, obra_id_filtrada)
+    if resumo_df.empty:
+        if obra_id_filtrada is None: st.info("Nenhum funcionário ativo encontrado.")
+        else: st.warning(f"Nenhum funcionário encontrado para a obra '{obra_filtrada}'.")
+        return
 
     status_funcionarios_df = status_filtrado_df[status_filtrado_df['funcionario_id'] != 0][['funcionario_id', 'Status', 'Lancamentos Concluidos']].drop_duplicates()
     if not status_funcionarios_df.empty:
@@ -194,11 +133,11 @@ def render_page():
             
         st.markdown("---")
         
-        total_base = df_filtrado_final['SALÁRIO BASE (R$)'].sum()
-        total_bruta = df_filtrado_final['PRODUÇÃO BRUTA (R$)'].sum()
-        total_liquida = df_filtrado_final['PRODUÇÃO LÍQUIDA (R$)'].sum()
-        total_grat = df_filtrado_final['TOTAL GRATIFICAÇÕES (R$)'].sum()
-        total_receber = df_filtrado_final['SALÁRIO A RECEBER (R$)'].sum()
+        total_base = utils.somar_moeda(df_filtrado_final['SALÁRIO BASE (R$)'])
+        total_bruta = utils.somar_moeda(df_filtrado_final['PRODUÇÃO BRUTA (R$)'])
+        total_liquida = utils.somar_moeda(df_filtrado_final['PRODUÇÃO LÍQUIDA (R$)'])
+        total_grat = utils.somar_moeda(df_filtrado_final['TOTAL GRATIFICAÇÕES (R$)'])
+        total_receber = utils.somar_moeda(df_filtrado_final['SALÁRIO A RECEBER (R$)'])
 
         col_t1, col_t2, col_t3, col_t4, col_t5 = st.columns(5)
         
@@ -242,19 +181,19 @@ def render_page():
             excel_data = utils.to_excel(df_filtrado_final[colunas_finais_existentes]) 
             st.download_button(label="Baixar Excel", data=excel_data, file_name=f"resumo_{mes_selecionado}.xlsx", mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", use_container_width=True)
         with col_dl2:
-            lancamentos_para_pdf_final = lancamentos_filtrados_df.copy()
-            if funcionario_filtrado != "Todos" and not lancamentos_para_pdf_final.empty:
-                  lancamentos_para_pdf_final = lancamentos_para_pdf_final[lancamentos_para_pdf_final['Funcionário'] == funcionario_filtrado]
-            
-            colunas_lanc = ['Data', 'Data do Serviço', 'Obra', 'Funcionário', 'Disciplina', 'Serviço', 'Quantidade', 'Unidade', 'Valor Unitário', 'Valor Parcial', 'Observação']
-            if not lancamentos_para_pdf_final.empty:
-                cols_ex = [c for c in colunas_lanc if c in lancamentos_para_pdf_final.columns]
-                lancamentos_para_pdf = lancamentos_para_pdf_final[cols_ex]
-            else: lancamentos_para_pdf = pd.DataFrame(columns=colunas_lanc)
-
             pdf_ph = st.empty() 
             if pdf_ph.button("Baixar PDF", use_container_width=True):
                  with st.spinner("Gerando PDF..."):
+                    lancamentos_para_pdf_final = db_utils.get_lancamentos_do_mes(mes_selecionado, obra_id_filtrada)
+                    if funcionario_filtrado != "Todos" and not lancamentos_para_pdf_final.empty:
+                          lancamentos_para_pdf_final = lancamentos_para_pdf_final[lancamentos_para_pdf_final['Funcionário'] == funcionario_filtrado]
+
+                    colunas_lanc = ['Data', 'Data do Serviço', 'Obra', 'Funcionário', 'Disciplina', 'Serviço', 'Quantidade', 'Unidade', 'Valor Unitário', 'Valor Parcial', 'Observação']
+                    if not lancamentos_para_pdf_final.empty:
+                        cols_ex = [c for c in colunas_lanc if c in lancamentos_para_pdf_final.columns]
+                        lancamentos_para_pdf = lancamentos_para_pdf_final[cols_ex]
+                    else: lancamentos_para_pdf = pd.DataFrame(columns=colunas_lanc)
+
                     pdf_data = utils.gerar_relatorio_pdf(df_filtrado_final[colunas_finais_existentes], lancamentos_para_pdf, "Lavie.png", mes_selecionado, obra_relatorio_nome)
                     if pdf_data:
                         pdf_ph.download_button(label="⬇️ Download PDF", data=pdf_data, file_name=f"resumo_{mes_selecionado}.pdf", mime="application/pdf", use_container_width=True)
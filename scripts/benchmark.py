@@ -0,0 +1,224 @@
+"""Mede os loaders do db_utils e a montagem da folha contra um Postgres local com dados sintéticos.
+
+Uso:
+    python scripts/benchmark.py --url postgresql://postgres@localhost/folha_bench
+    python scripts/benchmark.py --escalas pequena,media --comparar benchmarks/base.json --limite 0.2
+
+Para cada escala a base é recriada com scripts/gerar_dados_sinteticos.py (mesma semente, mesmos dados)
+e cada caso roda --repeticoes vezes, sem o cache do Streamlit. Cada escala começa com o cache limpo e
+um diretório de meses fechados novo; os loaders de mês fechado são medidos lendo do disco ([disco])
+e com o armazenamento desligado ([banco]). O resultado é gravado em JSON
+(--saida). Com --comparar, casos cuja mediana piorou mais que --limite em relação ao arquivo base
+são apontados como regressão e o script termina com código 1.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+ESCALAS = {
+    'pequena': {'obras': 5, 'funcionarios': 250, 'meses': 6},
+    'media': {'obras': 20, 'funcionarios': 1000, 'meses': 12},
+    'grande': {'obras': 60, 'funcionarios': 3000, 'meses': 36},
+}
+MES_FINAL = '2025-06'
+
+
+def _gerar_base(url, escala):
+    parametros = ESCALAS[escala]
+    comando = [sys.executable, os.path.join(RAIZ, 'scripts', 'gerar_dados_sinteticos.py'), '--url', url, '--recriar',
+               '--mes-final', MES_FINAL]
+    for chave, valor in parametros.items():
+        comando += [f"--{chave}", str(valor)]
+    subprocess.run(comando, check=True, stdout=subprocess.DEVNULL)
+
+
+def _sem_disco(funcao):
+    """Roda `funcao` com o armazenamento de meses fechados desligado, lendo tudo do banco."""
+    def medir():
+        diretorio = os.environ.get('DB_DIRETORIO_MESES_FECHADOS', '')
+        os.environ['DB_DIRETORIO_MESES_FECHADOS'] = ''
+        try:
+            return funcao()
+        finally:
+            os.environ['DB_DIRETORIO_MESES_FECHADOS'] = diretorio
+    return medir
+
+
+def _casos(db_utils, utils):
+    """(nome, função sem argumentos) para cada caso medido. Mês fechado = dois meses antes do final."""
+    import pandas as pd
+    mes_fechado = (pd.Period(MES_FINAL, freq='M') - 2).strftime('%Y-%m')
+    mes_aberto = MES_FINAL
+
+    # O aquecimento de _medir grava os arquivos, então [disco] mede só a leitura do Parquet.
+    casos = []
+    for nome, funcao in [
+        ('get_lancamentos_do_mes', lambda: db_utils.get_lancamentos_do_mes.sem_cache(mes_fechado)),
+        ('get_lancamentos_do_mes[obra]', lambda: db_utils.get_lancamentos_do_mes.sem_cache(mes_fechado, 1)),
+        ('get_status_do_mes', lambda: db_utils.get_status_do_mes.sem_cache(mes_fechado)),
+    ]:
+        casos += [(f"{nome}[disco]", funcao), (f"{nome}[banco]", _sem_disco(funcao))]
+    casos += [
+        ('get_funcionarios', lambda: db_utils.get_funcionarios.sem_cache()),
+        ('get_folhas_mensais', lambda: db_utils.get_folhas_mensais.sem_cache(mes_fechado)),
+        ('get_resumo_folha[fechado]', lambda: db_utils.get_resumo_folha.sem_cache(mes_fechado)),
+        ('get_resumo_folha[aberto]', lambda: db_utils.get_resumo_folha.sem_cache(mes_aberto)),
+        ('get_resumo_folha[obra]', lambda: db_utils.get_resumo_folha.sem_cache(mes_fechado, 1)),
+    ]
+
+    # Folha mês a mês de um ano (grande: ~36k linhas), usada pelo dashboard e pela formatação de moeda.
+    mes_inicio_ano = (pd.Period(MES_FINAL, freq='M') - 11).strftime('%Y-%m')
+    casos.append(('get_resumo_periodo[12 meses]', lambda: db_utils.get_resumo_periodo.sem_cache(mes_inicio_ano, MES_FINAL)))
+    folha_df = db_utils.get_resumo_periodo.sem_cache(mes_inicio_ano, MES_FINAL)
+    casos.append(('utils.formatar_moeda', lambda: utils.formatar_moeda(utils.para_centavos(folha_df['SALÁRIO A RECEBER (R$)']))))
+
+    # calcular_folha contra as funções por linha em tamanhos fixos (linhas sorteadas da folha do ano),
+    # para comparar o ganho entre escalas.
+    for linhas in (10_000, 50_000):
+        if folha_df.empty:
+            break
+        amostra = folha_df.sample(linhas, replace=True, random_state=0).reset_index(drop=True)
+        casos += [
+            (f'utils.calcular_folha[{linhas}]', lambda df=amostra: utils.calcular_folha(df)),
+            (f'utils.calcular_folha[por linha {linhas}]', lambda df=amostra: (df.apply(utils.calcular_producao_liquida, axis=1),
+                                                                              df.apply(utils.calcular_salario_final, axis=1))),
+        ]
+
+    resumo_df = db_utils.get_resumo_folha.sem_cache(mes_fechado, 1)
+    lancamentos_df = db_utils.get_lancamentos_do_mes.sem_cache(mes_fechado, 1)
+    try:
+        import xlsxwriter  # noqa: F401
+        casos.append(('utils.to_excel', lambda: utils.to_excel(resumo_df)))
+    except ImportError:
+        casos.append(('utils.to_excel', None))
+    casos.append(('utils.gerar_relatorio_pdf',
+                  (lambda: utils.gerar_relatorio_pdf(resumo_df, lancamentos_df, os.path.join(RAIZ, 'Lavie.png'), mes_fechado, 'Obra 001'))
+                  if utils.WEASYPRINT_AVAILABLE else None))
+    return casos
+
+
+def _medir(funcao, repeticoes):
+    funcao()  # aquecimento (conexões do pool, imports preguiçosos)
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return {
+        'mediana_ms': round(statistics.median(tempos), 2),
+        'min_ms': round(min(tempos), 2),
+        'max_ms': round(max(tempos), 2),
+        'repeticoes': repeticoes,
+    }
+
+
+def _comparar(resultado, base, limite):
+    regressoes = []
+    for escala, dados in resultado['escalas'].items():
+        anteriores = base.get('escalas', {}).get(escala, {}).get('casos', {})
+        for nome, medida in dados['casos'].items():
+            anterior = anteriores.get(nome)
+            if not medida or not anterior:
+                continue
+            variacao = medida['mediana_ms'] / anterior['mediana_ms'] - 1
+            medida['variacao'] = round(variacao, 4)
+            if variacao > limite:
+                regressoes.append((escala, nome, anterior['mediana_ms'], medida['mediana_ms'], variacao))
+    return regressoes
+
+
+def _commit_atual():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=RAIZ, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--url', default=os.getenv('SUPABASE_URL'), help="URL do Postgres local (padrão: SUPABASE_URL)")
+    parser.add_argument('--escalas', default='pequena,media', help=f"escalas separadas por vírgula ({', '.join(ESCALAS)})")
+    parser.add_argument('--repeticoes', type=int, default=5)
+    parser.add_argument('--saida', default=os.path.join(RAIZ, 'benchmarks', f"resultado_{datetime.now():%Y%m%d_%H%M%S}.json"))
+    parser.add_argument('--comparar', help="JSON de uma execução anterior usado como referência")
+    parser.add_argument('--limite', type=float, default=0.2, help="piora relativa da mediana considerada regressão (0.2 = 20%%)")
+    parser.add_argument('--sem-gerar', action='store_true', help="usa a base atual em vez de recriá-la (só com uma escala)")
+    args = parser.parse_args()
+
+    escalas = [e.strip() for e in args.escalas.split(',') if e.strip()]
+    if not args.url:
+        parser.error("informe --url ou defina SUPABASE_URL")
+    if 'supabase' in args.url:
+        parser.error("recusando rodar benchmarks em um host do Supabase; use um Postgres local")
+    if any(e not in ESCALAS for e in escalas):
+        parser.error(f"escalas válidas: {', '.join(ESCALAS)}")
+    if args.sem_gerar and len(escalas) > 1:
+        parser.error("--sem-gerar só faz sentido com uma escala")
+
+    # O db_utils lê a URL na criação do engine; réplica e gravação de métricas ficam desligadas.
+    os.environ['SUPABASE_URL'] = args.url
+    os.environ.pop('SUPABASE_READ_URL', None)
+    os.environ['DB_GRAVAR_METRICAS'] = 'false'
+    import streamlit as st
+    import db_utils
+    import utils
+
+    resultado = {
+        'gerado_em': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': _commit_atual(),
+        'python': platform.python_version(),
+        'maquina': platform.node(),
+        'escalas': {},
+    }
+    for escala in escalas:
+        if not args.sem_gerar:
+            print(f"Gerando base '{escala}'...")
+            _gerar_base(args.url, escala)
+        # Nada da escala anterior pode ser lido: nem o cache (folhas finalizadas, por exemplo)
+        # nem os arquivos de meses fechados, que têm os mesmos ids de obra em todas as escalas.
+        st.cache_data.clear()
+        diretorio = tempfile.mkdtemp(prefix=f"meses_fechados_{escala}_")
+        os.environ['DB_DIRETORIO_MESES_FECHADOS'] = diretorio
+        casos = {}
+        try:
+            for nome, funcao in _casos(db_utils, utils):
+                if funcao is None:
+                    print(f"  {escala:8} {nome:36} indisponível (dependência não instalada)")
+                    casos[nome] = None
+                    continue
+                casos[nome] = _medir(funcao, args.repeticoes)
+                print(f"  {escala:8} {nome:36} {casos[nome]['mediana_ms']:10.1f} ms")
+        finally:
+            shutil.rmtree(diretorio, ignore_errors=True)
+        resultado['escalas'][escala] = {'parametros': ESCALAS[escala], 'casos': casos}
+
+    codigo = 0
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as f:
+            regressoes = _comparar(resultado, json.load(f), args.limite)
+        resultado['referencia'] = {'arquivo': args.comparar, 'limite': args.limite}
+        for escala, nome, antes, depois, variacao in regressoes:
+            print(f"REGRESSÃO {escala}/{nome}: {antes:.1f} ms -> {depois:.1f} ms (+{variacao:.0%})", file=sys.stderr)
+        resultado['regressoes'] = [f"{escala}/{nome}" for escala, nome, *_ in regressoes]
+        codigo = 1 if regressoes else 0
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.saida)), exist_ok=True)
+    with open(args.saida, 'w', encoding='utf-8') as f:
+        json.dump(resultado, f, ensure_ascii=False, indent=2)
+    print(f"Resultado gravado em {args.saida}.")
+    return codigo
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,275 @@
+"""Gera uma base sintética em volume de produção para testes de carga e benchmarks.
+
+Uso:
+    python scripts/gerar_dados_sinteticos.py --url postgresql://postgres@localhost/folha --recriar
+    python scripts/gerar_dados_sinteticos.py --obras 60 --funcionarios 3000 --meses 36 --lancamentos-por-mes 90
+
+Aplica as migrações de migrations/ (esquema incluído) e carrega todas as tabelas via COPY; depois
+grava folha_resultado das folhas finalizadas com db_utils.preencher_folha_resultado().
+Com a mesma --semente e os mesmos volumes o conjunto gerado é sempre o mesmo, para que
+mudanças de desempenho sejam medidas contra os mesmos dados.
+Sem --url, usa SUPABASE_URL. Recusa-se a rodar contra hosts do Supabase.
+"""
+import argparse
+import glob
+import io
+import os
+import sys
+import time
+from datetime import date
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TABELAS = ['query_metrics', 'log_auditoria', 'folha_resultado', 'holerites_snapshot', 'status_auditoria', 'folhas_mensais',
+           'lancamentos', 'servicos', 'disciplinas', 'funcionarios', 'funcoes', 'acessos_obras', 'obras']
+
+FUNCOES = [  # (funcao, tipo, salario_base, peso)
+    ('PEDREIRO', 'PRODUCAO', 2400.00, 30), ('SERVENTE', 'BONUS', 1650.00, 30),
+    ('CARPINTEIRO', 'PRODUCAO', 2500.00, 10), ('ARMADOR', 'PRODUCAO', 2450.00, 8),
+    ('ELETRICISTA', 'PRODUCAO', 2700.00, 5), ('ENCANADOR', 'PRODUCAO', 2650.00, 5),
+    ('PINTOR', 'PRODUCAO', 2300.00, 5), ('AZULEJISTA', 'PRODUCAO', 2450.00, 4),
+    ('ENCARREGADO', 'BONUS', 3900.00, 2), ('MESTRE DE OBRAS', 'BONUS', 5200.00, 1),
+]
+
+DISCIPLINAS = {  # disciplina -> (unidades, faixa de preço)
+    'ALVENARIA': (['M2', 'M'], (8, 45)), 'ESTRUTURA': (['M3', 'KG', 'M2'], (2, 180)),
+    'REVESTIMENTO': (['M2'], (12, 60)), 'PINTURA': (['M2'], (4, 25)),
+    'INSTALAÇÕES ELÉTRICAS': (['PONTO', 'M', 'UN'], (6, 90)), 'INSTALAÇÕES HIDRÁULICAS': (['PONTO', 'M', 'UN'], (6, 110)),
+    'FORMAS': (['M2'], (15, 55)), 'IMPERMEABILIZAÇÃO': (['M2'], (10, 40)),
+}
+
+DIVERSOS = ['Limpeza de obra', 'Descarga de material', 'Apoio à topografia', 'Retrabalho', 'Montagem de andaime', 'Transporte interno']
+GRATIFICACOES = ['Meta de produção', 'Assiduidade', 'Hora extra', 'Qualidade', 'Liderança de equipe']
+OBSERVACOES = [f"Bloco {b} - Pavimento {p}" for b in 'ABCD' for p in range(1, 13)]
+NOMES = ['Ana', 'Bruno', 'Carlos', 'Daniel', 'Eduardo', 'Fábio', 'Gabriel', 'Helena', 'Igor', 'João', 'José', 'Lucas',
+         'Marcos', 'Maria', 'Paulo', 'Pedro', 'Rafael', 'Ricardo', 'Sérgio', 'Tiago', 'Vinícius', 'Wellington']
+SOBRENOMES = ['Silva', 'Santos', 'Oliveira', 'Souza', 'Lima', 'Pereira', 'Ferreira', 'Costa', 'Rodrigues', 'Almeida',
+              'Nascimento', 'Carvalho', 'Gomes', 'Ribeiro', 'Martins', 'Araújo', 'Barbosa', 'Rocha']
+
+
+def _copiar(cursor, tabela, df):
+    """Envia o DataFrame para `tabela` com COPY ... FROM STDIN (CSV)."""
+    buffer = io.StringIO()
+    df.to_csv(buffer, index=False, header=False, na_rep='')
+    buffer.seek(0)
+    cursor.copy_expert(f"COPY {tabela} ({', '.join(df.columns)}) FROM STDIN WITH (FORMAT csv, NULL '')", buffer)
+    return len(df)
+
+
+def _aplicar_migracoes(conexao):
+    with conexao.cursor() as cursor:
+        for arquivo in sorted(glob.glob(os.path.join(RAIZ, 'migrations', '*.sql'))):
+            with open(arquivo, encoding='utf-8') as f:
+                cursor.execute(f.read())
+    conexao.commit()
+
+
+def _meses(mes_final, quantidade):
+    fim = pd.Period(mes_final, freq='M')
+    return [fim - i for i in range(quantidade - 1, -1, -1)]
+
+
+def gerar(conexao, args):
+    rng = np.random.default_rng(args.semente)
+    meses = _meses(args.mes_final, args.meses)
+    cursor = conexao.cursor()
+    # Horários gerados sem fuso são de Brasília, como os lançados pelo app.
+    cursor.execute("SET TIME ZONE 'America/Sao_Paulo'")
+
+    cursor.execute("SELECT COUNT(*) FROM lancamentos")
+    if cursor.fetchone()[0] and not args.recriar:
+        raise SystemExit("A base já tem lançamentos. Use --recriar para apagar tudo e gerar de novo.")
+    if args.recriar:
+        cursor.execute(f"TRUNCATE {', '.join(TABELAS)} RESTART IDENTITY CASCADE")
+        cursor.execute("DELETE FROM totais_mensais")
+
+    # Dimensões. Com RESTART IDENTITY os ids seriais começam em 1, na ordem do COPY.
+    obras = pd.DataFrame({'nome_obra': [f"Obra {i:03d}" for i in range(1, args.obras + 1)], 'status': 'Ativa'})
+    _copiar(cursor, 'obras', obras)
+    _copiar(cursor, 'acessos_obras', pd.DataFrame({'obra_id': np.arange(1, args.obras + 1),
+                                                   'codigo_acesso': [f"obra{i:03d}" for i in range(1, args.obras + 1)]}))
+
+    funcoes = pd.DataFrame(FUNCOES, columns=['funcao', 'tipo', 'salario_base', 'peso'])
+    _copiar(cursor, 'funcoes', funcoes[['funcao', 'tipo', 'salario_base']])
+
+    _copiar(cursor, 'disciplinas', pd.DataFrame({'nome': list(DISCIPLINAS)}))
+    servicos = []
+    for disciplina_id, (disciplina, (unidades, (preco_min, preco_max))) in enumerate(DISCIPLINAS.items(), start=1):
+        for n in range(1, args.servicos_por_disciplina + 1):
+            servicos.append((disciplina_id, f"{disciplina.title()} - serviço {n:02d}", unidades[n % len(unidades)],
+                             round(float(rng.uniform(preco_min, preco_max)), 2)))
+    servicos = pd.DataFrame(servicos, columns=['disciplina_id', 'descricao', 'unidade', 'valor_unitario'])
+    _copiar(cursor, 'servicos', servicos)
+
+    inicio_periodo = meses[0].start_time
+    fim_periodo = meses[-1].end_time
+    n_func = args.funcionarios
+    pesos = funcoes['peso'].to_numpy() / funcoes['peso'].sum()
+    funcionarios = pd.DataFrame({
+        'nome': [f"{NOMES[a]} {SOBRENOMES[b]} {SOBRENOMES[c]} {i}" for i, (a, b, c) in enumerate(zip(
+            rng.integers(len(NOMES), size=n_func), rng.integers(len(SOBRENOMES), size=n_func),
+            rng.integers(len(SOBRENOMES), size=n_func)), start=1)],
+        'obra_id': rng.integers(1, args.obras + 1, size=n_func),
+        'funcao_id': rng.choice(np.arange(1, len(funcoes) + 1), size=n_func, p=pesos),
+        'ativo': rng.random(n_func) > 0.1,
+        # Metade já estava contratada no início do período; o resto entra ao longo dele.
+        'data_admissao': np.where(
+            rng.random(n_func) < 0.5,
+            inicio_periodo - pd.to_timedelta(rng.integers(30, 720, size=n_func), unit='D'),
+            inicio_periodo + (fim_periodo - inicio_periodo) * rng.random(n_func),
+        ).astype('datetime64[D]'),
+    })
+    _copiar(cursor, 'funcionarios', funcionarios)
+    print(f"Dimensões: {args.obras} obras, {n_func} funcionários, {len(servicos)} serviços.")
+
+    cursor.execute("ALTER TABLE lancamentos DISABLE TRIGGER USER")
+
+    func_ids = np.arange(1, n_func + 1)
+    func_obra = funcionarios['obra_id'].to_numpy()
+    admissao = funcionarios['data_admissao'].to_numpy().astype('datetime64[D]')
+    servico_valor = servicos['valor_unitario'].to_numpy()
+    mes_corrente = meses[-1]
+    total = 0
+    inicio = time.perf_counter()
+    producao_por_mes = {}
+
+    for mes in meses:
+        inicio_mes = np.datetime64(mes.start_time.date(), 'D')
+        dias_mes = mes.days_in_month
+        elegiveis = func_ids[admissao < inicio_mes + dias_mes]
+        por_funcionario = rng.poisson(args.lancamentos_por_mes, size=len(elegiveis))
+        funcionario_id = np.repeat(elegiveis, por_funcionario)
+        n = len(funcionario_id)
+        if n == 0:
+            continue
+        producao_por_mes[mes] = np.unique(funcionario_id)
+
+        tipo = rng.random(n)
+        e_grat = tipo < args.proporcao_gratificacao
+        e_diverso = ~e_grat & (tipo < args.proporcao_gratificacao + args.proporcao_diverso)
+        e_servico = ~(e_grat | e_diverso)
+
+        servico_id = rng.integers(1, len(servicos) + 1, size=n)
+        quantidade = np.round(rng.lognormal(2.3, 0.8, size=n), 2).clip(0.5, 500)
+        valor = servico_valor[servico_id - 1]
+        quantidade = np.where(e_grat, 1, np.where(e_diverso, rng.integers(1, 4, size=n), quantidade))
+        valor = np.where(e_grat, np.round(rng.uniform(100, 800, size=n), 2),
+                         np.where(e_diverso, np.round(rng.uniform(50, 400, size=n), 2), valor))
+        descricao = np.where(e_grat, "[GRATIFICACAO] " + rng.choice(GRATIFICACOES, size=n),
+                             np.where(e_diverso, rng.choice(DIVERSOS, size=n), ''))
+
+        dia = rng.integers(0, dias_mes, size=n)
+        data_servico = inicio_mes + dia.astype('timedelta64[D]')
+        atraso = rng.integers(0, 3 * 24 * 3600, size=n).astype('timedelta64[s]')
+        data_lancamento = data_servico.astype('datetime64[s]') + np.timedelta64(7 * 3600, 's') + atraso
+
+        lote = pd.DataFrame({
+            'data_lancamento': np.datetime_as_string(data_lancamento),
+            'data_servico': data_servico,
+            'obra_id': func_obra[funcionario_id - 1],
+            'funcionario_id': funcionario_id,
+            'servico_id': pd.array(servico_id, dtype='Int64'),
+            'servico_diverso_descricao': descricao,
+            'quantidade': quantidade,
+            'valor_unitario': valor,
+            'observacao': rng.choice(OBSERVACOES, size=n),
+            'arquivado': mes < mes_corrente - 1,
+        })
+        lote.loc[~e_servico, 'servico_id'] = pd.NA
+        lote.loc[e_servico, 'servico_diverso_descricao'] = None
+        total += _copiar(cursor, 'lancamentos', lote)
+        print(f"  {mes}: {n:,} lançamentos ({total:,} no total, {time.perf_counter() - inicio:.0f} s)")
+
+    # Folhas: meses anteriores ao último fechado estão finalizadas, o último foi enviado e o corrente está aberto.
+    folhas, status, snapshots = [], [], []
+    salario_funcao = funcoes.set_index(np.arange(1, len(funcoes) + 1))[['funcao', 'salario_base']]
+    for mes in meses[:-1]:
+        finalizada = mes < mes_corrente - 1
+        mes_ref = mes.start_time.date()
+        for obra_id in range(1, args.obras + 1):
+            folhas.append((obra_id, mes_ref, 'Finalizada' if finalizada else 'Enviada para Auditoria',
+                           pd.Timestamp(mes.end_time.date()) + pd.Timedelta(hours=int(rng.integers(8, 18))),
+                           int(rng.integers(1, 4))))
+            status.append((obra_id, 0, mes_ref, 'Aprovado' if finalizada else 'A Revisar', True))
+        ids = producao_por_mes.get(mes, np.array([], dtype=int))
+        status.extend(zip(func_obra[ids - 1], ids, [mes_ref] * len(ids),
+                          ['Aprovado' if finalizada else 'A Revisar'] * len(ids), [True] * len(ids)))
+        if finalizada:
+            ativos = func_ids[admissao < np.datetime64(mes.end_time.date(), 'D')]
+            funcao_ids = funcionarios['funcao_id'].to_numpy()[ativos - 1]
+            snapshots.append(pd.DataFrame({
+                'mes_referencia': mes_ref, 'funcionario_id': ativos,
+                'funcao_na_epoca': salario_funcao.loc[funcao_ids, 'funcao'].to_numpy(),
+                'salario_base_na_epoca': salario_funcao.loc[funcao_ids, 'salario_base'].to_numpy(),
+            }))
+    _copiar(cursor, 'folhas_mensais', pd.DataFrame(folhas, columns=['obra_id', 'mes_referencia', 'status', 'data_lancamento', 'contador_envios']))
+    _copiar(cursor, 'status_auditoria', pd.DataFrame(status, columns=['obra_id', 'funcionario_id', 'mes_referencia', 'status', 'lancamentos_concluidos']))
+    if snapshots:
+        _copiar(cursor, 'holerites_snapshot', pd.concat(snapshots, ignore_index=True))
+
+    n_logs = args.logs
+    _copiar(cursor, 'log_auditoria', pd.DataFrame({
+        'data_hora': inicio_periodo + (fim_periodo - inicio_periodo) * rng.random(n_logs),
+        'usuario': np.where(rng.random(n_logs) < 0.2, 'admin', rng.choice(obras['nome_obra'], size=n_logs)),
+        'acao': rng.choice(['ADICIONAR_LANCAMENTOS', 'REMOVER_LANCAMENTOS', 'EDITAR_LANCAMENTO', 'ENVIAR_FOLHA', 'UPSERT_STATUS_AUDITORIA'], size=n_logs),
+        'detalhes': 'Registro sintético',
+    }))
+
+    cursor.execute("ALTER TABLE lancamentos ENABLE TRIGGER USER")
+    cursor.execute("SELECT reconstruir_totais_mensais()")
+    conexao.commit()
+    conexao.autocommit = True
+    cursor.execute("ANALYZE")
+    print(f"Concluído: {total:,} lançamentos em {time.perf_counter() - inicio:.0f} s.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--url', default=os.getenv('SUPABASE_URL'), help="URL do Postgres local (padrão: SUPABASE_URL)")
+    parser.add_argument('--obras', type=int, default=60)
+    parser.add_argument('--funcionarios', type=int, default=3000, help="total de funcionários, distribuídos entre as obras")
+    parser.add_argument('--meses', type=int, default=36)
+    parser.add_argument('--mes-final', default=date.today().strftime('%Y-%m'), help="último mês gerado, 'YYYY-MM' (fica com a folha aberta)")
+    parser.add_argument('--lancamentos-por-mes', type=float, default=20, help="média de lançamentos por funcionário por mês")
+    parser.add_argument('--servicos-por-disciplina', type=int, default=25)
+    parser.add_argument('--proporcao-gratificacao', type=float, default=0.04)
+    parser.add_argument('--proporcao-diverso', type=float, default=0.08)
+    parser.add_argument('--logs', type=int, default=20000)
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--recriar', action='store_true', help="apaga os dados existentes antes de gerar")
+    args = parser.parse_args()
+
+    if not args.url:
+        parser.error("informe --url ou defina SUPABASE_URL")
+    if 'supabase' in args.url:
+        parser.error("recusando gerar dados sintéticos em um host do Supabase; use um Postgres local")
+
+    engine = create_engine(args.url.replace("postgres://", "postgresql://", 1))
+    conexao = engine.raw_connection()
+    try:
+        _aplicar_migracoes(conexao)
+        gerar(conexao, args)
+    finally:
+        conexao.close()
+
+    # As folhas finalizadas precisam do resultado congelado, como as fechadas pelo app.
+    os.environ['SUPABASE_URL'] = args.url
+    os.environ.pop('SUPABASE_READ_URL', None)
+    os.environ.setdefault('DB_INVALIDACAO_ENTRE_PROCESSOS', 'false')
+    sys.path.insert(0, RAIZ)
+    import db_utils
+    inicio = time.perf_counter()
+    preenchidas = db_utils.preencher_folha_resultado()
+    if preenchidas is None:
+        print("Falha ao preencher folha_resultado.", file=sys.stderr)
+        return 1
+    print(f"folha_resultado: {preenchidas} folha(s) finalizada(s) em {time.perf_counter() - inicio:.0f} s.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
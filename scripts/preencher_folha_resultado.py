@@ -0,0 +1,25 @@
+"""Grava folha_resultado para as folhas finalizadas antes da migração 005.
+
+Uso: python scripts/preencher_folha_resultado.py
+Os valores são recalculados com os dados atuais. A conexão usa as mesmas configurações do app
+(SUPABASE_URL ou .streamlit/secrets.toml).
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db_utils
+
+
+def main():
+    preenchidas = db_utils.preencher_folha_resultado()
+    if preenchidas is None:
+        print("Falha ao preencher folha_resultado.", file=sys.stderr)
+        return 1
+    print(f"folha_resultado preenchida para {preenchidas} folha(s) finalizada(s).")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
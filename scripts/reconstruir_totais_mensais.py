@@ -0,0 +1,24 @@
+"""Recalcula a tabela totais_mensais a partir de lancamentos.
+
+Uso: python scripts/reconstruir_totais_mensais.py
+A conexão usa as mesmas configurações do app (SUPABASE_URL ou .streamlit/secrets.toml).
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db_utils
+
+
+def main():
+    linhas = db_utils.reconstruir_totais_mensais()
+    if linhas is None:
+        print("Falha ao reconstruir totais_mensais.", file=sys.stderr)
+        return 1
+    print(f"totais_mensais reconstruída: {linhas} linhas.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
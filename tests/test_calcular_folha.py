@@ -0,0 +1,85 @@
+"""utils.calcular_folha contra as funções por linha (calcular_producao_liquida e calcular_salario_final)."""
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import utils
+
+BASE, BRUTA, GRAT = 'SALÁRIO BASE (R$)', 'PRODUÇÃO BRUTA (R$)', 'TOTAL GRATIFICAÇÕES (R$)'
+LIQUIDA, RECEBER = 'PRODUÇÃO LÍQUIDA (R$)', 'SALÁRIO A RECEBER (R$)'
+
+TIPOS = ['PRODUCAO', 'producao', 'Producao', 'BONUS', 'bonus', 'PRODUÇÃO', '', None, np.nan]
+VALORES = [0.0, 1650.0, 2400.0, 2399.995, 2400.005, 0.125, 2.675, 1234.565, -0.005, 0.1 + 0.2, np.nan]
+
+
+def _por_linha(df):
+    return pd.DataFrame({
+        LIQUIDA: df.apply(utils.calcular_producao_liquida, axis=1) if len(df) else pd.Series(dtype=float),
+        RECEBER: df.apply(utils.calcular_salario_final, axis=1) if len(df) else pd.Series(dtype=float),
+    }, index=df.index)
+
+
+def _folha(linhas):
+    return pd.DataFrame(linhas, columns=['TIPO', BASE, BRUTA, GRAT])
+
+
+def _assert_paridade(df):
+    vetorizado = utils.calcular_folha(df)
+    pd.testing.assert_frame_equal(vetorizado, _por_linha(df), check_exact=True, check_dtype=False)
+
+
+def test_paridade_em_todas_as_combinacoes():
+    linhas = [(tipo, base, bruta, grat) for tipo, base, bruta in itertools.product(TIPOS, VALORES, VALORES)
+              for grat in (0.0, 150.0, 0.005, np.nan)]
+    _assert_paridade(_folha(linhas))
+
+
+@pytest.mark.parametrize('ausente', ['TIPO', BASE, BRUTA, GRAT])
+def test_paridade_com_coluna_ausente(ausente):
+    linhas = [(tipo, base, 2500.0, 100.0) for tipo, base in itertools.product(TIPOS, VALORES)]
+    _assert_paridade(_folha(linhas).drop(columns=[ausente]))
+
+
+def test_paridade_com_tipo_categorico_e_indice_nao_sequencial():
+    df = _folha([('PRODUCAO', 2400.0, 2500.005, 0.0), ('BONUS', 1650.0, np.nan, 10.0), ('producao', 2400.0, 100.0, 1.0)])
+    df['TIPO'] = df['TIPO'].astype('category')
+    df.index = [10, 3, 7]
+    _assert_paridade(df)
+
+
+def test_paridade_em_linhas_aleatorias():
+    rng = np.random.default_rng(0)
+    n = 5000
+    valores = np.round(rng.uniform(0, 5000, (n, 3)), 3)
+    valores[rng.random((n, 3)) < 0.05] = np.nan
+    df = pd.DataFrame({'TIPO': rng.choice(['PRODUCAO', 'BONUS', 'producao', ''], n),
+                       BASE: valores[:, 0], BRUTA: valores[:, 1], GRAT: valores[:, 2]})
+    _assert_paridade(df)
+
+
+def test_frame_vazio():
+    resultado = utils.calcular_folha(_folha([]))
+    assert list(resultado.columns) == [LIQUIDA, RECEBER]
+    assert resultado.empty
+
+
+@pytest.mark.parametrize('tipo, base, bruta, grat, liquida, receber', [
+    ('PRODUCAO', 2400.0, 2500.0, 100.0, 100.0, 2600.0),     # produção acima do salário base
+    ('producao', 2400.0, 2000.0, 100.0, 0.0, 2500.0),       # abaixo: recebe o salário base
+    ('BONUS', 1650.0, 300.0, 50.0, 350.0, 2000.0),          # bônus soma tudo
+    (None, 1650.0, 300.0, 0.0, 300.0, 1950.0),              # TIPO vazio segue a regra do bônus
+    ('BONUS', 0.005, 0.005, 0.0, 0.005, 0.005 + 0.005),     # meio centavo não é arredondado
+    ('PRODUCAO', 2400.0, 2400.005, 0.0, 2400.005 - 2400.0, 2400.005),
+    ('BONUS', 1650.0, np.nan, 50.0, np.nan, np.nan),        # NaN se propaga na soma
+    ('PRODUCAO', 2400.0, np.nan, 0.0, 0.0, 2400.0),         # max() ignora o NaN da direita
+    ('PRODUCAO', np.nan, 2500.0, 0.0, 0.0, np.nan),         # e mantém o da esquerda
+])
+def test_valores_esperados(tipo, base, bruta, grat, liquida, receber):
+    df = _folha([(tipo, base, bruta, grat)])
+    resultado = utils.calcular_folha(df).iloc[0]
+    linha = df.iloc[0]
+    for obtidos in ((resultado[LIQUIDA], resultado[RECEBER]),
+                    (utils.calcular_producao_liquida(linha), utils.calcular_salario_final(linha))):
+        np.testing.assert_equal(obtidos, (liquida, receber))
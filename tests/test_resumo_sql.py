@@ -0,0 +1,52 @@
+"""Regras da folha no SQL do resumo (db_utils._SQL_REGRAS_FOLHA) contra utils.calcular_folha.
+
+Precisa de um Postgres: defina DB_URL_TESTES (ex.: postgresql://postgres@localhost/postgres). A consulta
+não usa tabelas, só as regras sobre valores passados em arrays.
+"""
+import itertools
+import os
+
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, text
+
+import db_utils
+import utils
+
+URL = os.environ.get('DB_URL_TESTES')
+pytestmark = pytest.mark.skipif(not URL, reason='DB_URL_TESTES não definida')
+
+BASE, BRUTA, GRAT = 'SALÁRIO BASE (R$)', 'PRODUÇÃO BRUTA (R$)', 'TOTAL GRATIFICAÇÕES (R$)'
+LIQUIDA, RECEBER = 'PRODUÇÃO LÍQUIDA (R$)', 'SALÁRIO A RECEBER (R$)'
+
+TIPOS = ['PRODUCAO', 'producao', 'Producao', 'BONUS', 'PRODUÇÃO', '', None]
+VALORES = [0.0, 0.01, 0.1, 0.2, 1650.0, 2399.99, 2400.0, 2400.01, 1234.56, 99999.99]
+
+
+def _regras_sql(df):
+    query = f"""
+    SELECT {db_utils._SQL_REGRAS_FOLHA}
+    FROM unnest(CAST(:tipos AS text[]), CAST(:bases AS numeric[]), CAST(:brutas AS numeric[]),
+                CAST(:grats AS numeric[])) WITH ORDINALITY AS base(tipo, salario_base, producao_bruta, gratificacoes, n)
+    ORDER BY n
+    """
+    params = {'tipos': df['TIPO'].tolist(), 'bases': df[BASE].tolist(), 'brutas': df[BRUTA].tolist(),
+              'grats': df[GRAT].tolist()}
+    engine = create_engine(URL)
+    try:
+        with engine.connect() as connection:
+            linhas = connection.execute(text(query), params).fetchall()
+    finally:
+        engine.dispose()
+    return pd.DataFrame([(float(liquida), float(receber)) for liquida, _, receber in linhas],
+                        columns=[LIQUIDA, RECEBER], index=df.index)
+
+
+def test_regras_sql_iguais_a_calcular_folha_no_centavo():
+    linhas = [(tipo, base, bruta, grat) for tipo, base, bruta in itertools.product(TIPOS, VALORES, VALORES)
+              for grat in (0.0, 0.01, 150.35)]
+    df = pd.DataFrame(linhas, columns=['TIPO', BASE, BRUTA, GRAT])
+    sql = _regras_sql(df)
+    pandas = utils.calcular_folha(df)
+    for coluna in (LIQUIDA, RECEBER):
+        pd.testing.assert_series_equal(utils.para_centavos(pandas[coluna]), utils.para_centavos(sql[coluna]))
@@ -1,9 +1,11 @@
 import streamlit as st
 import io
 import pandas as pd
+import numpy as np
 from datetime import datetime, timezone, timedelta
 import calendar
 from datetime import date
+from decimal import Decimal
 import base64
 
 try:
@@ -40,6 +42,36 @@ def calcular_producao_liquida(row):
     else: 
         return producao_bruta_sem_grat + total_gratificacoes
 
+def _coluna_valor(df, coluna):
+    if coluna in df.columns:
+        return df[coluna].to_numpy(dtype=float)
+    return np.zeros(len(df))
+
+def calcular_folha(df):
+    """Produção líquida e salário final de todas as linhas de uma vez.
+
+    Mesmas regras (e resultados) de calcular_producao_liquida e calcular_salario_final aplicadas
+    linha a linha; colunas ausentes valem 0 (ou TIPO vazio). Retorna um DataFrame com o índice de
+    `df` e as colunas 'PRODUÇÃO LÍQUIDA (R$)' e 'SALÁRIO A RECEBER (R$)'.
+    """
+    salario_base = _coluna_valor(df, 'SALÁRIO BASE (R$)')
+    producao_bruta = _coluna_valor(df, 'PRODUÇÃO BRUTA (R$)')
+    gratificacoes = _coluna_valor(df, 'TOTAL GRATIFICAÇÕES (R$)')
+    if 'TIPO' in df.columns:
+        producao = (df['TIPO'].astype(str).str.upper() == 'PRODUCAO').to_numpy()
+    else:
+        producao = np.zeros(len(df), dtype=bool)
+
+    # np.where(b > a, b, a) reproduz max(a, b) do Python, inclusive com NaN.
+    excedente = producao_bruta - salario_base
+    producao_liquida = np.where(producao, np.where(excedente > 0.0, excedente, 0.0), producao_bruta + gratificacoes)
+    pagamento_base = np.where(producao, np.where(producao_bruta > salario_base, producao_bruta, salario_base),
+                              salario_base + producao_bruta)
+    return pd.DataFrame({
+        'PRODUÇÃO LÍQUIDA (R$)': producao_liquida,
+        'SALÁRIO A RECEBER (R$)': pagamento_base + gratificacoes,
+    }, index=df.index)
+
 def to_excel(df):
     output = io.BytesIO()
     with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
@@ -55,20 +87,81 @@ def format_currency(value):
     except (ValueError, TypeError):
         return str(value)
 
+def _texto_numero(value):
+    # 'R$ 1.234,56' -> '1234.56': tira o separador de milhar antes de trocar a vírgula decimal.
+    return str(value).replace('R$', '').strip().replace('.', '').replace(',', '.')
+
 def safe_float(value):
     if value is None:
         return 0.0
     try:
-        if isinstance(value, (int, float)):
+        if isinstance(value, (int, float, Decimal)):
             return float(value)
         elif isinstance(value, str):
-            s = str(value).replace('R$', '').strip().replace('.', '').replace(',', '.')
+            s = _texto_numero(value)
             return float(s) if s else 0.0
         else:
             return 0.0
     except (ValueError, TypeError):
         return 0.0
 
+def ler_numero(value):
+    """Como safe_float, mas vazios e valores inválidos viram NaN em vez de 0 (para validar entradas)."""
+    if isinstance(value, str):
+        s = _texto_numero(value)
+        try:
+            return float(s) if s else np.nan
+        except ValueError:
+            return np.nan
+    if isinstance(value, (int, float, Decimal, np.number)) and not isinstance(value, bool):
+        return float(value)
+    return np.nan
+
+def _arredondar_centavos(reais):
+    # Meio centavo vai para longe do zero (0,005 -> 0,01; -0,005 -> -0,01), como no arredondamento
+    # comercial. O round em 6 casas absorve o erro de representação (2.675 * 100 = 267.49999999999997).
+    centavos = np.round(np.abs(reais) * 100, 6)
+    return (np.sign(reais) * np.floor(centavos + 0.5)).astype(np.int64)
+
+def para_centavos(valores):
+    """Converte valores em reais para centavos int64, arredondando o meio centavo para longe do zero.
+
+    Vazios e inválidos (None, NaN, pd.NA) valem 0. Com um escalar retorna int; com Series (ou lista)
+    retorna Series int64. Colunas numéricas são convertidas em bloco; só colunas object (textos
+    'R$ 1.234,56', Decimal) passam por safe_float.
+    """
+    if pd.api.types.is_scalar(valores):
+        if pd.isna(valores):
+            return 0
+        return int(_arredondar_centavos(np.nan_to_num(np.array([safe_float(valores)]), nan=0.0))[0])
+    serie = valores if isinstance(valores, pd.Series) else pd.Series(valores)
+    if serie.dtype == object:
+        serie = serie.map(safe_float)
+    reais = pd.to_numeric(serie, errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+    return pd.Series(_arredondar_centavos(np.nan_to_num(reais, nan=0.0)), index=serie.index)
+
+def somar_moeda(valores):
+    """Soma exata (em centavos) de uma coluna em reais; retorna reais."""
+    return int(para_centavos(valores).sum()) / 100
+
+def formatar_numero(valores, casas=2):
+    """Formata uma Series de números no padrão brasileiro ('1.234,50'), sem passar por centavos."""
+    serie = valores if isinstance(valores, pd.Series) else pd.Series(valores)
+    numeros = serie.map(safe_float) if serie.dtype == object else pd.to_numeric(serie, errors='coerce')
+    return pd.Series([f'{valor:_.{casas}f}'.replace('.', ',').replace('_', '.') for valor in numeros.fillna(0.0).tolist()],
+                     index=serie.index, dtype=object)
+
+def formatar_moeda(centavos, prefixo='R$ '):
+    """Formata uma Series de centavos no padrão brasileiro ('R$ 1.234,56').
+
+    Uma única passada sobre a lista de valores; centavos/100 formatado com duas casas devolve
+    sempre os centavos exatos.
+    """
+    centavos = centavos if isinstance(centavos, pd.Series) else pd.Series(centavos)
+    reais = (centavos.to_numpy(dtype=np.int64) / 100).tolist()
+    return pd.Series([f'{prefixo}{valor:_.2f}'.replace('.', ',').replace('_', '.') for valor in reais],
+                     index=centavos.index, dtype=object)
+
 def display_status_box(label, status):
     if status == 'Aprovado':
         st.success(f"{label}: {status}")
@@ -119,7 +212,7 @@ def gerar_relatorio_pdf(resumo_df, lancamentos_df, logo_path, mes_referencia, ob
     currency_cols_resumo = ['SALÁRIO BASE (R$)', 'PRODUÇÃO BRUTA (R$)', 'PRODUÇÃO LÍQUIDA (R$)', 'TOTAL GRATIFICAÇÕES (R$)', 'SALÁRIO A RECEBER (R$)' ]
     for col in currency_cols_resumo:
         if col in resumo_df_html.columns:
-            resumo_df_html[col] = resumo_df_html[col].apply(lambda x: f'R$ {safe_float(x):,.2f}'.replace(",", "X").replace(".", ",").replace("X", "."))
+            resumo_df_html[col] = formatar_moeda(para_centavos(resumo_df_html[col]))
 
     currency_cols_lanc = ['Valor Unitário', 'Valor Parcial']
     number_cols_lanc = ['Quantidade']
@@ -127,10 +220,10 @@ def gerar_relatorio_pdf(resumo_df, lancamentos_df, logo_path, mes_referencia, ob
 
     for col in currency_cols_lanc:
          if col in lancamentos_df_html.columns:
-            lancamentos_df_html[col] = lancamentos_df_html[col].apply(lambda x: f'R$ {safe_float(x):,.2f}'.replace(",", "X").replace(".", ",").replace("X", "."))
+            lancamentos_df_html[col] = formatar_moeda(para_centavos(lancamentos_df_html[col]))
     for col in number_cols_lanc:
          if col in lancamentos_df_html.columns:
-             lancamentos_df_html[col] = lancamentos_df_html[col].apply(lambda x: f'{safe_float(x):,.2f}'.replace(",", "X").replace(".", ",").replace("X", "."))
+             lancamentos_df_html[col] = formatar_numero(lancamentos_df_html[col])
     for col in date_cols_lanc:
          if col in lancamentos_df_html.columns:
              try: lancamentos_df_html[col] = pd.to_datetime(lancamentos_df_html[col]).dt.strftime('%d/%m/%Y %H:%M')